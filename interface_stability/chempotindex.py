@@ -0,0 +1,180 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+import os
+import json
+
+import numpy as np
+from pymatgen import Composition, Element
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+from interface_stability.singlephase import VirtualEntry, PD_PRELOAD_PATH
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+"""
+Transition chemical potentials of an open element in a chemical system, and the stable phases between them.
+
+They only depend on the entries of the chemical system, so they are computed once per (chemsys, open element)
+and saved next to the cached entries in PMG_PD_PRELOAD_PATH. The chemical potentials of every facet of the hull
+are kept too: the hull energy of any composition is the maximum of comp . mu over the facets, which is used to
+check that the entries of a calculation (e.g. stabilized end members) do not change the hull of the index.
+"""
+
+CHEMPOT_INDEX_VERSION = 1
+# Entries above the hull of the index by less than this (eV/atom), e.g. stabilized ones, are on its hull
+HULL_TOL = 1e-6
+
+
+class TransitionChempotIndex(object):
+    """
+    Chemical potentials are referenced to the pure open element, as in PseudoBinary.get_gppd_transition_chempots.
+    """
+
+    def __init__(self, chemsys, open_el, el_ref_energy, elements, facet_chempots, transition_chempots, intervals):
+        """
+        :param el_ref_energy: energy per atom of the open element reference
+        :param elements: element symbols, the order of the columns of facet_chempots
+        :param facet_chempots: chemical potentials (not referenced) of all elements on each facet of the hull
+        :param transition_chempots: transition chemical potentials, from high to low
+        :param intervals: list of (mu_high, mu_low, stable phase names) between the transition chemical potentials.
+            mu_low of the last interval is None (-inf).
+        """
+        self.chemsys = sorted(set(chemsys))
+        self.open_el = open_el
+        self.el_ref_energy = el_ref_energy
+        self.elements = list(elements)
+        self.facet_chempots = np.array(facet_chempots)
+        self.transition_chempots = list(transition_chempots)
+        self.intervals = [(hi, lo, list(names)) for hi, lo, names in intervals]
+
+    @classmethod
+    def from_pd(cls, pd, open_el):
+        open_el = str(open_el)
+        elements = [el.symbol for el in pd.elements]
+        oe_index = elements.index(open_el)
+        entries = pd.qhull_entries
+        X = np.array([[e.composition.get_atomic_fraction(el) for el in pd.elements] for e in entries])
+        E = np.array([e.energy_per_atom for e in entries])
+        facet_chempots = np.array([np.linalg.solve(X[list(facet)], E[list(facet)]) for facet in pd.facets])
+        el_ref_energy = pd.el_refs[Element(open_el)].energy_per_atom
+        transition_chempots = [mu - el_ref_energy for mu in pd.get_transition_chempots(Element(open_el))]
+
+        # The stable region of a phase has the chemical potentials of the facets around it as vertices
+        ranges = {}
+        for facet, mu in zip(pd.facets, facet_chempots[:, oe_index] - el_ref_energy):
+            for i in facet:
+                if i not in ranges:
+                    ranges[i] = [mu, mu]
+                ranges[i] = [min(ranges[i][0], mu), max(ranges[i][1], mu)]
+        intervals = []
+        bounds = transition_chempots + [None]
+        for hi, lo in zip(bounds[:-1], bounds[1:]):
+            mid = (hi + lo) / 2.0 if lo is not None else hi - 1.0
+            names = []
+            for i, (mu_min, mu_max) in ranges.items():
+                if X[i, oe_index] == 1:
+                    continue
+                if X[i, oe_index] == 0:
+                    # Without the open element, a phase is stable down to -inf
+                    mu_min = -np.inf
+                if mu_min < mid < mu_max:
+                    names.append(entries[i].name)
+            intervals.append((hi, lo, sorted(names)))
+        return cls(elements, open_el, el_ref_energy, elements, facet_chempots, transition_chempots, intervals)
+
+    def as_dict(self):
+        return {'version': CHEMPOT_INDEX_VERSION, 'chemsys': self.chemsys, 'open_el': self.open_el,
+                'el_ref_energy': self.el_ref_energy, 'elements': self.elements,
+                'facet_chempots': self.facet_chempots.tolist(), 'transition_chempots': self.transition_chempots,
+                'intervals': self.intervals}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['chemsys'], d['open_el'], d['el_ref_energy'], d['elements'], d['facet_chempots'],
+                   d['transition_chempots'], d['intervals'])
+
+    def get_hull_energy_per_atom(self, comp):
+        comp = Composition(comp)
+        x = np.array([comp.get_atomic_fraction(el) for el in self.elements])
+        return float(np.max(np.dot(self.facet_chempots, x)))
+
+    def is_on_or_above_hull(self, entry):
+        """
+        Whether the entry leaves the hull of the index unchanged (within HULL_TOL)
+        """
+        if not set(el.symbol for el in entry.composition.elements) <= set(self.chemsys):
+            return False
+        return entry.energy_per_atom >= self.get_hull_energy_per_atom(entry.composition) - HULL_TOL
+
+    def get_stable_phases(self, mu):
+        for hi, lo, names in self.intervals:
+            if lo is None or mu >= lo:
+                return names
+        return self.intervals[-1][2]
+
+    def get_entry_stability_window(self, entry):
+        """
+        :return: (mu_high, mu_low) of an entry of the chemical system, (None, None) if it is above the hull.
+            None if the index can not tell, i.e. the entry is below the hull, or on the hull without being one of
+            its stable phases (the entry would be a new vertex).
+        """
+        hull_energy = self.get_hull_energy_per_atom(entry.composition)
+        if entry.energy_per_atom > hull_energy + HULL_TOL:
+            return None, None
+        if entry.energy_per_atom < hull_energy - HULL_TOL:
+            return None
+        window = self.get_stability_window(entry.composition.reduced_formula)
+        return window if window != (None, None) else None
+
+    def get_stability_window(self, name):
+        """
+        :return: (mu_high, mu_low) of a stable phase of the index, mu_low is None for -inf. (None, None) if the phase
+            is never stable.
+        """
+        stable = [(hi, lo) for hi, lo, names in self.intervals if name in names]
+        if not stable:
+            return None, None
+        return stable[0][0], stable[-1][1]
+
+
+def get_chempot_index_path(chemsys, open_el, folder=None):
+    """
+    The default location is next to the cached entries in PMG_PD_PRELOAD_PATH
+    """
+    folder = folder if folder else PD_PRELOAD_PATH
+    if folder is None:
+        raise ValueError("No folder is given for transition chempot indices. "
+                         "Please set up PMG_PD_PRELOAD_PATH in ~/.pmgrc.yaml")
+    el_list = sorted(set(str(el) for el in chemsys) | {str(open_el)})
+    return os.path.join(folder, "_".join(el_list) + "_{}_TransitionChempots.json".format(open_el))
+
+
+def load_chempot_index(chemsys, open_el, entries=None, folder=None):
+    """
+    Load the transition chempot index of a chemical system (the open element is added to it). If it does not exist,
+    build it from entries (or from the cached/MP entries if entries is None) and save it first.
+    Only give entries which are the same as the cached entries, as an existing index is not checked against them.
+    """
+    open_el = str(open_el)
+    chemsys = sorted(set(str(el) for el in chemsys) | {open_el})
+    path = get_chempot_index_path(chemsys, open_el, folder=folder)
+    if os.path.isfile(path):
+        with open(path) as f:
+            d = json.load(f)
+        if d.get('version') == CHEMPOT_INDEX_VERSION:
+            return TransitionChempotIndex.from_dict(d)
+    if not entries:
+        entries = VirtualEntry.get_PD_entries_from_preload_file(chemsys)
+    index = TransitionChempotIndex.from_pd(PhaseDiagram(entries), open_el)
+    tmp_path = path + '.tmp{}'.format(os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(index.as_dict(), f)
+    os.rename(tmp_path, path)
+    return index
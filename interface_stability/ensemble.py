@@ -0,0 +1,313 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+import multiprocessing
+from collections import Counter
+
+import numpy as np
+from pymatgen import Composition, Element
+from pymatgen.analysis.phase_diagram import PhaseDiagram, PDEntry
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.pseudobinary import get_full_evolution_profile, clean_profile
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+"""
+Monte Carlo propagation of the DFT energy uncertainty into stability results.
+
+The energies of all entries are perturbed at once into an array of shape (n_entries, n_samples).
+A hull is only built for one sample, and the hull structure needed by a result (e.g. the facet containing a
+composition) is then checked for all other samples with array operations: for the samples where no entry falls
+below any of these facets, the result is a linear function of the energies and is evaluated in one go.
+Hulls are only built again for the samples where the structure changed.
+
+    ensemble = EnergyEnsemble(VirtualEntry.from_composition('Li3PS4').get_PD_entries(), sigma=0.025)
+    ensemble = ensemble.stabilize(VirtualEntry.from_composition('Li3PS4'))
+    result = ensemble.get_stability_window_samples(ensemble.entries[-1], 'Li')
+    get_confidence_interval(result['mu_low'])
+"""
+
+# Tolerance (eV/atom) for an entry below a facet. Well below the 1e-8 eV (per formula) used by stabilize
+TOL = 1e-12
+
+
+class EnergyEnsemble(object):
+    """
+    Entries with an ensemble of perturbed energies.
+    """
+
+    def __init__(self, entries, sigma=0.025, n_samples=200, seed=None, energies=None):
+        """
+        :param entries: entries of the chemical system
+        :param sigma: standard deviation of the energy error (eV/atom), a number or one value per entry
+        :param n_samples: number of samples
+        :param seed: random seed
+        :param energies: use given energies per atom of shape (n_entries, n_samples) instead of sampling
+        """
+        self.entries = list(entries)
+        self.elements = sorted(set(el for e in self.entries for el in e.composition.elements))
+        self.X = np.array([[e.composition.get_atomic_fraction(el) for el in self.elements] for e in self.entries])
+        if energies is None:
+            e0 = np.array([e.energy_per_atom for e in self.entries])
+            sigma = np.broadcast_to(np.asarray(sigma, dtype=float), e0.shape)
+            rng = np.random.RandomState(seed)
+            energies = e0[:, None] + sigma[:, None] * rng.standard_normal((len(e0), n_samples))
+        self.energies = np.asarray(energies, dtype=float)
+
+    @property
+    def n_samples(self):
+        return self.energies.shape[1]
+
+    def index(self, entry):
+        for i, e in enumerate(self.entries):
+            if e is entry:
+                return i
+        raise ValueError("{} is not in the ensemble".format(entry.name))
+
+    def get_sub_ensemble(self, samples):
+        return EnergyEnsemble(self.entries, energies=self.energies[:, samples])
+
+    def add_entry(self, entry, energies):
+        """
+        :param energies: energy per atom of the new entry for each sample
+        :return: a new ensemble with the entry appended
+        """
+        return EnergyEnsemble(self.entries + [entry], energies=np.vstack([self.energies, energies]))
+
+    def get_pd(self, sample):
+        """
+        PhaseDiagram of one sample. The attribute of each PDEntry is the index of the entry in the ensemble.
+        """
+        pd_entries = [PDEntry(e.composition, self.energies[i, sample] * e.composition.num_atoms, name=e.name,
+                              attribute=i) for i, e in enumerate(self.entries)]
+        return PhaseDiagram(pd_entries, elements=self.elements)
+
+    def get_coords(self, comp):
+        comp = Composition(comp)
+        if not set(comp.elements) <= set(self.elements):
+            # Otherwise the foreign elements are dropped and the coordinates do not sum to one
+            raise ValueError("{} has elements outside the ensemble".format(comp.reduced_formula))
+        return np.array([comp.get_atomic_fraction(el) for el in self.elements])
+
+    @staticmethod
+    def get_facets(pd):
+        """
+        :return: facets of the hull as tuples of entry indices in the ensemble
+        """
+        return [tuple(pd.qhull_entries[i].attribute for i in facet) for facet in pd.facets]
+
+    def find_facet(self, facets, coords):
+        """
+        :return: (facet containing the composition, amounts of the facet vertices)
+        """
+        amounts = np.linalg.solve(np.transpose(self.X[np.array(facets)], (0, 2, 1)), coords[None, :, None])[..., 0]
+        found = np.where(amounts.min(axis=1) >= -TOL)[0]
+        if not len(found):
+            formula = " ".join("{}{:.4g}".format(el.symbol, x) for el, x in zip(self.elements, coords) if abs(x) > TOL)
+            raise ValueError("{} is not in any facet of the hull".format(formula))
+        return facets[found[0]], amounts[found[0]]
+
+    def get_facet_mu(self, facet, samples):
+        """
+        :return: chemical potentials of all elements on the plane of the facet, shape (n_elements, n_samples)
+        """
+        facet = list(facet)
+        return np.linalg.solve(self.X[facet], self.energies[facet][:, samples])
+
+    def is_valid(self, facets, samples):
+        """
+        :return: boolean array, whether all facets are still on the hull for each sample
+        """
+        energies = self.energies[:, samples]
+        valid = np.ones(len(samples), dtype=bool)
+        for facet in facets:
+            valid &= ((energies - np.dot(self.X, self.get_facet_mu(facet, samples))) >= -TOL).all(axis=0)
+        return valid
+
+    def _run(self, get_structure, evaluate):
+        """
+        Evaluate a result for all samples, building a hull only when the structure changes.
+        :param get_structure: function(pd, sample) -> (facets that must stay on the hull, data for evaluate)
+        :param evaluate: function(data, samples) -> {name: values for these samples}
+        :return: {name: array over all samples}, plus "n_hulls", the number of hulls built
+        """
+        results = {}
+        remaining = np.arange(self.n_samples)
+        n_hulls = 0
+        while remaining.size:
+            facets, data = get_structure(self.get_pd(remaining[0]), remaining[0])
+            n_hulls += 1
+            valid = self.is_valid(facets, remaining)
+            valid[0] = True
+            samples = remaining[valid]
+            for name, values in evaluate(data, samples).items():
+                values = np.asarray(values)
+                if name not in results:
+                    results[name] = np.full(self.n_samples, np.nan) if values.dtype.kind == 'f' \
+                        else np.empty(self.n_samples, dtype=object)
+                results[name][samples] = values
+            remaining = remaining[~valid]
+        results['n_hulls'] = n_hulls
+        return results
+
+    def _compute(self, method, args, processes):
+        if processes <= 1:
+            return getattr(self, method)(*args)
+        chunks = np.array_split(np.arange(self.n_samples), processes)
+        tasks = [(self.get_sub_ensemble(chunk), method, args) for chunk in chunks]
+        pool = multiprocessing.Pool(processes)
+        try:
+            parts = pool.map(_ensemble_task, tasks)
+        finally:
+            pool.close()
+            pool.join()
+        results = {name: np.concatenate([part[name] for part in parts]) for name in parts[0] if name != 'n_hulls'}
+        results['n_hulls'] = sum(part['n_hulls'] for part in parts)
+        return results
+
+    def _hull_energy(self, coords):
+        def get_structure(pd, sample):
+            facet, amounts = self.find_facet(self.get_facets(pd), coords)
+            return [facet], (facet, amounts)
+
+        def evaluate(data, samples):
+            facet, amounts = data
+            names = ", ".join(sorted(self.entries[i].name for i, amt in zip(facet, amounts) if amt > TOL))
+            return {'hull_energy': np.dot(amounts, self.energies[list(facet)][:, samples]),
+                    'decomposition': [names] * len(samples)}
+
+        return self._run(get_structure, evaluate)
+
+    def _stability_window(self, index, oe):
+        oe_index = [el.symbol for el in self.elements].index(oe)
+        ref_indices = [i for i, e in enumerate(self.entries) if e.composition.is_element and oe in e.composition]
+
+        def get_structure(pd, sample):
+            facets = self.get_facets(pd)
+            star = [facet for facet in facets if index in facet]
+            if star:
+                return star, star
+            # Not on the hull in this sample
+            return [self.find_facet(facets, self.X[index])[0]], None
+
+        def evaluate(star, samples):
+            if star is None:
+                return {'mu_high': np.full(len(samples), np.nan), 'mu_low': np.full(len(samples), np.nan)}
+            # The region of a stable phase in chemical potential space has the facets around it as vertices
+            mus = np.array([self.get_facet_mu(facet, samples)[oe_index] for facet in star])
+            ref = self.energies[ref_indices][:, samples].min(axis=0)
+            mu_low = mus.min(axis=0) - ref
+            if self.X[index, oe_index] == 0:
+                # Without the open element, the phase is stable down to -inf
+                mu_low = np.full(len(samples), np.nan)
+            return {'mu_high': mus.max(axis=0) - ref, 'mu_low': mu_low}
+
+        return self._run(get_structure, evaluate)
+
+    def _mixing(self, index1, index2):
+        x1, x2 = self.X[index1], self.X[index2]
+
+        def get_structure(pd, sample):
+            entry1, entry2 = [VirtualEntry.from_composition(self.entries[i].composition.fractional_composition,
+                                                            energy=self.energies[i, sample],
+                                                            name=self.entries[i].name) for i in (index1, index2)]
+            profile = clean_profile(get_full_evolution_profile(pd, entry1, entry2, 0.0, 1.0))
+            xs = np.array([step[0] for step in profile])
+            steps = []
+            for x, (decomp, h) in profile:
+                support = [e.attribute for e in decomp]
+                amounts = np.linalg.lstsq(self.X[support].T, x * x1 + (1 - x) * x2, rcond=None)[0]
+                steps.append((support, amounts, ", ".join(sorted(e.name for e in decomp))))
+            facets = self.get_facets(pd)
+            path_facets = [self.find_facet(facets, mid * x1 + (1 - mid) * x2)[0]
+                           for mid in (xs[1:] + xs[:-1]) / 2.0]
+            return path_facets, (xs, steps)
+
+        def evaluate(data, samples):
+            xs, steps = data
+            energies = self.energies[:, samples]
+            hull = np.array([np.dot(amounts, energies[support]) for support, amounts, names in steps])
+            rxn_e = hull - (xs[:, None] * energies[index1] + (1 - xs[:, None]) * energies[index2])
+            mutual = rxn_e - xs[:, None] * rxn_e[-1] - (1 - xs[:, None]) * rxn_e[0]
+            loc = mutual.argmin(axis=0)
+            return {'min_mutual_rxn_e': mutual[loc, np.arange(len(samples))],
+                    'min_rxn_e': rxn_e.min(axis=0),
+                    'min_x': xs[loc],
+                    'min_phase_equilibria': [steps[i][2] for i in loc]}
+
+        return self._run(get_structure, evaluate)
+
+    def get_hull_energy_samples(self, comp, processes=1):
+        """
+        :return: {"hull_energy": hull energy (eV/atom) of each sample, "decomposition": phase equilibria names of
+                  each sample, "n_hulls": number of hulls built}
+        """
+        return self._compute('_hull_energy', (self.get_coords(comp),), processes)
+
+    def get_e_above_hull_samples(self, entry, processes=1):
+        """
+        :param entry: an entry in the ensemble
+        :return: e above hull (eV/atom) of each sample
+        """
+        index = self.index(entry)
+        hull_energy = self.get_hull_energy_samples(entry.composition, processes=processes)['hull_energy']
+        return self.energies[index] - hull_energy
+
+    def stabilize(self, entry, processes=1):
+        """
+        Same as VirtualEntry.stabilize for each sample: the entry is put on the hull of each sample.
+        :return: a new ensemble with the stabilized entry appended
+        """
+        hull_energy = self.get_hull_energy_samples(entry.composition, processes=processes)['hull_energy']
+        return self.add_entry(entry, hull_energy - 1e-8 / entry.composition.num_atoms)
+
+    def get_stability_window_samples(self, entry, open_el, processes=1):
+        """
+        Same as VirtualEntry.get_stability_window for each sample, referenced to the pure open element.
+        :param entry: an entry in the ensemble, usually a stabilized one
+        :return: {"mu_high": array, "mu_low": array, "n_hulls": int}. nan for unstable samples; mu_low is nan
+                 if the phase is stable down to -inf.
+        """
+        return self._compute('_stability_window', (self.index(entry), str(Element(open_el))), processes)
+
+    def get_mixing_samples(self, entry1, entry2, processes=1):
+        """
+        Same as PseudoBinary.pd_mixing for each sample. Both entries must be in the ensemble, usually stabilized.
+        :return: {"min_mutual_rxn_e", "min_rxn_e" (eV/atom), "min_x", "min_phase_equilibria": arrays over samples,
+                  "n_hulls": int}
+        """
+        return self._compute('_mixing', (self.index(entry1), self.index(entry2)), processes)
+
+
+def _ensemble_task(task):
+    ensemble, method, args = task
+    return getattr(ensemble, method)(*args)
+
+
+def get_confidence_interval(values, ci=0.95):
+    """
+    :return: {"mean", "std", "low", "high", "n"} of the finite values, low/high being the central ci interval.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return {'mean': None, 'std': None, 'low': None, 'high': None, 'n': 0}
+    low, high = np.percentile(values, [(1 - ci) / 2 * 100, (1 + ci) / 2 * 100])
+    return {'mean': float(values.mean()), 'std': float(values.std()), 'low': float(low), 'high': float(high),
+            'n': int(values.size)}
+
+
+def get_frequencies(labels):
+    """
+    :return: list of (label, fraction of samples), most frequent first
+    """
+    counts = Counter(label for label in labels if label is not None)
+    total = float(sum(counts.values()))
+    return [(label, n / total) for label, n in counts.most_common()]
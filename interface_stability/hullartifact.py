@@ -0,0 +1,201 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+from monty.json import MontyDecoder, MontyEncoder
+from pymatgen import Composition
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+from interface_stability.singlephase import VirtualEntry, PD_PRELOAD_PATH
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+"""
+A built convex hull stored as plain numpy arrays, so that it can be loaded without decoding entries or running qhull.
+
+An artifact is a folder of .npy files plus a meta.json. The .npy files are loaded with memory mapping (read-only),
+so many worker processes on one node share the same physical memory through the page cache.
+(.npz archives can not be memory-mapped by numpy, which is why a folder is used.)
+"""
+
+HULL_ARTIFACT_VERSION = 1
+NUMERICAL_TOL = 1e-8
+
+_ARRAYS = ('qhull_data', 'facets', 'aug_inv', 'energies')
+
+
+def export_hull_artifact(pd, path, overwrite=False):
+    """
+    Save a PhaseDiagram to a hull artifact folder. The folder is written to a temporary place first and then
+    moved, so readers never see a partially written artifact.
+    If the artifact already exists, e.g. exported by another worker at the same time, it is kept as it is and the
+    new one is discarded, so that an artifact is never removed while other processes use it.
+
+    :param pd: PhaseDiagram object
+    :param path: the artifact folder path
+    :param overwrite: replace an existing artifact. The old folder is moved aside before the new one is moved in,
+        and removed afterwards; processes that already memory-mapped its files keep reading them.
+    :return: path
+    """
+    qhull_data = np.array(pd.qhull_data, dtype=float)
+    facets = np.array(pd.facets, dtype=np.int64).reshape(-1, pd.dim)
+    # Inverse of the augmented simplex matrices, the same as pymatgen Simplex uses for barycentric coordinates
+    aug = np.concatenate([qhull_data[facets][:, :, :-1], np.ones(facets.shape + (1,))], axis=-1)
+    aug_inv = np.linalg.inv(aug)
+    energies = np.array([e.energy_per_atom for e in pd.qhull_entries], dtype=float)
+
+    stable_index = sorted(set(facets.flatten().tolist()))
+    meta = {'version': HULL_ARTIFACT_VERSION,
+            'elements': [el.symbol for el in pd.elements],
+            'el_refs': {el.symbol: e.energy_per_atom for el, e in pd.el_refs.items()},
+            'stable_index': stable_index,
+            'names': [pd.qhull_entries[i].name for i in stable_index],
+            'entries': [pd.qhull_entries[i] for i in stable_index]}
+
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp_path = tempfile.mkdtemp(dir=parent, prefix='.tmp_hull_')
+    try:
+        for name, array in zip(_ARRAYS, (qhull_data, facets, aug_inv, energies)):
+            np.save(os.path.join(tmp_path, name + '.npy'), array)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, cls=MontyEncoder)
+        old_path = None
+        if overwrite and os.path.isdir(path):
+            old_path = tempfile.mkdtemp(dir=parent, prefix='.old_hull_')
+            os.rename(path, os.path.join(old_path, 'hull'))
+        if not os.path.isdir(path):
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # Moved in by another worker in the meantime
+                if not os.path.isdir(path):
+                    raise
+        if old_path:
+            shutil.rmtree(old_path, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return path
+
+
+class HullArtifact(object):
+    """
+    Read-only convex hull loaded from an artifact folder.
+    It answers the decomposition queries in the same way as PhaseDiagram, so it can be used in place of
+    a PhaseDiagram object for get_decomp_and_e_above_hull, e.g. in get_full_evolution_profile for pd_mixing.
+    Entries are only decoded on first use of get_decomposition / get_decomp_and_e_above_hull.
+    """
+
+    def __init__(self, path, mmap=True):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != HULL_ARTIFACT_VERSION:
+            raise ValueError("Hull artifact {} has version {}, version {} is required. Please export it again."
+                             .format(path, meta.get('version'), HULL_ARTIFACT_VERSION))
+        mmap_mode = 'r' if mmap else None
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode))
+        self.path = path
+        self.elements = meta['elements']
+        self.el_refs = meta['el_refs']
+        self.stable_names = dict(zip(meta['stable_index'], meta['names']))
+        self._entry_dicts = dict(zip(meta['stable_index'], meta['entries']))
+        self._entries = {}
+
+    @property
+    def dim(self):
+        return len(self.elements)
+
+    def _get_entry(self, index):
+        if index not in self._entries:
+            self._entries[index] = MontyDecoder().process_decoded(self._entry_dicts[index])
+        return self._entries[index]
+
+    @property
+    def stable_entries(self):
+        return set(self._get_entry(i) for i in self.stable_names)
+
+    def pd_coords(self, comp):
+        comp = Composition(comp)
+        if any(el.symbol not in self.elements for el in comp.elements):
+            raise ValueError("{} is not in the chemical system of the hull {}".format(comp.reduced_formula,
+                                                                                    "-".join(self.elements)))
+        return np.array([comp.get_atomic_fraction(el) for el in self.elements[1:]])
+
+    def get_facet_and_bary_coords(self, comp):
+        """
+        Find the facet containing the composition and its barycentric coordinates, vectorized over all facets.
+        :return: (indices of facet vertices, barycentric coordinates)
+        """
+        point = np.append(self.pd_coords(comp), 1.0)
+        bary = np.einsum('k,fkj->fj', point, self.aug_inv)
+        inside = np.where(bary.min(axis=1) >= -NUMERICAL_TOL / 10)[0]
+        if len(inside) == 0:
+            raise ValueError("No facet found for {}".format(Composition(comp).reduced_formula))
+        return np.array(self.facets[inside[0]]), bary[inside[0]]
+
+    def get_decomposition_names(self, comp):
+        """
+        Lightweight decomposition query, which does not decode any entry.
+        :return: {stable entry name: amount (fraction of atoms)}
+        """
+        facet, amts = self.get_facet_and_bary_coords(comp)
+        return {self.stable_names[f]: amt for f, amt in zip(facet, amts) if abs(amt) > NUMERICAL_TOL}
+
+    def get_decomposition(self, comp):
+        facet, amts = self.get_facet_and_bary_coords(comp)
+        return {self._get_entry(f): amt for f, amt in zip(facet, amts) if abs(amt) > NUMERICAL_TOL}
+
+    def get_hull_energy(self, comp):
+        """
+        :return: the hull energy (total energy, not per atom) at the given composition
+        """
+        facet, amts = self.get_facet_and_bary_coords(comp)
+        return float(np.dot(amts, self.energies[facet])) * Composition(comp).num_atoms
+
+    def get_decomp_and_e_above_hull(self, entry, allow_negative=False):
+        facet, amts = self.get_facet_and_bary_coords(entry.composition)
+        decomp = {self._get_entry(f): amt for f, amt in zip(facet, amts) if abs(amt) > NUMERICAL_TOL}
+        ehull = entry.energy_per_atom - float(np.dot(amts, self.energies[facet]))
+        if allow_negative or ehull >= -NUMERICAL_TOL:
+            return decomp, ehull
+        raise ValueError("No valid decomp found!")
+
+    def get_e_above_hull(self, entry):
+        return self.get_decomp_and_e_above_hull(entry)[1]
+
+
+def get_hull_artifact_path(chemsys, folder=None):
+    """
+    The default artifact location is next to the cached entries in PMG_PD_PRELOAD_PATH
+    """
+    folder = folder if folder else PD_PRELOAD_PATH
+    if folder is None:
+        raise ValueError("No folder is given for hull artifacts. "
+                         "Please set up PMG_PD_PRELOAD_PATH in ~/.pmgrc.yaml")
+    el_list = sorted(set(str(el) for el in chemsys))
+    return os.path.join(folder, "_".join(el_list) + "_Hull")
+
+
+def load_hull_artifact(chemsys, entries=None, folder=None):
+    """
+    Load the hull artifact of a chemical system. If it does not exist, build the PhaseDiagram from entries
+    (or from the cached/MP entries if entries is None) and export it first.
+    """
+    path = get_hull_artifact_path(chemsys, folder=folder)
+    if not os.path.isdir(path):
+        if not entries:
+            entries = VirtualEntry.get_PD_entries_from_preload_file(chemsys)
+        # If another worker exported it in the meantime, its artifact is used
+        export_hull_artifact(PhaseDiagram(entries), path)
+    return HullArtifact(path)
@@ -0,0 +1,161 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+"""
+Lazy evaluation of the intermediate results of an analysis (entries, hulls, grand potential hulls, transition
+chemical potentials, profiles...), with the dependencies between them.
+
+Each result is a node, which is either an input or computed from other nodes. A computed node is only computed
+when it is first asked for, and then cached. Changing an input drops the cached values of the nodes depending on
+it, directly or not, and only those: e.g. an energy correction of an end member recomputes the hull with it and
+the profiles on this hull, but not the entries fetched from MP.
+"""
+
+
+def _is_same(value1, value2):
+    if value1 is value2:
+        return True
+    if isinstance(value1, (int, float, str, tuple)) and type(value1) == type(value2):
+        return value1 == value2
+    return False
+
+
+class LazyGraph(object):
+    """
+    Node names can be any hashable, e.g. ('gppd', 'Li', -2.0) for parametrized nodes.
+    """
+
+    def __init__(self):
+        self._functions = {}
+        self._dependencies = {}
+        self._dependants = {}
+        self._values = {}
+        # Number of computations of each node, to check that nothing is computed twice
+        self.n_computed = {}
+
+    def __contains__(self, name):
+        return name in self._functions or name in self._values
+
+    def is_input(self, name):
+        return name in self._values and name not in self._functions
+
+    def is_cached(self, name):
+        return name in self._values
+
+    def get_cached_names(self):
+        return list(self._values)
+
+    def set_input(self, name, value):
+        """
+        Set the value of an input. If it changes, the cached nodes depending on it are dropped.
+        """
+        if name in self._functions:
+            raise ValueError("{} is a computed node, not an input".format(name))
+        if name in self._values and _is_same(self._values[name], value):
+            return
+        self.invalidate(name)
+        self._values[name] = value
+
+    def add_node(self, name, function, dependencies=()):
+        """
+        Add a computed node. function is called with the values of dependencies when the node is first asked for.
+        Adding a node again replaces it, and drops the cached nodes depending on it.
+        """
+        if self.is_input(name):
+            raise ValueError("{} is an input".format(name))
+        if name in self._functions:
+            self.invalidate(name)
+            for dependency in self._dependencies[name]:
+                self._dependants[dependency].discard(name)
+        self._functions[name] = function
+        self._dependencies[name] = tuple(dependencies)
+        for dependency in dependencies:
+            self._dependants.setdefault(dependency, set()).add(name)
+
+    def get(self, name):
+        if name in self._values:
+            return self._values[name]
+        if name not in self._functions:
+            raise KeyError("No node {}".format(name))
+        args = [self.get(dependency) for dependency in self._dependencies[name]]
+        value = self._functions[name](*args)
+        self._values[name] = value
+        self.n_computed[name] = self.n_computed.get(name, 0) + 1
+        return value
+
+    def get_or_add(self, name, function, dependencies=()):
+        """
+        Get a node, adding it first if it does not exist yet.
+        """
+        if name not in self:
+            self.add_node(name, function, dependencies)
+        return self.get(name)
+
+    def invalidate(self, name):
+        """
+        Drop the cached values of all nodes depending on name, and of name itself if it is not an input.
+        """
+        if name in self._functions:
+            self._values.pop(name, None)
+        stack = list(self._dependants.get(name, ()))
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            self._values.pop(node, None)
+            stack.extend(self._dependants.get(node, ()))
+
+
+# Names of the nodes shared by VirtualEntry and PseudoBinary, so that the same node always gets the same name
+
+def _get_chemsys_key(chemsys):
+    return tuple(sorted(set(str(el) for el in chemsys)))
+
+
+def get_entries_node_name(chemsys, trypreload=False, e_above_hull_cutoff=None):
+    """
+    Fetched (and pruned with e_above_hull_cutoff) entries of a chemical system
+    """
+    return 'entries', _get_chemsys_key(chemsys), bool(trypreload), e_above_hull_cutoff
+
+
+def parse_entries_node_name(name):
+    """
+    :return: (chemsys, trypreload, e_above_hull_cutoff) of a name given by get_entries_node_name, None for other names
+    """
+    if isinstance(name, tuple) and len(name) == 4 and name[0] == 'entries':
+        return name[1:]
+    return None
+
+
+def get_pd_node_name(chemsys, trypreload=False):
+    """
+    PhaseDiagram of the fetched entries of a chemical system
+    """
+    return 'pd', _get_chemsys_key(chemsys), bool(trypreload)
+
+
+def get_gppd_node_name(chempot, chemsys, trypreload=False):
+    """
+    GrandPotentialPhaseDiagram at chempot of the fetched entries of a chemical system
+    """
+    return ('gppd', tuple(sorted((str(el), mu) for el, mu in chempot.items()))) + \
+        get_pd_node_name(chemsys, trypreload)[1:]
+
+
+def get_open_element_node_name(kind, open_el, *params):
+    """
+    Nodes of an analysis with an open element, e.g. ('gppd_profile', 'Li', -2.0)
+    """
+    return (kind, str(open_el)) + params
@@ -0,0 +1,118 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+import time
+import itertools
+
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+"""
+Removal of entries far above the hull before building the PhaseDiagram of a large chemical system.
+
+An entry is only removed when a lower bound of its energy above hull exceeds the cutoff. The hull energy given by
+any subset of the entries is never below the true hull energy, so the energy above such a partial hull is a lower
+bound of the true energy above hull. Two partial hulls are used:
+    1. the lowest polymorph of the same composition,
+    2. the hull of the small sub-systems (at most max_sub_dim elements), which is the exact hull for the entries
+       of these sub-systems, and whose stable entries bound the entries with more elements.
+Everything on the hull, or within the cutoff above it, is kept, so the hull is not changed by the pruning.
+"""
+
+
+def _get_chemsys(entry):
+    return tuple(sorted(el.symbol for el in entry.composition.elements))
+
+
+def _get_hull_energy_per_atom(pd, entry):
+    return pd.get_hull_energy(entry.composition) / entry.composition.num_atoms
+
+
+def prune_entries(entries, e_above_hull_cutoff=0.1, max_sub_dim=3, benchmark=False):
+    """
+    :param entries: entries of a chemical system
+    :param e_above_hull_cutoff: entries above the hull by more than this (eV/atom) are removed. Must be >= 0.
+    :param max_sub_dim: the largest sub-systems for which a hull is built
+    :param benchmark: also build the PhaseDiagram with all entries and with the kept entries to measure the speedup
+    :return: (kept entries, report dict). The report gives the number of entries, the number removed as redundant
+             polymorphs and as high energy entries, and the time of the pruning (s). With benchmark, also the hull
+             build time with all entries and with the kept entries (s), and the speedup including the pruning.
+    """
+    if e_above_hull_cutoff < 0:
+        raise ValueError("The e above hull cutoff must not be negative, otherwise stable entries are removed")
+    start = time.time()
+    entries = list(entries)
+
+    # Redundant polymorphs
+    lowest = {}
+    for e in entries:
+        formula = e.composition.reduced_formula
+        if formula not in lowest or e.energy_per_atom < lowest[formula]:
+            lowest[formula] = e.energy_per_atom
+    kept = [e for e in entries if e.energy_per_atom - lowest[e.composition.reduced_formula] <= e_above_hull_cutoff]
+    n_polymorphs = len(entries) - len(kept)
+
+    groups = {}
+    for e in kept:
+        groups.setdefault(_get_chemsys(e), []).append(e)
+
+    # Exact hulls of the small sub-systems
+    removed = set()
+    stable = {}
+    for chemsys in sorted((c for c in groups if len(c) <= max_sub_dim), key=len):
+        sub_entries = [e for c in groups for e in groups[c] if set(c) <= set(chemsys)]
+        try:
+            pd = PhaseDiagram(sub_entries)
+        except ValueError:
+            # Missing elemental references, nothing can be bounded
+            continue
+        stable[chemsys] = pd.stable_entries
+        for e in groups[chemsys]:
+            if e.energy_per_atom - _get_hull_energy_per_atom(pd, e) > e_above_hull_cutoff:
+                removed.add(id(e))
+
+    # Entries with more elements are bounded by the hull of the stable entries of the small sub-systems
+    for chemsys in (c for c in groups if len(c) > max_sub_dim):
+        boundary = {}
+        for size in range(1, max_sub_dim + 1):
+            for sub in itertools.combinations(chemsys, size):
+                for e in stable.get(sub, []):
+                    boundary[id(e)] = e
+        try:
+            pd = PhaseDiagram(list(boundary.values()))
+        except ValueError:
+            continue
+        for e in groups[chemsys]:
+            if e.energy_per_atom - _get_hull_energy_per_atom(pd, e) > e_above_hull_cutoff:
+                removed.add(id(e))
+
+    kept = [e for e in kept if id(e) not in removed]
+    report = {'n_entries': len(entries), 'n_kept': len(kept), 'n_polymorphs': n_polymorphs,
+              'n_high_energy': len(removed), 'prune_time': time.time() - start}
+    if benchmark:
+        start = time.time()
+        PhaseDiagram(entries)
+        report['hull_time_full'] = time.time() - start
+        start = time.time()
+        PhaseDiagram(kept)
+        report['hull_time_pruned'] = time.time() - start
+        report['speedup'] = report['hull_time_full'] / (report['hull_time_pruned'] + report['prune_time'])
+    return kept, report
+
+
+def get_printable_pruning_report(report):
+    string = "Pruned {} of {} entries ({} redundant polymorphs, {} high energy entries) in {:.2f} s".format(
+        report['n_entries'] - report['n_kept'], report['n_entries'], report['n_polymorphs'],
+        report['n_high_energy'], report['prune_time'])
+    if 'speedup' in report:
+        string += "\nHull build: {:.2f} s with all entries, {:.2f} s after pruning, speedup {:.1f}x".format(
+            report['hull_time_full'], report['hull_time_pruned'], report['speedup'])
+    return string
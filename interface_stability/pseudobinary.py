@@ -2,11 +2,15 @@
 # Copyright (c) Mogroup  @ University of Maryland, College Park
 # Distributed under the terms of the MIT License.
 
+import numpy as np
 import pandas
 from pymatgen import Composition, Element
 from pymatgen.analysis.phase_diagram import PhaseDiagram, GrandPotentialPhaseDiagram, GrandPotPDEntry
 from pymatgen.analysis.reaction_calculator import ComputedReaction, ReactionError
 from interface_stability.singlephase import VirtualEntry
+from interface_stability.lazygraph import LazyGraph, get_open_element_node_name
+from interface_stability.chempotindex import TransitionChempotIndex
+from interface_stability.rxncurve import MixingReactionEnergyCurve
 
 
 __author__ = "Yizhou Zhu"
@@ -31,6 +35,39 @@ class PseudoBinary(object):
     """
 
     def __init__(self, entry1, entry2, entries=None, sup_el=None):
+        """
+        Nothing is fetched or computed here: entries, hulls, transition chemical potentials and profiles are nodes
+        of graph (a LazyGraph), computed when they are first needed and then reused by all analyses.
+        :param entries: entries of the chemical system, without entry1 and entry2. Fetched from MP if None.
+        :param sup_el: extra elements of the chemical system when entries are fetched
+        """
+        self.graph = LazyGraph()
+        self.sup_el = [str(el) for el in sup_el] if sup_el else []
+        self._set_end_members(entry1, entry2)
+        if entries:
+            self.graph.set_input('entries', list(entries))
+        else:
+            entry_mix = VirtualEntry.from_composition(entry1.composition + entry2.composition)
+            self.graph.add_node('entries', lambda: entry_mix.get_PD_entries(sup_el=sup_el))
+        self.graph.add_node('pd_entries', lambda entries, end_members: entries + list(end_members),
+                            ['entries', 'end_members'])
+        self.graph.add_node('pd', lambda entries: PhaseDiagram(entries), ['pd_entries'])
+        self.graph.add_node('pd_profile', lambda pd, end_members: clean_profile(get_full_evolution_profile(
+            pd, self.entry1, self.entry2, 0.0, 1.0)), ['pd', 'end_members'])
+
+    @property
+    def PDEntries(self):
+        return self.graph.get('pd_entries')
+
+    @property
+    def PD(self):
+        return self.graph.get('pd')
+
+    def _set_end_members(self, entry1, entry2):
+        """
+        Set the end members, e.g. after an energy correction. Only the hull with them and what depends on it are
+        computed again.
+        """
         comp1 = entry1.composition
         comp2 = entry2.composition
         norm1 = 1.0 / entry1.composition.num_atoms
@@ -40,13 +77,18 @@ class PseudoBinary(object):
                                                     name=comp1.reduced_formula)
         self.entry2 = VirtualEntry.from_composition(entry2.composition * norm2, energy=entry2.energy * norm2,
                                                     name=comp2.reduced_formula)
+        self.graph.set_input('end_members', (entry1, entry2))
 
-        if not entries:
-            entry_mix = VirtualEntry.from_composition(comp1 + comp2)
-            entries = entry_mix.get_PD_entries(sup_el=sup_el)
-        entries += [entry1, entry2]
-        self.PDEntries = entries
-        self.PD = PhaseDiagram(entries)
+    def energy_correction(self, e1=0.0, e2=0.0):
+        """
+        Apply energy corrections (eV/atom) to copies of the end members, as the -e1/-e2 options of pseudo_binary.
+        """
+        entries = []
+        for entry, e in zip(self.graph.get('end_members'), [e1, e2]):
+            comp = entry.composition
+            entries.append(VirtualEntry.from_composition(comp, energy=entry.energy + e * comp.num_atoms,
+                                                         name=comp.reduced_formula))
+        self._set_end_members(*entries)
 
     def __eq__(self, other):
         return self.__dict__ == other.__dict__
@@ -57,9 +99,7 @@ class PseudoBinary(object):
         It will give a complete evolution profile for mixing ratio x change from 0 to 1.
         x is the ratio (both entry norm. to 1 atom/fu) or each entry
         """
-        profile = get_full_evolution_profile(self.PD, self.entry1, self.entry2, 0.0, 1.0)
-        cleaned = clean_profile(profile)
-        return cleaned
+        return self.graph.get('pd_profile')
 
     def get_printable_pd_profile(self):
         return self.get_printed_profile(self.pd_mixing())
@@ -116,41 +156,247 @@ class PseudoBinary(object):
         x is the ratio (both entry norm. to 1 atom/fu(w/o open element) ) or each entry
         """
         open_el = list(chempots.keys())[0]
-        el_ref = VirtualEntry.get_mp_entry(open_el)
-        chempots[open_el] = chempots[open_el] + el_ref.energy_per_atom
+        mu = chempots[open_el]
+        if gppd_entries:
+            chempots = {open_el: mu + self.get_el_ref(open_el).energy_per_atom}
+            return self.get_gppd_profile(GrandPotentialPhaseDiagram(gppd_entries, chempots), chempots)
+        return self.graph.get(self._add_gppd_nodes(open_el, mu))
+
+    def get_gppd_profile(self, gppd, chempots):
+        """
+        :param chempots: chemical potentials of gppd, not referenced to the pure element
+        """
         gppd_entry1 = GrandPotPDEntry(self.entry1, {Element[_]: chempots[_] for _ in chempots})
         gppd_entry2 = GrandPotPDEntry(self.entry2, {Element[_]: chempots[_] for _ in chempots})
-        if not gppd_entries:
-            gppd_entries = self.get_gppd_entries(open_el)
-        gppd = GrandPotentialPhaseDiagram(gppd_entries, chempots)
         profile = get_full_evolution_profile(gppd, gppd_entry1, gppd_entry2, 0, 1)
         cleaned = clean_profile(profile)
         return cleaned
 
-    def get_gppd_entries(self, open_el):
-        if open_el in (self.entry1.composition + self.entry2.composition).keys():
-            gppd_entries = self.PDEntries
+    def get_el_ref(self, open_el):
+        """
+        Pure open element entry from MP, the reference of the chemical potentials.
+        """
+        return self.graph.get(self._add_el_ref_node(open_el))
+
+    def _add_el_ref_node(self, open_el):
+        name = get_open_element_node_name('el_ref', open_el)
+        if name not in self.graph:
+            self.graph.add_node(name, lambda: VirtualEntry.get_mp_entry(str(open_el)))
+        return name
+
+    def _add_open_element_nodes(self, open_el):
+        """
+        Add the nodes of the entries, the hull and the transition chemical potentials with the open element.
+        The hull is the one of pd_mixing if its entries include the open element, otherwise the entries with the
+        open element are fetched (and do not depend on the end members).
+        :return: name of the hull node
+        """
+        open_el = str(open_el)
+        name = get_open_element_node_name('gppd_pd', open_el)
+        entries_name = get_open_element_node_name('gppd_entries', open_el)
+        if name in self.graph:
+            return name
+        comp = self.entry1.composition + self.entry2.composition
+        if self.graph.is_input('entries'):
+            has_open_el = any(e.composition.is_element and open_el in e.composition for e in self.graph.get('entries'))
         else:
-            comp = self.entry1.composition + self.entry2.composition + Composition(open_el.symbol)
-            gppd_entries = VirtualEntry.from_composition(comp).get_GPPD_entries(open_el)
-        return gppd_entries
+            has_open_el = open_el in self.sup_el
+        if has_open_el or open_el in [el.symbol for el in comp.elements]:
+            self.graph.add_node(entries_name, lambda entries: entries, ['pd_entries'])
+            self.graph.add_node(name, lambda pd: pd, ['pd'])
+        else:
+            self.graph.add_node(entries_name, lambda: VirtualEntry.from_composition(
+                comp + Composition(open_el)).get_PD_entries())
+            self.graph.add_node(name, lambda entries: PhaseDiagram(entries), [entries_name])
+        self.graph.add_node(get_open_element_node_name('transition_chempots', open_el), lambda pd, el_ref: [
+            miu - el_ref.energy_per_atom for miu in pd.get_transition_chempots(Element(open_el))],
+            [name, self._add_el_ref_node(open_el)])
+        return name
+
+    def _add_gppd_nodes(self, open_el, mu):
+        """
+        Add the nodes of the grand potential hull and the mixing profile at mu (referenced to the pure element).
+        Only the stable entries of the hull with the open element go into the grand potential hull.
+        :return: name of the profile node
+        """
+        open_el = str(open_el)
+        name = get_open_element_node_name('gppd_profile', open_el, mu)
+        if name in self.graph:
+            return name
+
+        def get_gppd(pd, el_ref):
+            chempots = {open_el: mu + el_ref.energy_per_atom}
+            return GrandPotentialPhaseDiagram(pd.stable_entries, chempots), chempots
+        gppd_name = get_open_element_node_name('gppd', open_el, mu)
+        self.graph.add_node(gppd_name, get_gppd,
+                            [self._add_open_element_nodes(open_el), self._add_el_ref_node(open_el)])
+        self.graph.add_node(name, lambda gppd, end_members: self.get_gppd_profile(*gppd),
+                            [gppd_name, 'end_members'])
+        return name
+
+    def _add_window_index_node(self, open_el):
+        """
+        Add the node of the TransitionChempotIndex of the hull with the open element and the end members, which
+        gives the stability windows of all phases of the PD mixing profile.
+        """
+        open_el = str(open_el)
+        name = get_open_element_node_name('window_index', open_el)
+        if name in self.graph:
+            return name
+        self._add_open_element_nodes(open_el)
+
+        def get_index(pd, gppd_entries):
+            elements = set(el.symbol for el in pd.elements)
+            if open_el not in elements:
+                # The hull of the PD is a face of the hull with the open element, so only its stable entries are needed
+                pd = PhaseDiagram(list(pd.stable_entries) + [e for e in gppd_entries if not set(
+                    el.symbol for el in e.composition.elements) <= elements])
+            return TransitionChempotIndex.from_pd(pd, open_el)
+        self.graph.add_node(name, get_index, ['pd', get_open_element_node_name('gppd_entries', open_el)])
+        return name
+
+    def get_interface_window_data(self, open_el):
+        """
+        Electrochemical stability window of the interface phase equilibria at each mixing ratio of the PD mixing
+        profile, i.e. the chemical potential range where all phases of the phase equilibria are stable.
+        The mixing hull and one hull with the open element are used for all mixing ratios.
+
+        :param open_el: open element
+        :return: list of dicts, one per step of pd_mixing. x is the ratio of entry1 (as in get_profile_data).
+            'mu_high' and 'mu_low' are referenced to the pure element, 'mu_low' is None for -inf.
+            Both are None if the phase equilibria are never stable together.
+        """
+        open_el = str(open_el)
+        index = self.graph.get(self._add_window_index_node(open_el))
+        data = []
+        for ratio, (decomp, e) in self.pd_mixing():
+            windows = []
+            for entry in decomp:
+                if entry.composition.is_element and open_el in entry.composition:
+                    # The pure open element is only stable at its own chemical potential
+                    windows.append((0.0, 0.0))
+                else:
+                    windows.append(index.get_stability_window(entry.name))
+            mu_high, mu_low = get_window_intersection(windows)
+            data.append({'x': ratio, 'phase_equilibria': sorted([x.name for x in decomp]),
+                         'mu_high': mu_high, 'mu_low': mu_low})
+        return data
+
+    def get_printable_interface_window_data(self, open_el):
+        data = self.get_interface_window_data(open_el)
+        df = pandas.DataFrame()
+        df["x({})".format(self.entry2.name)] = [1 - step['x'] for step in data]
+        df["x({})".format(self.entry1.name)] = [step['x'] for step in data]
+        df["mu_high (eV)"] = ['-' if step['mu_high'] is None else '{:.2f}'.format(step['mu_high']) for step in data]
+        df["mu_low (eV)"] = ['-' if step['mu_high'] is None else '-inf' if step['mu_low'] is None
+                             else '{:.2f}'.format(step['mu_low']) for step in data]
+        df["Phase Equilibria"] = [", ".join(step['phase_equilibria']) for step in data]
+        print_df = df.to_string(index=False, float_format='{:,.2f}'.format, justify='center')
+        output = ['\n ===  Electrochemical window of the interface phase equilibria  === ', print_df,
+                  'Note: chemical potential of {} referenced to element phase. "-" means never stable.'.format(
+                      open_el)]
+        return '\n'.join(output)
 
-    def get_gppd_transition_chempots(self, open_el, gppd_entries=None):
+    def get_gppd_entries(self, open_el):
+        self._add_open_element_nodes(open_el)
+        return self.graph.get(get_open_element_node_name('gppd_entries', open_el))
+
+    def get_gppd_transition_chempots(self, open_el, gppd_entries=None, chempot_index=None):
         """
         This is to get all possible transition chemical potentials from PD (rather than GPPD)
         Still use pure element ref.
         # May consider supporting negative miu in the future
+        :param chempot_index: a TransitionChempotIndex of the same chemical system and open element. It is used
+            instead of building the PD if both entries are on or above its hull.
         """
+        if chempot_index is not None and self.is_covered_by_chempot_index(open_el, chempot_index):
+            return list(chempot_index.transition_chempots)
         if not gppd_entries:
-            gppd_entries = self.get_gppd_entries(open_el)
+            self._add_open_element_nodes(open_el)
+            return list(self.graph.get(get_open_element_node_name('transition_chempots', open_el)))
         pd = PhaseDiagram(gppd_entries)
         vaspref_mius = pd.get_transition_chempots(Element(open_el))
-        el_ref = VirtualEntry.get_mp_entry(open_el)
+        el_ref = self.get_el_ref(open_el)
 
         elref_mius = [miu - el_ref.energy_per_atom for miu in vaspref_mius]
         return elref_mius
 
-    def gppd_scanning(self, open_el, mu_hi, mu_lo, gppd_entries=None, verbose=False):
+    def is_covered_by_chempot_index(self, open_el, chempot_index):
+        chemsys = set(el.symbol for el in (self.entry1.composition + self.entry2.composition).elements)
+        return chempot_index.open_el == str(open_el) and set(chempot_index.chemsys) == chemsys | {str(open_el)} \
+            and chempot_index.is_on_or_above_hull(self.entry1) and chempot_index.is_on_or_above_hull(self.entry2)
+
+    def get_gppd_rxn_e_curve(self, open_el, mu_hi, mu_lo, gppd_entries=None, chempot_index=None):
+        """
+        Reaction energies at the mutual reaction energy minimum between two chemical potentials, as a
+        MixingReactionEnergyCurve which is evaluated on mu arrays without any more GPPD.
+        The GPPD mixing profile is computed in the middle of each interval between transition chemical potentials
+        (adjacent intervals with the same profile are merged), plus once more in the merged intervals of one.
+
+        :param open_el: open element
+        :param mu_hi:  chemical potential upper bound
+        :param mu_lo:  chemical potential lower bound
+        :param gppd_entries: Supply GPPD entries manually. If you supply this, I assume you know what you are doing
+        :param chempot_index: TransitionChempotIndex to get the transition chemical potentials from
+        """
+        mu_lo, mu_hi = sorted([mu_lo, mu_hi])
+        transition_chempots = self.get_gppd_transition_chempots(open_el, gppd_entries=gppd_entries,
+                                                                chempot_index=chempot_index)
+        chempots = [mu_hi] + [miu for miu in transition_chempots if (miu - mu_lo) * (miu - mu_hi) <= 0] + [mu_lo]
+        profiles = []
+        for hi, lo in zip(chempots[:-1], chempots[1:]):
+            miu = (hi + lo) / 2.0
+            profiles.append((miu, self.gppd_mixing({open_el: miu}, gppd_entries)))
+
+        groups = [[0]]
+        for i in range(1, len(profiles)):
+            if judge_same_decomp(profiles[groups[-1][-1]][1], profiles[i][1]):
+                groups[-1].append(i)
+            else:
+                groups.append([i])
+        bounds, pairs = [chempots[0]], []
+        for group in groups:
+            hi, lo = chempots[group[0]], chempots[group[-1] + 1]
+            bounds.append(lo)
+            if len(group) > 1:
+                pairs.append((profiles[group[0]], profiles[group[-1]]))
+            else:
+                miu = (hi + 3 * lo) / 4.0
+                pairs.append((profiles[group[0]], (miu, self.gppd_mixing({open_el: miu}, gppd_entries))))
+        return MixingReactionEnergyCurve.from_profiles(bounds[::-1], pairs[::-1])
+
+    def get_gppd_scanning_data(self, open_el, mu_hi, mu_lo, gppd_entries=None, chempot_index=None, n_grid=None):
+        """
+        Data part of gppd_scanning. Find the chemical potential intervals with different phase equilibria at the
+        mutual reaction energy minimum, and the reaction energies at each transition chemical potential.
+
+        :param open_el: open element
+        :param mu_hi:  chemical potential upper bound
+        :param mu_lo:  chemical potential lower bound
+        :param gppd_entries: Supply GPPD entries manually. If you supply this, I assume you know what you are doing
+        :param chempot_index: TransitionChempotIndex to get the transition chemical potentials from
+        :param n_grid: if given, also give the reaction energies on n_grid evenly spaced chemical potentials
+        :return: a dict of lists. 'mu_high', 'mu_low' and 'phase_equilibria' describe each interval;
+                 'mu', 'E_mutual' and 'E_total' (eV/atom) are given at each transition chemical potential,
+                 and 'grid_mu', 'grid_E_mutual' and 'grid_E_total' on the grid with n_grid.
+        """
+        curve = self.get_gppd_rxn_e_curve(open_el, mu_hi, mu_lo, gppd_entries=gppd_entries,
+                                          chempot_index=chempot_index)
+        chempots = curve.chempots[::-1].tolist()
+        middles = [(hi + lo) / 2.0 for hi, lo in zip(chempots[:-1], chempots[1:])]
+        PE = [", ".join(names) for names in curve.get_phase_equilibria(middles)]
+        energies = curve.get_rxn_e(chempots)
+        data = {'mu_high': chempots[:-1], 'mu_low': chempots[1:], 'phase_equilibria': PE,
+                'mu': chempots, 'E_mutual': energies['E_mutual'].tolist(), 'E_total': energies['E_total'].tolist()}
+        if n_grid:
+            grid = np.linspace(chempots[0], chempots[-1], n_grid)
+            energies = curve.get_rxn_e(grid)
+            data.update({'grid_mu': grid.tolist(), 'grid_E_mutual': energies['E_mutual'].tolist(),
+                         'grid_E_total': energies['E_total'].tolist()})
+        return data
+
+    def gppd_scanning(self, open_el, mu_hi, mu_lo, gppd_entries=None, verbose=False, chempot_index=None,
+                      n_grid=None):
         """
         This function is to do a (slightly smarter) screening of GPPD pseudo-binary in a given miu range
         This is a very tedious function, but mainly because GPPD screening itself is very tedious.
@@ -160,77 +406,14 @@ class PseudoBinary(object):
         :param mu_lo:  chemical potential lower bound
         :param gppd_entries: Supply GPPD entries manually. If you supply this, I assume you know what you are doing
         :param verbose: whether to prune the PE result table
+        :param chempot_index: TransitionChempotIndex to get the transition chemical potentials from
+        :param n_grid: if given, also print the reaction energies on n_grid evenly spaced chemical potentials
         :return: a printable string of screening results
         """
-        mu_lo, mu_hi = sorted([mu_lo, mu_hi])
-        miu_E_candidates = [miu for miu in self.get_gppd_transition_chempots(open_el) if
-                            (miu - mu_lo) * (miu - mu_hi) <= 0]
-        miu_E_candidates = [mu_hi] + miu_E_candidates + [mu_lo]
-        duplicate_index = []
-        if not gppd_entries:
-            gppd_entries = self.get_gppd_entries(open_el)
-
-        for i in range(1, len(miu_E_candidates) - 1):
-            miu_left = (miu_E_candidates[i] + miu_E_candidates[i - 1]) / 2.0
-            miu_right = (miu_E_candidates[i] + miu_E_candidates[i + 1]) / 2.0
-            profile_left = self.gppd_mixing({open_el: miu_left}, gppd_entries)
-            profile_right = self.gppd_mixing({open_el: miu_right}, gppd_entries)
-            if judge_same_decomp(profile_left, profile_right):
-                duplicate_index.append(i)
-        miu_E_candidates = [miu_E_candidates[i] for i in range(len(miu_E_candidates)) if i not in duplicate_index]
-
-        mu_hi, miu_low, PE = [], [], []
-        mu_list, E_mutual_list, E_total_list = [], [], []
-
-        for i in range(1, len(miu_E_candidates)):
-            miu = (miu_E_candidates[i] + miu_E_candidates[i - 1]) / 2.0
-            profile = self.gppd_mixing({open_el: miu}, gppd_entries)
-            E0 = -profile[0][1][1]
-            E1 = -profile[-1][1][1]
-            min_mutual = min(profile, key=lambda step: (-step[1][1] - step[0] * E1 - (1 - step[0]) * E0))
-            mu_hi.append(miu_E_candidates[i - 1])
-            miu_low.append(miu_E_candidates[i])
-            PE.append(", ".join(sorted([x.name for x in min_mutual[1][0]])))
-        for i in range(len(miu_E_candidates)):
-            profile_transition = self.gppd_mixing({open_el: miu_E_candidates[i]}, gppd_entries)
-            E0 = -profile_transition[0][1][1]
-            E1 = -profile_transition[-1][1][1]
-            min_mutual_transition = min(profile_transition,
-                                        key=lambda step: (-step[1][1] - step[0] * E1 - (1 - step[0]) * E0))
-            mu_list.append(miu_E_candidates[i])
-
-            E_mutual_list.append(
-                (-min_mutual_transition[1][1] - min_mutual_transition[0] * E1 - (1 - min_mutual_transition[0]) * E0))
-            E_total_list.append(-min_mutual_transition[1][1])
-
-        to_be_hidden = []
-        if not verbose:
-            for i in range(1, len(PE)):
-                if PE[i] == PE[i - 1]:
-                    to_be_hidden.append(i)
-
-        mu_hi_display_list = [mu_hi[k] for k in range(len(mu_hi)) if k not in to_be_hidden]
-        mu_low_display_list = mu_hi_display_list[1:] + [mu_lo]
-        PE_display_list = [PE[k] for k in range(len(PE)) if k not in to_be_hidden]
-
-        df1 = pandas.DataFrame()
-        df2 = pandas.DataFrame()
-
-        df1['mu_low'] = mu_hi_display_list
-        df1['mu_high'] = mu_low_display_list
-        df1['phase equilibria'] = PE_display_list
-
-        df2['mu'] = mu_list
-        df2['E_mutual(eV/atom)'] = E_mutual_list
-        df2['E_total(eV/atom)'] = E_total_list
-
-        print_df1 = df1.to_string(index=False, float_format='{:,.2f}'.format, justify='center')
-        print_df2 = df2.to_string(index=False, float_format='{:,.2f}'.format, justify='center')
-
-        output = [' == Phase Equilibria at min E_mutual == ', print_df1,'\n', ' == Reaction Energy ==',
-                  print_df2, 'Note: if E_mutual = 0, E_total is at x = 1 or 0']
-        string = "\n".join(output)
-        return string
+        mu_lo = min(mu_lo, mu_hi)
+        data = self.get_gppd_scanning_data(open_el, mu_hi, mu_lo, gppd_entries=gppd_entries,
+                                           chempot_index=chempot_index, n_grid=n_grid)
+        return get_printable_gppd_scanning_data(data, mu_lo, verbose=verbose)
 
 
 """
@@ -257,6 +440,21 @@ def judge_same_decomp(profile1, profile2):
     return True
 
 
+def get_window_intersection(windows):
+    """
+    :param windows: list of (mu_high, mu_low), mu_low None for -inf, (None, None) for never stable
+    :return: the (mu_high, mu_low) range in all windows, (None, None) if there is none
+    """
+    if any(mu_high is None for mu_high, mu_low in windows):
+        return None, None
+    mu_high = min(mu_high for mu_high, mu_low in windows)
+    lows = [mu_low for mu_high, mu_low in windows if mu_low is not None]
+    mu_low = max(lows) if lows else None
+    if mu_low is not None and mu_low > mu_high:
+        return None, None
+    return mu_high, mu_low
+
+
 def get_full_evolution_profile(pd, entry1, entry2, x1, x2):
     """
     This function is used to solve the transition points along a path on convex hull.
@@ -342,3 +540,61 @@ def get_mix_entry(mix_dict):
         return GrandPotPDEntry(mid_ori_entry, entry1.chempots)
     else:
         return VirtualEntry.from_mixing({entry1: x1, entry2: x2})
+
+
+def get_profile_data(profile):
+    """
+    Convert a cleaned mixing profile to a list of plain records, which can be dumped to json directly.
+    x is the mixing ratio of entry1, energies are in eV/atom.
+    """
+    E0 = -profile[0][1][1]
+    E1 = -profile[-1][1][1]
+    data = []
+    for ratio, (decomp, e) in profile:
+        data.append({'x': ratio,
+                     'phase_equilibria': sorted([x.name for x in decomp]),
+                     'rxn_e': -e,
+                     'mutual_rxn_e': -e - ratio * E1 - (1 - ratio) * E0})
+    return data
+
+
+def get_printable_gppd_scanning_data(data, mu_lo, verbose=False):
+    """
+    Generate printable table strings for the results of PseudoBinary.get_gppd_scanning_data
+    """
+    mu_hi, PE = data['mu_high'], data['phase_equilibria']
+    to_be_hidden = []
+    if not verbose:
+        for i in range(1, len(PE)):
+            if PE[i] == PE[i - 1]:
+                to_be_hidden.append(i)
+
+    mu_hi_display_list = [mu_hi[k] for k in range(len(mu_hi)) if k not in to_be_hidden]
+    mu_low_display_list = mu_hi_display_list[1:] + [mu_lo]
+    PE_display_list = [PE[k] for k in range(len(PE)) if k not in to_be_hidden]
+
+    df1 = pandas.DataFrame()
+    df2 = pandas.DataFrame()
+
+    df1['mu_low'] = mu_hi_display_list
+    df1['mu_high'] = mu_low_display_list
+    df1['phase equilibria'] = PE_display_list
+
+    df2['mu'] = data['mu']
+    df2['E_mutual(eV/atom)'] = data['E_mutual']
+    df2['E_total(eV/atom)'] = data['E_total']
+
+    print_df1 = df1.to_string(index=False, float_format='{:,.2f}'.format, justify='center')
+    print_df2 = df2.to_string(index=False, float_format='{:,.2f}'.format, justify='center')
+
+    output = [' == Phase Equilibria at min E_mutual == ', print_df1, '\n', ' == Reaction Energy ==',
+              print_df2, 'Note: if E_mutual = 0, E_total is at x = 1 or 0']
+    if 'grid_mu' in data:
+        df3 = pandas.DataFrame()
+        df3['mu'] = data['grid_mu']
+        df3['E_mutual(eV/atom)'] = data['grid_E_mutual']
+        df3['E_total(eV/atom)'] = data['grid_E_total']
+        output += ['\n', ' == Reaction Energy on mu grid ==',
+                   df3.to_string(index=False, float_format='{:,.3f}'.format, justify='center')]
+    string = "\n".join(output)
+    return string
@@ -0,0 +1,138 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+import os
+import multiprocessing
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from pymatgen import Composition
+from interface_stability.singlephase import VirtualEntry, COMMON_WORKING_IONS, plot_voltage_profile, \
+    plot_rxn_e_profile
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+"""
+Headless rendering of voltage profiles and reaction energy curves to image files.
+
+Figures are drawn on stand-alone matplotlib Figures with the Agg canvas, never through the pyplot state machine,
+so this works on nodes without a display whatever the default backend is. One figure and one axes are reused
+for all plots rendered by a PlotRenderer.
+"""
+
+
+class PlotRenderer(object):
+    """
+    Render plots to files, reusing one figure and axes.
+    The file format is given by the file extension, e.g. png, svg or pdf.
+    """
+
+    def __init__(self, figsize=(8, 6), dpi=150):
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(111)
+
+    def _save(self, path):
+        self.fig.tight_layout()
+        self.fig.savefig(path)
+        self.ax.clear()
+        return path
+
+    def render_voltage_profile(self, path, name, open_el, oe_list, v_list, valence):
+        plot_voltage_profile(self.ax, name, open_el, oe_list, v_list, valence)
+        return self._save(path)
+
+    def render_rxn_e_profile(self, path, open_el, mu_list, rxn_e_list):
+        plot_rxn_e_profile(self.ax, open_el, mu_list, rxn_e_list)
+        return self._save(path)
+
+
+# One renderer per process, created on first use
+_renderer = None
+
+
+def _get_renderer():
+    global _renderer
+    if _renderer is None:
+        _renderer = PlotRenderer()
+    return _renderer
+
+
+def _get_plot_path(output_dir, composition, open_el, kind, fmt):
+    formula = Composition(composition).reduced_formula
+    return os.path.join(output_dir, "{}_{}_{}.{}".format(formula, open_el, kind, fmt))
+
+
+def _render_task(task):
+    """
+    Compute and render the plots of one composition. Module level so that it can be sent to a pool.
+    :return: (composition, list of rendered paths, error message or None)
+    """
+    composition, open_el, kinds, output_dir, fmt, valence, allowpmu = task
+    paths = []
+    try:
+        entry = VirtualEntry.from_composition(Composition(composition))
+        # Fetched once with the open element, and also used for stabilizing the entry
+        entries = entry.get_PD_entries(sup_el=[open_el])
+        entry.stabilize(entries=entries)
+        renderer = _get_renderer()
+        if 'vc' in kinds:
+            ion_valence = valence if valence else COMMON_WORKING_IONS[open_el]
+            oe_list, v_list = entry.get_vc_plot_data(open_el, valence=ion_valence, entries=list(entries),
+                                                     allowpmu=allowpmu)
+            path = _get_plot_path(output_dir, composition, open_el, 'vc', fmt)
+            paths.append(renderer.render_voltage_profile(path, entry.name, open_el, oe_list, v_list, ion_valence))
+        if 'rxn_e' in kinds:
+            mu_list, rxn_e_list = entry.get_rxn_e_plot_data(open_el, entries=list(entries))
+            path = _get_plot_path(output_dir, composition, open_el, 'rxn_e', fmt)
+            paths.append(renderer.render_rxn_e_profile(path, open_el, mu_list, rxn_e_list))
+    except Exception as err:
+        return composition, paths, '{}: {}'.format(type(err).__name__, err)
+    return composition, paths, None
+
+
+def render_plots(compositions, open_el, output_dir, kinds=('vc', 'rxn_e'), fmt='png', valence=None,
+                 allowpmu=True, processes=1, verbose=False):
+    """
+    Render the voltage profile ("vc") and/or reaction energy curve ("rxn_e") of many compositions to files
+    named like Li3PS4_Li_vc.png in output_dir. Entries of each composition are fetched once for both plots.
+
+    :param compositions: list of compositions
+    :param open_el: open element (working ion) symbol
+    :param kinds: which plots to render
+    :param fmt: file format, e.g. png, svg or pdf
+    :param valence: valence of the working ion. Default from COMMON_WORKING_IONS.
+    :param allowpmu: allow positive chemical potential in the voltage profile
+    :param processes: number of processes rendering in parallel
+    :return: {composition: error message} for the failed compositions
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    if 'vc' in kinds and not valence and open_el not in COMMON_WORKING_IONS:
+        raise ValueError('Working ion {} not supported. You can provide valence manually'.format(open_el))
+    tasks = [(comp, open_el, kinds, output_dir, fmt, valence, allowpmu) for comp in compositions]
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(_render_task, tasks)
+    else:
+        pool = None
+        results = (_render_task(task) for task in tasks)
+    failed = {}
+    try:
+        for composition, paths, error in results:
+            if error:
+                failed[composition] = error
+            if verbose:
+                print("{}: {}".format(composition, error if error else ", ".join(paths)))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return failed
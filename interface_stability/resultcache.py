@@ -0,0 +1,200 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+from monty.json import MontyEncoder
+from pymatgen import Composition, MPRester
+from interface_stability.singlephase import VirtualEntry, PD_PRELOAD_PATH
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+"""
+Disk-backed cache of query results, e.g. the outputs of phase_stability stability/mu/evolution and
+pseudo_binary gppd_screen.
+
+A result is keyed on the query type, the reduced compositions and the query options (open element, mu, energy
+corrections...), plus a fingerprint of the entries it was computed from: the MP database version, or the content
+hash of the cached entries file with trypreload. When the entries of a chemical system change, the fingerprint
+changes, so old results are never returned, and they are deleted when the first new result of the same chemical
+system is saved. The cache is a SQLite file with a size cap; the least recently used results are evicted first.
+The MP fingerprint of each chemical system is also kept in the file for fingerprint_ttl seconds, so a cache hit
+does not need to ask MP anything; a database update is noticed within fingerprint_ttl.
+"""
+
+RESULT_CACHE_VERSION = 1
+DEFAULT_MAX_SIZE = 100 * 1024 ** 2
+DEFAULT_FINGERPRINT_TTL = 24 * 3600
+
+# The database version is only asked once per process. False if MP can not give it.
+_database_version = None
+
+
+def get_default_cache_path():
+    if PD_PRELOAD_PATH is None:
+        raise ValueError("No path is given for the result cache. "
+                         "Please set up PMG_PD_PRELOAD_PATH in ~/.pmgrc.yaml")
+    return os.path.join(PD_PRELOAD_PATH, "query_cache.sqlite")
+
+
+def get_entries_fingerprint(chemsys, trypreload=False):
+    """
+    Fingerprint of the entries of a chemical system.
+    With trypreload, the sha1 of the cached entries file (fetched first if missing). Otherwise the MP database
+    version, or the hash of the entries themselves if the MP API can not give the version.
+    """
+    global _database_version
+    if trypreload:
+        path = VirtualEntry.get_preload_file_path(chemsys)
+        if not os.path.isfile(path):
+            VirtualEntry.get_PD_entries_from_preload_file(chemsys)
+        with open(path, 'rb') as f:
+            return 'file:' + hashlib.sha1(f.read()).hexdigest()
+    if _database_version is None:
+        with MPRester() as m:
+            _database_version = m.get_database_version() if hasattr(m, 'get_database_version') else False
+    if _database_version is not False:
+        return 'mp:' + str(_database_version)
+    entries = VirtualEntry.get_PD_entries_from_MP(chemsys)
+    string = json.dumps(sorted([str(e.entry_id), e.composition.formula, e.uncorrected_energy, e.correction]
+                               for e in entries))
+    return 'entries:' + hashlib.sha1(string.encode('utf-8')).hexdigest()
+
+
+def get_query_key(query, compositions, fingerprint, **params):
+    """
+    :param query: query type, e.g. "stability"
+    :param compositions: list of compositions, normalized to reduced formulas
+    :param params: all other options the result depends on, e.g. open_element=..., mu=...
+    """
+    d = {'version': RESULT_CACHE_VERSION, 'query': query, 'fingerprint': fingerprint,
+         'compositions': [Composition(c).reduced_formula for c in compositions]}
+    d.update(params)
+    string = json.dumps(d, sort_keys=True)
+    return hashlib.sha1(string.encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+    """
+    SQLite file of JSON results with LRU eviction. Safe to share between processes.
+    """
+
+    def __init__(self, path=None, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param path: the SQLite file, default query_cache.sqlite in PMG_PD_PRELOAD_PATH
+        :param max_size: size cap of the stored results (bytes)
+        """
+        self.path = path if path else get_default_cache_path()
+        self.max_size = max_size
+        self._conn = sqlite3.connect(self.path, timeout=60)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, scope TEXT, "
+                               "fingerprint TEXT, value TEXT, size INTEGER, last_access REAL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_scope ON results (scope)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS fingerprints (chemsys TEXT PRIMARY KEY, "
+                               "fingerprint TEXT, time REAL)")
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get_size(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def __contains__(self, key):
+        return self._conn.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone() is not None
+
+    def get(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return default
+        with self._conn:
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, value, scope='', fingerprint=''):
+        """
+        :param scope: results of the same scope (e.g. chemical system) computed with another fingerprint are deleted
+        """
+        string = json.dumps(value, cls=MontyEncoder)
+        with self._conn:
+            self._conn.execute("DELETE FROM results WHERE scope = ? AND fingerprint != ?", (scope, fingerprint))
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                               (key, scope, fingerprint, string, len(string), time.time()))
+            self._evict()
+
+    def _evict(self):
+        size = self.get_size()
+        while size > self.max_size:
+            rows = self._conn.execute("SELECT key, size FROM results ORDER BY last_access LIMIT 100").fetchall()
+            for key, row_size in rows:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                size -= row_size
+                if size <= self.max_size:
+                    break
+
+    def get_fingerprint(self, chemsys, ttl=DEFAULT_FINGERPRINT_TTL):
+        """
+        :return: the fingerprint of the entries of chemsys saved less than ttl seconds ago, or None
+        """
+        row = self._conn.execute("SELECT fingerprint FROM fingerprints WHERE chemsys = ? AND time > ?",
+                                 ("-".join(chemsys), time.time() - ttl)).fetchone()
+        return row[0] if row else None
+
+    def put_fingerprint(self, chemsys, fingerprint):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?)",
+                               ("-".join(chemsys), fingerprint, time.time()))
+
+    def clear(self):
+        with self._conn:
+            self._conn.execute("DELETE FROM results")
+            self._conn.execute("DELETE FROM fingerprints")
+
+
+def get_cached_result(query, compositions, chemsys, compute, cache_path=None, trypreload=False,
+                      fingerprint_ttl=DEFAULT_FINGERPRINT_TTL, **params):
+    """
+    Return the cached result of a query, or compute and save it.
+
+    :param query: query type, e.g. "stability"
+    :param compositions: the compositions of the query
+    :param chemsys: all elements the result depends on, including the open element
+    :param compute: function without argument computing the (JSON serializable) result
+    :param cache_path: the SQLite file, default query_cache.sqlite in PMG_PD_PRELOAD_PATH
+    :param trypreload: whether the result is computed from the cached entries file rather than MP
+    :param fingerprint_ttl: how long (s) the MP fingerprint of the chemical system is reused without asking MP.
+        The fingerprint of the cached entries file is always computed, it does not need MP.
+    :param params: all other options of the query
+    """
+    chemsys = sorted(set(str(el) for el in chemsys))
+    cache = ResultCache(cache_path)
+    try:
+        fingerprint = None if trypreload else cache.get_fingerprint(chemsys, ttl=fingerprint_ttl)
+        if fingerprint is None:
+            fingerprint = get_entries_fingerprint(chemsys, trypreload=trypreload)
+            if not trypreload:
+                cache.put_fingerprint(chemsys, fingerprint)
+        key = get_query_key(query, compositions, fingerprint, **params)
+        scope = "-".join(chemsys) + ':' + fingerprint.split(':')[0]
+        result = cache.get(key)
+        if result is None:
+            result = compute()
+            cache.put(key, result, scope=scope, fingerprint=fingerprint)
+    finally:
+        cache.close()
+    return result
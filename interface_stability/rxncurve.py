@@ -0,0 +1,173 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+import numpy as np
+from pymatgen.analysis.reaction_calculator import ComputedReaction
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+"""
+Reaction energies as functions of the chemical potential of an open element, evaluated on mu arrays.
+
+The phase equilibria only change at the transition chemical potentials. Between them the reactions are fixed, so
+every reaction energy is linear in mu. A curve keeps the line of each interval; evaluating it on any mu array is a
+binary search of the intervals and a multiply-add, without building any reaction or hull.
+Chemical potentials are referenced to the pure open element, energies are in eV/atom.
+"""
+
+
+class ReactionEnergyCurve(object):
+    """
+    Decomposition energy of a phase open to an element, as in VirtualEntry.get_rxn_e_data.
+    """
+
+    def __init__(self, transition_chempots, intercepts, slopes, phase_equilibria, reactions=None):
+        """
+        :param transition_chempots: transition chemical potentials, ascending
+        :param intercepts, slopes: reaction energy = intercept + slope * mu in each interval, from low to high mu
+            (one more interval than transition chemical potentials)
+        :param phase_equilibria: phase names of each interval
+        :param reactions: ComputedReaction of each interval, if known
+        """
+        self.transition_chempots = np.array(transition_chempots, dtype=float)
+        self.intercepts = np.array(intercepts, dtype=float)
+        self.slopes = np.array(slopes, dtype=float)
+        self.phase_equilibria = [list(names) for names in phase_equilibria]
+        self.reactions = reactions
+
+    @classmethod
+    def from_evolution_lists(cls, entry, pure_el_ref, PE_list, oe_amt_list, mu_trans_list):
+        """
+        :param entry: the phase
+        :param pure_el_ref, PE_list, oe_amt_list, mu_trans_list: as given by VirtualEntry.get_evolution_lists
+        """
+        intercepts, slopes, names, reactions = [], [], [], []
+        for PE, oe_amt in zip(PE_list, oe_amt_list):
+            rxn = ComputedReaction([entry, pure_el_ref], PE)
+            rxn.normalize_to(entry.composition.reduced_composition)
+            intercepts.append(rxn.calculated_reaction_energy / entry.composition.num_atoms)
+            slopes.append(-oe_amt / entry.composition.num_atoms)
+            names.append(sorted([e.name for e in PE]))
+            reactions.append(rxn)
+        # The evolution lists go from high to low mu
+        return cls(sorted(mu_trans_list), intercepts[::-1], slopes[::-1], names[::-1], reactions[::-1])
+
+    def get_interval_index(self, mu):
+        return np.searchsorted(self.transition_chempots, mu)
+
+    def get_rxn_e(self, mu):
+        """
+        :param mu: chemical potential or array of chemical potentials
+        :return: reaction energies, same shape as mu
+        """
+        mu = np.asarray(mu, dtype=float)
+        index = self.get_interval_index(mu)
+        return self.intercepts[index] + self.slopes[index] * mu
+
+    def get_phase_equilibria(self, mu):
+        return [self.phase_equilibria[i] for i in np.atleast_1d(self.get_interval_index(mu))]
+
+
+class MixingReactionEnergyCurve(object):
+    """
+    Reaction energies of a pseudo-binary at the minimum of the mutual reaction energy over the mixing ratio,
+    as in PseudoBinary.get_gppd_scanning_data, between two chemical potentials.
+
+    In each interval, the mixing ratios and phase equilibria of the GPPD mixing profile are fixed and the reaction
+    energy of each step of the profile is a line. The mutual reaction energy at mu is the minimum over the steps,
+    so it can also change slope inside an interval.
+    """
+
+    def __init__(self, chempots, x, phase_equilibria, intercepts, slopes):
+        """
+        :param chempots: bounds of the intervals, ascending (one more than intervals)
+        :param x: mixing ratios of the steps of the profile in each interval
+        :param phase_equilibria: phase names of the steps in each interval
+        :param intercepts, slopes: reaction energy = intercept + slope * mu of the steps in each interval
+        """
+        self.chempots = np.array(chempots, dtype=float)
+        self.x = [list(ratios) for ratios in x]
+        self.phase_equilibria = [[list(names) for names in steps] for steps in phase_equilibria]
+        # Steps padded with +inf mutual reaction energy, so that all intervals are evaluated at once
+        n_steps = max(len(ratios) for ratios in x)
+        shape = (len(x), n_steps)
+        self._x = np.zeros(shape)
+        self._rxn_e = [np.zeros(shape), np.zeros(shape)]
+        self._mutual_rxn_e = [np.full(shape, np.inf), np.zeros(shape)]
+        for i, (ratios, a, b) in enumerate(zip(x, intercepts, slopes)):
+            ratios, a, b = np.array(ratios), np.array(a), np.array(b)
+            n = len(ratios)
+            self._x[i, :n] = ratios
+            self._rxn_e[0][i, :n] = a
+            self._rxn_e[1][i, :n] = b
+            # Steps go from x = 0 (entry2) to x = 1 (entry1)
+            self._mutual_rxn_e[0][i, :n] = a - ratios * a[-1] - (1 - ratios) * a[0]
+            self._mutual_rxn_e[1][i, :n] = b - ratios * b[-1] - (1 - ratios) * b[0]
+
+    @classmethod
+    def from_profiles(cls, chempots, profiles):
+        """
+        :param chempots: bounds of the intervals, ascending
+        :param profiles: for each interval, two (mu, GPPD mixing profile) at different mu inside the interval
+        """
+        x, names, intercepts, slopes = [], [], [], []
+        for (mu1, profile1), (mu2, profile2) in profiles:
+            ratios = [step[0] for step in profile1]
+            ratios2 = [step[0] for step in profile2]
+            # The ratios are solved again at each mu, so they only agree up to the last bits
+            if len(ratios2) != len(ratios) or not np.allclose(ratios2, ratios, rtol=0, atol=1e-8):
+                raise ValueError("The mixing profile changes between mu = {} and {}".format(mu1, mu2))
+            rxn_e1 = np.array([-step[1][1] for step in profile1])
+            rxn_e2 = np.array([-step[1][1] for step in profile2])
+            slope = (rxn_e2 - rxn_e1) / (mu2 - mu1) if mu2 != mu1 else np.zeros(len(ratios))
+            x.append(ratios)
+            names.append([sorted([e.name for e in step[1][0]]) for step in profile1])
+            intercepts.append(rxn_e1 - slope * mu1)
+            slopes.append(slope)
+        return cls(chempots, x, names, intercepts, slopes)
+
+    def get_interval_index(self, mu):
+        """
+        :return: index of the interval of each mu, -1 if mu is out of range
+        """
+        mu = np.asarray(mu, dtype=float)
+        index = np.clip(np.searchsorted(self.chempots, mu) - 1, 0, len(self.x) - 1)
+        return np.where((mu < self.chempots[0]) | (mu > self.chempots[-1]), -1, index)
+
+    def get_rxn_e(self, mu):
+        """
+        :param mu: chemical potential or array of chemical potentials
+        :return: dict of arrays with the shape of mu: 'E_mutual' and 'E_total' at the minimum of the mutual
+            reaction energy, and 'x' the mixing ratio of entry1 there. NaN out of the range of the curve.
+        """
+        mu = np.asarray(mu, dtype=float)
+        index = self.get_interval_index(mu)
+        flat_mu = np.atleast_1d(mu).ravel()
+        flat_index = np.atleast_1d(index).ravel()
+        safe_index = np.maximum(flat_index, 0)
+        mutual = self._mutual_rxn_e[0][safe_index] + self._mutual_rxn_e[1][safe_index] * flat_mu[:, None]
+        step = np.argmin(mutual, axis=1)
+        rows = np.arange(len(flat_mu))
+        total = self._rxn_e[0][safe_index, step] + self._rxn_e[1][safe_index, step] * flat_mu
+        result = {'E_mutual': mutual[rows, step], 'E_total': total, 'x': self._x[safe_index, step]}
+        for key in result:
+            result[key] = np.where(flat_index < 0, np.nan, result[key]).reshape(mu.shape)
+        return result
+
+    def get_phase_equilibria(self, mu):
+        """
+        :return: phase names at the minimum of the mutual reaction energy for each mu, None out of range
+        """
+        mu = np.atleast_1d(np.asarray(mu, dtype=float))
+        index = self.get_interval_index(mu)
+        mutual = self._mutual_rxn_e[0][np.maximum(index, 0)] + \
+            self._mutual_rxn_e[1][np.maximum(index, 0)] * mu[:, None]
+        steps = np.argmin(mutual, axis=1)
+        return [self.phase_equilibria[i][j] if i >= 0 else None for i, j in zip(index, steps)]
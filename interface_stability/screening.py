@@ -0,0 +1,502 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+import os
+import csv
+import json
+import hashlib
+import itertools
+import functools
+import multiprocessing
+from collections import OrderedDict
+
+from monty.serialization import loadfn
+from pymatgen import Composition
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+from pymatgen.analysis.reaction_calculator import ComputedReaction
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.pseudobinary import PseudoBinary, get_profile_data
+from interface_stability.pruning import prune_entries, get_printable_pruning_report
+from interface_stability.chempotindex import TransitionChempotIndex, load_chempot_index
+from interface_stability.hullartifact import get_hull_artifact_path, load_hull_artifact
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+"""
+Batch driver for screening many compositions / pseudo-binary pairs.
+
+A job is a plain dict using the same keys as the options of the phase_stability and pseudo_binary scripts, e.g.
+    {"type": "gppd_screen", "composition_1": "LiCoO2", "composition_2": "Li3PS4",
+     "open_element": "Li", "miu_low": -5, "miu_high": 0}
+Each finished job is streamed to a JSONL file as one record, and its key is appended to a checkpoint manifest,
+so that an interrupted screening can be restarted and only the unfinished jobs are computed.
+"""
+
+
+def get_job_key(job):
+    """
+    A stable identifier of a job, independent of the key order of the job dict.
+    """
+    string = json.dumps(job, sort_keys=True)
+    return hashlib.sha1(string.encode('utf-8')).hexdigest()
+
+
+class EntrySet(object):
+    """
+    Entries of a chemical system, fetched only once. Entries and PhaseDiagrams of any of its sub-systems
+    are taken from the same set without querying again, the PhaseDiagrams are built on first use.
+    """
+
+    def __init__(self, chemsys, trypreload=False, e_above_hull_cutoff=None, hull_folder=None):
+        """
+        :param e_above_hull_cutoff: If given, the entries above the hull by more than this (eV/atom) are removed
+        once after fetching, see interface_stability.pruning. The report is kept in pruning_report.
+        :param hull_folder: If given, the hulls of get_hull are loaded from hull artifacts in this folder ('' for
+        PMG_PD_PRELOAD_PATH), exported first if missing. Then no entry is fetched for them, and all processes on a
+        node share the memory of the hull. As with trypreload, the artifacts are not updated with the MP database.
+        """
+        self.chemsys = sorted(set(chemsys))
+        self.trypreload = trypreload
+        self.e_above_hull_cutoff = e_above_hull_cutoff
+        self.hull_folder = hull_folder
+        self.pruning_report = None
+        self._entries = None
+        self._pds = {}
+        self._hulls = {}
+        self._chempot_indices = {}
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            if self.trypreload:
+                entries = VirtualEntry.get_PD_entries_from_preload_file(self.chemsys)
+            else:
+                entries = VirtualEntry.get_PD_entries_from_MP(self.chemsys)
+            if self.e_above_hull_cutoff is not None:
+                entries, self.pruning_report = prune_entries(entries, self.e_above_hull_cutoff)
+            self._entries = entries
+        return self._entries
+
+    def get_entries(self, chemsys=None):
+        """
+        :return: a new list of the entries in the (sub-)system, which can be extended by the caller.
+        """
+        if chemsys is None:
+            return list(self.entries)
+        chemsys = set(chemsys)
+        if not chemsys <= set(self.chemsys):
+            raise ValueError("{} is not a sub-system of {}".format("-".join(sorted(chemsys)), "-".join(self.chemsys)))
+        return [e for e in self.entries if set(el.symbol for el in e.composition.elements) <= chemsys]
+
+    def get_pd(self, chemsys=None):
+        key = tuple(sorted(set(chemsys))) if chemsys else tuple(self.chemsys)
+        if key not in self._pds:
+            self._pds[key] = PhaseDiagram(self.get_entries(key))
+        return self._pds[key]
+
+    def get_hull(self, chemsys=None):
+        """
+        Hull for the decomposition queries only (get_decomp_and_e_above_hull): a HullArtifact with hull_folder,
+        otherwise the PhaseDiagram of get_pd.
+        """
+        if self.hull_folder is None:
+            return self.get_pd(chemsys)
+        key = tuple(sorted(set(chemsys))) if chemsys else tuple(self.chemsys)
+        if key not in self._hulls:
+            folder = self.hull_folder or None
+            # The entries are only needed to export a missing artifact
+            exists = os.path.isdir(get_hull_artifact_path(key, folder=folder))
+            self._hulls[key] = load_hull_artifact(key, entries=None if exists else self.get_entries(key),
+                                                  folder=folder)
+        return self._hulls[key]
+
+    def get_chempot_index(self, chemsys, open_el):
+        """
+        TransitionChempotIndex of a sub-system with an open element, built once. With trypreload, it is loaded from
+        (or saved to) PMG_PD_PRELOAD_PATH.
+        """
+        key = (tuple(sorted(set(chemsys) | {open_el})), open_el)
+        if key not in self._chempot_indices:
+            if self.trypreload:
+                self._chempot_indices[key] = load_chempot_index(key[0], open_el, entries=self.get_entries(key[0]))
+            else:
+                self._chempot_indices[key] = TransitionChempotIndex.from_pd(self.get_pd(key[0]), open_el)
+        return self._chempot_indices[key]
+
+
+def get_job_chemsys(job):
+    """
+    :return: the sorted tuple of all elements involved in a job, including the open element.
+    """
+    elements = set()
+    for key in ('composition', 'composition_1', 'composition_2'):
+        if key in job:
+            elements.update(el.symbol for el in Composition(job[key]).elements)
+    if job.get('open_element'):
+        elements.add(job['open_element'])
+    return tuple(sorted(elements))
+
+
+def _get_entry(composition, stabilize=True, e_correction=0.0, entry_set=None):
+    entry = VirtualEntry.from_composition(Composition(composition))
+    if stabilize:
+        entry.stabilize(pd=entry_set.get_hull(entry.chemsys) if entry_set else None)
+    if e_correction:
+        entry.energy_correction(e_correction)
+    return entry
+
+
+def _get_job_entries(job, entry, entry_set):
+    """
+    Entries for the hull of a single-phase job, including the entry itself. None means fetching by VirtualEntry.
+    """
+    return entry_set.get_entries(get_job_chemsys(job)) + [entry] if entry_set else None
+
+
+def _get_pair(job, entry_set=None):
+    """
+    Same input handling as the pseudo_binary script.
+    """
+    entry1 = _get_entry(job['composition_1'], e_correction=job.get('e1', 0.0), entry_set=entry_set)
+    entry2 = _get_entry(job['composition_2'], e_correction=job.get('e2', 0.0), entry_set=entry_set)
+    entries = entry_set.get_entries(get_job_chemsys(job)) if entry_set else None
+    return PseudoBinary(entry1, entry2, entries=entries)
+
+
+def run_stability_job(job, entry_set=None):
+    entry = _get_entry(job['composition'], stabilize=False)
+    # The entry is far above the hull, so the hull without it is the same
+    pd = entry_set.get_hull(get_job_chemsys(job)) if entry_set else None
+    decomp, hull_e = entry.get_decomp_entries_and_e_above_hull(pd=pd)
+    rxn = ComputedReaction([entry], list(decomp.keys()))
+    rxn.normalize_to(entry.composition.reduced_composition)
+    return {'phase_equilibria': sorted([e.name for e in decomp]), 'reaction': str(rxn)}
+
+
+def run_mu_job(job, entry_set=None):
+    entry = _get_entry(job['composition'], entry_set=entry_set)
+    chempot = {job['open_element']: job['chemical_potential']}
+    decomp_entries, rxn = entry.get_decomposition_in_gppd(chempot, entries=_get_job_entries(job, entry, entry_set))
+    rxn.normalize_to(entry.composition.reduced_composition)
+    return {'phase_equilibria': sorted([e.name for e in decomp_entries]), 'reaction': str(rxn),
+            'reaction_energy': rxn.calculated_reaction_energy}
+
+
+def run_evolution_job(job, entry_set=None):
+    entry = _get_entry(job['composition'], entry_set=entry_set)
+    profile = entry.get_phase_evolution_profile(job['open_element'], allowpmu=job.get('posmu', False),
+                                                entries=_get_job_entries(job, entry, entry_set))
+    ref = profile[0]['element_reference'].energy_per_atom
+    return [{'chempot': stage['chempot'] - ref, 'evolution': stage['evolution'],
+             'phase_equilibria': sorted([e.name for e in stage['entries']])} for stage in profile]
+
+
+def run_window_job(job, entry_set=None):
+    entry = _get_entry(job['composition'], entry_set=entry_set)
+    chempot_index = entry_set.get_chempot_index(get_job_chemsys(job), job['open_element']) if entry_set else None
+    mu_high, mu_low = entry.get_stability_window(job['open_element'], allowpmu=job.get('posmu', False),
+                                                 entries=_get_job_entries(job, entry, entry_set),
+                                                 chempot_index=chempot_index)
+    return {'mu_low': mu_low, 'mu_high': mu_high}
+
+
+def run_pd_job(job, entry_set=None):
+    pb = _get_pair(job, entry_set=entry_set)
+    return get_profile_data(pb.pd_mixing())
+
+
+def run_gppd_job(job, entry_set=None):
+    # The entries of the entry set include the open element, so the pair reuses its hull for the GPPD
+    pb = _get_pair(job, entry_set=entry_set)
+    return get_profile_data(pb.gppd_mixing({job['open_element']: job['chemical_potential']}))
+
+
+def run_gppd_screen_job(job, entry_set=None):
+    pb = _get_pair(job, entry_set=entry_set)
+    chempot_index = entry_set.get_chempot_index(get_job_chemsys(job), job['open_element']) if entry_set else None
+    return pb.get_gppd_scanning_data(job['open_element'], job['miu_high'], job['miu_low'],
+                                     chempot_index=chempot_index)
+
+
+JOB_RUNNERS = {
+    'stability': run_stability_job,
+    'mu': run_mu_job,
+    'evolution': run_evolution_job,
+    'window': run_window_job,
+    'pd': run_pd_job,
+    'gppd': run_gppd_job,
+    'gppd_screen': run_gppd_screen_job,
+}
+
+SINGLE_PHASE_JOB_TYPES = ('stability', 'mu', 'evolution', 'window')
+PSEUDO_BINARY_JOB_TYPES = ('pd', 'gppd', 'gppd_screen')
+
+
+# EntrySets kept by each process for run_job with hull_folder
+_process_entry_sets = {}
+
+
+def run_job(job, entry_set=None, hull_folder=None):
+    """
+    Run a single job and return a json-serializable result.
+
+    :param job: job dict
+    :param entry_set: EntrySet containing the chemical system of the job. If None, entries are fetched for this job.
+    :param hull_folder: if given without entry_set, the job uses an EntrySet of its chemical system kept for the
+        process, whose hulls are loaded from the hull artifacts in this folder (see EntrySet). Its entries are
+        loaded from PMG_PD_PRELOAD_PATH, as the artifacts are.
+    """
+    if job.get('type') not in JOB_RUNNERS:
+        raise ValueError('Job type {} not supported. Choose from {}'.format(job.get('type'), sorted(JOB_RUNNERS)))
+    if entry_set is None and hull_folder is not None:
+        key = (get_job_chemsys(job), hull_folder)
+        if key not in _process_entry_sets:
+            _process_entry_sets[key] = EntrySet(key[0], trypreload=True, hull_folder=hull_folder)
+        entry_set = _process_entry_sets[key]
+    return JOB_RUNNERS[job['type']](job, entry_set=entry_set)
+
+
+def get_pair_matrix_jobs(compositions_1, compositions_2=None, **kwargs):
+    """
+    Lazily generate pseudo-binary jobs for all pairs between two lists of compositions.
+    If compositions_2 is not given, all unique pairs within compositions_1 are generated.
+    Other job keys (type, open_element, miu_low...) are passed as keyword arguments, type defaults to "pd".
+    """
+    kwargs.setdefault('type', 'pd')
+    if compositions_2 is None:
+        pairs = itertools.combinations(compositions_1, 2)
+    else:
+        pairs = itertools.product(compositions_1, compositions_2)
+    for comp1, comp2 in pairs:
+        job = dict(kwargs)
+        job['composition_1'] = comp1
+        job['composition_2'] = comp2
+        yield job
+
+
+class ScreeningCheckpoint(object):
+    """
+    An append-only manifest of finished job keys, one key per line.
+    Only the keys are kept in memory, so the memory usage does not depend on the size of results.
+    """
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.done = set()
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as f:
+                for line in f:
+                    # A partially written last line (e.g. killed during writing) is ignored
+                    if line.endswith('\n'):
+                        self.done.add(line.strip())
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def mark_done(self, key):
+        with open(self.manifest_path, 'a') as f:
+            f.write(key + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.add(key)
+
+
+def _drop_partial_line(path):
+    """
+    Truncate the last line of a JSONL file if it was not completely written.
+    """
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b'\n':
+            return
+        pos = f.tell() - 1
+        while pos > 0:
+            f.seek(pos - 1)
+            if f.read(1) == b'\n':
+                break
+            pos -= 1
+        f.truncate(pos)
+
+
+def _run_job_record(args):
+    """
+    Run one job and wrap the result (or the error) into a record. Module level so that it can be sent to a pool.
+    """
+    runner, key, job = args
+    record = {'key': key, 'job': job}
+    try:
+        record['result'] = runner(job)
+    except Exception as err:
+        record['error'] = '{}: {}'.format(type(err).__name__, err)
+    return record
+
+
+def run_screening(jobs, output_path, manifest_path=None, runner=run_job, processes=1, verbose=False):
+    """
+    Run a batch of jobs and stream each result as one JSONL record, {"key":..., "job":..., "result":...}.
+    Jobs already recorded in the checkpoint manifest are skipped, so the same call can be used to resume.
+    A failed job is recorded with an "error" field instead of "result", and is not checkpointed, i.e. it
+    will be tried again on restart.
+
+    :param jobs: an iterable of job dicts. A generator is fine, jobs are consumed one by one.
+    :param output_path: path of the JSONL output, results are appended.
+    :param manifest_path: path of the checkpoint manifest, default to output_path + ".manifest"
+    :param runner: function to run a job dict, default to run_job. Must be picklable if processes > 1.
+    :param processes: number of local processes. Records are written in the order the jobs finish.
+    :param verbose: whether to print the progress
+    :return: (number of finished jobs, number of skipped jobs, number of failed jobs)
+    """
+    if manifest_path is None:
+        manifest_path = output_path + '.manifest'
+    checkpoint = ScreeningCheckpoint(manifest_path)
+    _drop_partial_line(output_path)
+    counts = {'done': 0, 'skipped': 0, 'failed': 0}
+
+    def todo():
+        for job in jobs:
+            key = get_job_key(job)
+            if key in checkpoint:
+                counts['skipped'] += 1
+                continue
+            yield runner, key, job
+
+    pool = multiprocessing.Pool(processes) if processes > 1 else None
+    try:
+        if pool:
+            # Feed the pool batch by batch, so that a long job generator is never consumed at once
+            tasks = todo()
+            batches = iter(lambda: list(itertools.islice(tasks, processes * 4)), [])
+            records = (record for batch in batches for record in pool.imap_unordered(_run_job_record, batch))
+        else:
+            records = (_run_job_record(task) for task in todo())
+        with open(output_path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+                if 'error' in record:
+                    counts['failed'] += 1
+                else:
+                    checkpoint.mark_done(record['key'])
+                    counts['done'] += 1
+                if verbose:
+                    print("{} {}: {}".format('Failed' if 'error' in record else 'Finished',
+                                             record['job'].get('type'), record['key']))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return counts['done'], counts['skipped'], counts['failed']
+
+
+def read_screening_results(output_path, include_errors=False):
+    """
+    Lazily iterate the records of a JSONL screening output.
+    If a job was finished more than once (e.g. killed between writing result and checkpoint), it is yielded once.
+    """
+    seen = set()
+    with open(output_path) as f:
+        for line in f:
+            if not line.endswith('\n'):
+                continue
+            record = json.loads(line)
+            if 'error' in record and not include_errors:
+                continue
+            if 'result' in record:
+                if record['key'] in seen:
+                    continue
+                seen.add(record['key'])
+            yield record
+
+
+_FLOAT_KEYS = ('chemical_potential', 'miu_low', 'miu_high', 'e1', 'e2')
+
+
+def read_batch_jobs(path, default_type=None, allowed_types=None):
+    """
+    Read jobs from a CSV or YAML/JSON file.
+    CSV: a header row with the job keys (type, composition, composition_1, composition_2, open_element,
+    chemical_potential, miu_low, miu_high, e1, e2, posmu), one job per row. Empty cells are ignored.
+    YAML/JSON: a list of job dicts with the same keys.
+
+    :param default_type: job type for jobs without a "type"
+    :param allowed_types: if given, raise ValueError for jobs of other types
+    :return: list of job dicts
+    """
+    if path.lower().endswith('.csv'):
+        with open(path) as f:
+            rows = [{k.strip(): v.strip() for k, v in row.items() if k and v and v.strip()}
+                    for row in csv.DictReader(f)]
+        jobs = []
+        for row in rows:
+            for key in _FLOAT_KEYS:
+                if key in row:
+                    row[key] = float(row[key])
+            if 'posmu' in row:
+                row['posmu'] = row['posmu'].lower() in ('1', 'true', 'yes', 'y')
+            jobs.append(row)
+    else:
+        jobs = loadfn(path)
+    for job in jobs:
+        if default_type and not job.get('type'):
+            job['type'] = default_type
+        if allowed_types and job.get('type') not in allowed_types:
+            raise ValueError("Job type {} is not supported here. Choose from {}".format(job.get('type'),
+                                                                                      list(allowed_types)))
+    return jobs
+
+
+def group_jobs_by_chemsys(jobs):
+    """
+    Group jobs so that each group only needs the entries of one chemical system.
+    A job whose chemical system is a sub-system of a larger group is put into that group.
+    :return: OrderedDict of {chemsys tuple: list of jobs}
+    """
+    chemsys_jobs = OrderedDict()
+    for job in jobs:
+        chemsys_jobs.setdefault(get_job_chemsys(job), []).append(job)
+    groups = OrderedDict()
+    for chemsys in sorted(chemsys_jobs, key=lambda x: (-len(x), x)):
+        for group in groups:
+            if set(chemsys) <= set(group):
+                groups[group] += chemsys_jobs[chemsys]
+                break
+        else:
+            groups[chemsys] = list(chemsys_jobs[chemsys])
+    return groups
+
+
+def run_batch(jobs, output_path, trypreload=False, e_above_hull_cutoff=None, hull_folder=None, verbose=False):
+    """
+    Run a batch of jobs grouped by chemical system: entries of each group are fetched once, and the hulls
+    that do not depend on the job (e.g. for stabilizing the input compositions) are built once.
+    Results are streamed to output_path (JSONL) with a checkpoint, the same call resumes an interrupted batch.
+
+    :param e_above_hull_cutoff: If given, prune the entries of each group with this cutoff (eV/atom)
+    :param hull_folder: If given, load the hulls of the input compositions from hull artifacts, see EntrySet
+    :return: (number of finished jobs, number of skipped jobs, number of failed jobs)
+    """
+    counts = [0, 0, 0]
+    for chemsys, group in group_jobs_by_chemsys(jobs).items():
+        if verbose:
+            print("Chemical system {}: {} jobs".format("-".join(chemsys), len(group)))
+        entry_set = EntrySet(chemsys, trypreload=trypreload, e_above_hull_cutoff=e_above_hull_cutoff,
+                             hull_folder=hull_folder)
+        result = run_screening(group, output_path, runner=functools.partial(run_job, entry_set=entry_set),
+                               verbose=verbose)
+        if verbose and entry_set.pruning_report:
+            print(get_printable_pruning_report(entry_set.pruning_report))
+        counts = [a + b for a, b in zip(counts, result)]
+    return tuple(counts)
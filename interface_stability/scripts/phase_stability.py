@@ -1,6 +1,19 @@
 import argparse
 from pymatgen import Composition
-from interface_stability.singlephase import VirtualEntry
+from interface_stability.singlephase import VirtualEntry, COMMON_WORKING_IONS, DEFAULT_WORKING_IONS
+from interface_stability.screening import read_batch_jobs, run_batch, SINGLE_PHASE_JOB_TYPES
+from interface_stability.rendering import render_plots
+from interface_stability.resultcache import get_cached_result
+from interface_stability.windowindex import StabilityWindowIndex, get_printable_window_query
+
+
+def get_output(args, query, compute, chemsys, **params):
+    """
+    Compute the printable output, or take it from the result cache with -cache.
+    """
+    if args.cache is None:
+        return compute()
+    return get_cached_result(query, [args.composition], chemsys, compute, cache_path=args.cache or None, **params)
 
 
 def get_phase_equilibria_from_composition(args):
@@ -8,8 +21,11 @@ def get_phase_equilibria_from_composition(args):
     Provides the phase equilibria of a phase with given composition
     """
     comp = Composition(args.composition)
-    entry = VirtualEntry.from_composition(comp)
-    print(entry.get_printable_PE_data_in_pd())
+
+    def compute():
+        entry = VirtualEntry.from_composition(comp)
+        return entry.get_printable_PE_data_in_pd()
+    print(get_output(args, 'stability', compute, comp.elements))
     return 0
 
 
@@ -20,9 +36,13 @@ def get_phase_equilibria_and_decomposition_energy_under_mu_from_composition(args
     """
     comp = Composition(args.composition)
     chempot = {args.open_element: args.chemical_potential}
-    entry = VirtualEntry.from_composition(comp)
-    entry.stabilize()
-    print(entry.get_printable_PE_and_decomposition_in_gppd(chempot, entries=None))
+
+    def compute():
+        entry = VirtualEntry.from_composition(comp)
+        entry.stabilize()
+        return entry.get_printable_PE_and_decomposition_in_gppd(chempot, entries=None)
+    print(get_output(args, 'mu', compute, comp.elements + [args.open_element], open_element=args.open_element,
+                     mu=args.chemical_potential))
     return 0
 
 
@@ -32,10 +52,14 @@ def get_phase_evolution_profile(args):
     Chemical potential is referenced to pure phase of open element.
     """
     comp = Composition(args.composition)
-    entry = VirtualEntry.from_composition(comp)
     oe = args.open_element
-    entry.stabilize()
-    print(entry.get_printable_evolution_profile(oe, allowpmu=args.posmu))
+
+    def compute():
+        entry = VirtualEntry.from_composition(comp)
+        entry.stabilize()
+        return entry.get_printable_evolution_profile(oe, allowpmu=args.posmu, n_grid=args.grid)
+    print(get_output(args, 'evolution', compute, comp.elements + [oe], open_element=oe, posmu=args.posmu,
+                     grid=args.grid))
     return 0
 
 
@@ -47,14 +71,77 @@ def plot_vc(args):
     entry = VirtualEntry.from_composition(comp)
     oe = args.open_element
     entry.stabilize()
-    common_working_ions = dict(Li=1, Na=1, K=1, Mg=2, Ca=2, Al=3)
-    valence = args.valence if args.valence else common_working_ions[oe]
+    valence = args.valence if args.valence else COMMON_WORKING_IONS[oe]
     oe_list, v_list = entry.get_vc_plot_data(oe, valence=valence, allowpmu=args.posmu)
     print(entry.get_printable_vc_plot_data(oe, oe_list, v_list))
     entry.get_voltage_profile_plot(oe, oe_list, v_list, valence).show()
 
 
 
+def multi_vc(args):
+    """
+    Get the voltage profiles of several working ions in one pass.
+    """
+    comp = Composition(args.composition)
+    entry = VirtualEntry.from_composition(comp)
+    entries = entry.get_PD_entries(sup_el=args.ions, trypreload=args.preload)
+    entry.stabilize(entries=[e for e in entries if set(e.composition.elements) <= set(comp.elements)])
+    profiles = entry.get_multi_ion_vc_data(ions=args.ions, entries=entries, allowpmu=args.posmu)
+    for ion in args.ions:
+        oe_list, v_list = profiles[ion]
+        print("Working ion: " + ion)
+        print(entry.get_printable_vc_plot_data(ion, oe_list, v_list))
+    return 0
+
+
+def render(args):
+    """
+    Render voltage profiles and reaction energy plots of many compositions to files, without a display.
+    """
+    failed = render_plots(args.compositions, args.open_element, args.output_dir, kinds=args.kinds, fmt=args.format,
+                          valence=args.valence, allowpmu=args.posmu, processes=args.processes, verbose=True)
+    for comp, error in failed.items():
+        print("Failed {}: {}".format(comp, error))
+    return 0
+
+
+def batch(args):
+    """
+    Run many jobs listed in a CSV/YAML file. Jobs are grouped by chemical system, so that entries are only loaded once.
+    """
+    jobs = read_batch_jobs(args.input, default_type=args.type, allowed_types=SINGLE_PHASE_JOB_TYPES)
+    n_done, n_skipped, n_failed = run_batch(jobs, args.output, trypreload=args.preload,
+                                            e_above_hull_cutoff=args.prune, hull_folder=args.artifact,
+                                            verbose=args.verbose)
+    print("{} jobs finished, {} skipped (already in {}), {} failed".format(n_done, n_skipped, args.output, n_failed))
+    return 0
+
+
+def window_index(args):
+    """
+    Add the stability windows of batch results to a window index.
+    """
+    index = StabilityWindowIndex(args.index)
+    for path in args.results:
+        n = index.add_screening_results(path)
+        print("{} windows added from {}".format(n, path))
+    print("{} compounds in {}".format(len(index), args.index))
+    return 0
+
+
+def window_query(args):
+    """
+    Find the compounds stable between two chemical potentials, or over the whole window with -cover.
+    """
+    index = StabilityWindowIndex(args.index)
+    if args.cover:
+        results = index.get_covering(args.open_element, args.mu_low, args.mu_high, contains=args.contains)
+    else:
+        results = index.get_stable_between(args.open_element, args.mu_low, args.mu_high, contains=args.contains)
+    print(get_printable_window_query(results, args.open_element))
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter, description="""
 --BRIEF INTRO--
@@ -77,22 +164,30 @@ def main():
     parent_mu.add_argument("chemical_potential", type=float, help="The chemical potential of open element."
                                                                    "Referenced to pure phase")
 
+    parent_cache = argparse.ArgumentParser(add_help=False)
+    parent_cache.add_argument("-cache", nargs='?', const='', default=None, metavar='PATH',
+                              help="Reuse the result of the same query from a result cache file (default "
+                                   "query_cache.sqlite in PMG_PD_PRELOAD_PATH). Results are recomputed when the "
+                                   "MP database changes. Plots are only shown when the result is computed")
+
     parent_posmu = argparse.ArgumentParser(add_help=False)
     parent_posmu.add_argument("-posmu", action='store_true', default=False,
                              help="Allow mu range to go beyond 0 and become positive")
 
     subparsers = parser.add_subparsers()
 
-    parser_stability = subparsers.add_parser("stability", parents=[parent_comp_mp],
+    parser_stability = subparsers.add_parser("stability", parents=[parent_comp_mp, parent_cache],
                                              help="Obtain the phase equilibria of a phase with given composition")
     parser_stability.set_defaults(func=get_phase_equilibria_from_composition)
 
-    parser_evolution = subparsers.add_parser("evolution", parents=[parent_comp_mp, parent_oe, parent_posmu],
+    parser_evolution = subparsers.add_parser("evolution", parents=[parent_comp_mp, parent_oe, parent_posmu, parent_cache],
                                              help="Obtain the evolution profile at a given composition when open to an element")
+    parser_evolution.add_argument("-grid", type=int, default=None, metavar='N',
+                                  help="Also print the reaction energy on N evenly spaced chemical potentials")
 
     parser_evolution.set_defaults(func=get_phase_evolution_profile)
 
-    parser_mu = subparsers.add_parser("mu", parents=[parent_comp_mp, parent_oe, parent_mu],
+    parser_mu = subparsers.add_parser("mu", parents=[parent_comp_mp, parent_oe, parent_mu, parent_cache],
                                        help="Obtain the phase equilibria & decomposition energy of a phase with given composition when open to an element")
     parser_mu.set_defaults(func=get_phase_equilibria_and_decomposition_energy_under_mu_from_composition)
 
@@ -106,6 +201,66 @@ def main():
 
     parser_plot_vc.set_defaults(func=plot_vc)
 
+    parser_multi_vc = subparsers.add_parser("multivc", parents=[parent_comp_mp, parent_posmu],
+                                            help="Voltage profiles of several working ions at a given composition, "
+                                                 "with entries fetched once")
+    parser_multi_vc.add_argument('-ions', type=str, nargs='+', default=DEFAULT_WORKING_IONS,
+                                 choices=sorted(COMMON_WORKING_IONS), help='Working ions')
+    parser_multi_vc.add_argument('-preload', action='store_true', default=False,
+                                 help='Use the cached entries in PMG_PD_PRELOAD_PATH')
+    parser_multi_vc.set_defaults(func=multi_vc)
+
+    parser_render = subparsers.add_parser("render", parents=[parent_oe, parent_posmu],
+                                          help="Save voltage profile and reaction energy plots of many compositions "
+                                               "to files (works without display)")
+    parser_render.add_argument("output_dir", type=str, help="The folder for the plot files")
+    parser_render.add_argument("compositions", type=str, nargs='+', help="The compositions for analysis")
+    parser_render.add_argument('-f', '--format', type=str, default='png', help='File format, e.g. png, svg or pdf')
+    parser_render.add_argument('-k', '--kinds', type=str, nargs='+', default=['vc', 'rxn_e'], choices=['vc', 'rxn_e'],
+                               help='Plots to render: voltage profile (vc) and/or reaction energy (rxn_e)')
+    parser_render.add_argument('-v', '--valence', type=int, default=None, help='Valence of Working ion')
+    parser_render.add_argument('-p', '--processes', type=int, default=1, help='Number of processes')
+    parser_render.set_defaults(func=render)
+
+    parser_batch = subparsers.add_parser("batch",
+                                         help="Run many jobs listed in a CSV/YAML file, results are written to "
+                                              "one JSONL file")
+    parser_batch.add_argument("input", type=str,
+                              help="CSV file with a header row of job keys, or YAML/JSON list of jobs. "
+                                   "e.g. CSV header: type,composition,open_element,chemical_potential")
+    parser_batch.add_argument("output", type=str, help="JSONL output file. Rerun the same command to resume.")
+    parser_batch.add_argument("-t", "--type", type=str, default=None, choices=SINGLE_PHASE_JOB_TYPES,
+                              help="Job type of the rows without a type column")
+    parser_batch.add_argument("-preload", action='store_true', default=False,
+                              help="Load entries from the local cache in PMG_PD_PRELOAD_PATH")
+    parser_batch.add_argument("-prune", type=float, default=None, metavar='CUTOFF',
+                              help="Remove entries above the hull by more than CUTOFF (eV/atom) before building "
+                                   "hulls. Stable entries are never removed")
+    parser_batch.add_argument("-artifact", nargs='?', const='', default=None, metavar='FOLDER',
+                              help="Load the hulls of the input compositions from memory-mapped hull artifacts in "
+                                   "FOLDER (default PMG_PD_PRELOAD_PATH), exported on first use")
+    parser_batch.add_argument("-verbose", action='store_true', default=False, help="Print the progress")
+    parser_batch.set_defaults(func=batch)
+
+    parser_window_index = subparsers.add_parser("window_index",
+                                                help="Add the stability windows of batch results (window jobs) to "
+                                                     "a window index file")
+    parser_window_index.add_argument("index", type=str, help="The window index file (JSONL), created if missing")
+    parser_window_index.add_argument("results", type=str, nargs='+', help="JSONL outputs of phase_stability batch")
+    parser_window_index.set_defaults(func=window_index)
+
+    parser_window_query = subparsers.add_parser("window_query", parents=[parent_oe],
+                                                help="Find the compounds of a window index stable between two "
+                                                     "chemical potentials (e.g. 0.5-4.2 V vs Li is -4.2 to -0.5)")
+    parser_window_query.add_argument("index", type=str, help="The window index file")
+    parser_window_query.add_argument("mu_low", type=float, help="Lower chemical potential, ref. to pure phase")
+    parser_window_query.add_argument("mu_high", type=float, help="Upper chemical potential, ref. to pure phase")
+    parser_window_query.add_argument("-cover", action='store_true', default=False,
+                                     help="Only the compounds stable over the whole window")
+    parser_window_query.add_argument("-contains", type=str, nargs='+', default=None,
+                                     help="Only the compounds containing these elements")
+    parser_window_query.set_defaults(func=window_query)
+
     args = parser.parse_args()
 
 
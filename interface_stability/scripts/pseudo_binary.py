@@ -4,6 +4,10 @@ import argparse
 from pymatgen import Composition
 from interface_stability.pseudobinary import PseudoBinary
 from interface_stability.singlephase import VirtualEntry
+from interface_stability.chempotindex import load_chempot_index
+from interface_stability.resultcache import get_cached_result
+from interface_stability.screening import read_batch_jobs, run_batch, PSEUDO_BINARY_JOB_TYPES
+from interface_stability.sweep import EnergyCorrectionSweep, get_printable_transitions
 
 
 def input_handling(args):
@@ -43,12 +47,70 @@ def electrochemical_stability(args):
 
 
 def electrochemical_stability_screening(args):
-    entry1, entry2 = input_handling(args)
     oe = args.open_element
     miu_low = args.miu_low
     miu_high = args.miu_high
-    pb = PseudoBinary(entry1, entry2)
-    print(pb.gppd_scanning(oe, miu_high, miu_low))
+
+    def compute():
+        entry1, entry2 = input_handling(args)
+        pb = PseudoBinary(entry1, entry2)
+        chempot_index = load_chempot_index(entry1.chemsys + entry2.chemsys, oe) if args.index else None
+        return pb.gppd_scanning(oe, miu_high, miu_low, chempot_index=chempot_index, n_grid=args.grid)
+
+    if args.cache is None:
+        print(compute())
+    else:
+        compositions = [args.composition_1, args.composition_2]
+        chemsys = [el for comp in compositions for el in Composition(comp).elements] + [oe]
+        print(get_cached_result('gppd_screen', compositions, chemsys, compute, cache_path=args.cache or None,
+                                open_element=oe, miu_low=miu_low, miu_high=miu_high, e1=args.e1, e2=args.e2,
+                                grid=args.grid))
+
+
+def interface_window_map(args):
+    """
+    Electrochemical window of the interface phase equilibria at each mixing ratio.
+    """
+    entry1, entry2 = input_handling(args)
+    print("-" * 100, "\nThe starting phases compositions are ", entry1.name, 'and', entry2.name)
+    print("All mixing ratio based on all formula already normalized to ONE atom per fu!")
+    pb = PseudoBinary(entry1, entry2, sup_el=[args.open_element])
+    print(pb.get_printable_pd_profile())
+    print(pb.get_printable_interface_window_data(args.open_element))
+    return 0
+
+
+def energy_correction_sweep(args):
+    """
+    Find the energy corrections of the end members where the chemical stability (PD) results change.
+    """
+    entry1 = VirtualEntry.from_composition(Composition(args.composition_1))
+    entry2 = VirtualEntry.from_composition(Composition(args.composition_2))
+    entry1.stabilize()
+    entry2.stabilize()
+    print("-" * 100, "\nThe starting phases compositions are ", entry1.name, 'and', entry2.name)
+    print("Energy corrections are in eV/atom, referenced to the hull.")
+    sweep = EnergyCorrectionSweep(entry1, entry2)
+    for endpoint, e_range, other, entry in [(1, args.e1_range, args.e2, entry1), (2, args.e2_range, args.e1, entry2)]:
+        if not e_range:
+            continue
+        print('\n === Sweep of the energy correction of {} (the other fixed at {}) ==='.format(entry.name, other))
+        transitions = sweep.find_transitions(e_range[0], e_range[1], endpoint=endpoint, other=other, n=args.n,
+                                             tol=args.tol)
+        print(get_printable_transitions(transitions, entry.name))
+    return 0
+
+
+def batch(args):
+    """
+    Run many jobs listed in a CSV/YAML file. Jobs are grouped by chemical system, so that entries are only loaded once.
+    """
+    jobs = read_batch_jobs(args.input, default_type=args.type, allowed_types=PSEUDO_BINARY_JOB_TYPES)
+    n_done, n_skipped, n_failed = run_batch(jobs, args.output, trypreload=args.preload,
+                                            e_above_hull_cutoff=args.prune, hull_folder=args.artifact,
+                                            verbose=args.verbose)
+    print("{} jobs finished, {} skipped (already in {}), {} failed".format(n_done, n_skipped, args.output, n_failed))
+    return 0
 
 
 def main():
@@ -95,8 +157,54 @@ def main():
                                                help="The electrochemical stability in a given chemical potential range")
     parser_gppd_screen.add_argument("miu_low", type=float, help="lower chemical potential for gppd screening")
     parser_gppd_screen.add_argument("miu_high", type=float, help="upper chemical potential for gppd screening")
+    parser_gppd_screen.add_argument("-index", action='store_true', default=False,
+                                    help="Use the transition chemical potentials cached in PMG_PD_PRELOAD_PATH "
+                                         "(computed on first use for the chemical system and open element)")
+    parser_gppd_screen.add_argument("-grid", type=int, default=None, metavar='N',
+                                    help="Also print the reaction energies on N evenly spaced chemical potentials "
+                                         "between miu_low and miu_high")
+    parser_gppd_screen.add_argument("-cache", nargs='?', const='', default=None, metavar='PATH',
+                                    help="Reuse the result of the same query from a result cache file (default "
+                                         "query_cache.sqlite in PMG_PD_PRELOAD_PATH). Results are recomputed when "
+                                         "the MP database changes")
     parser_gppd_screen.set_defaults(func=electrochemical_stability_screening)
 
+    parser_window_map = subparsers.add_parser("window_map", parents=[parent_comp_mp, parent_oe],
+                                              help="The electrochemical window of the interface phase equilibria "
+                                                   "at each mixing ratio of the chemical stability (PD) profile")
+    parser_window_map.set_defaults(func=interface_window_map)
+
+    parser_sweep = subparsers.add_parser("sweep", parents=[parent_comp_mp],
+                                         help="Find the energy corrections where the chemical stability (PD) "
+                                              "results change. -e1/-e2 are used for the end member not swept")
+    parser_sweep.add_argument("-e1_range", type=float, nargs=2, default=None, metavar=('LOW', 'HIGH'),
+                              help="Range of the energy correction of entry1")
+    parser_sweep.add_argument("-e2_range", type=float, nargs=2, default=None, metavar=('LOW', 'HIGH'),
+                              help="Range of the energy correction of entry2")
+    parser_sweep.add_argument("-n", type=int, default=21, help="Number of grid points before bisection")
+    parser_sweep.add_argument("-tol", type=float, default=1e-3, help="Precision of the transition corrections")
+    parser_sweep.set_defaults(func=energy_correction_sweep)
+
+    parser_batch = subparsers.add_parser("batch",
+                                         help="Run many jobs listed in a CSV/YAML file, results are written to "
+                                              "one JSONL file")
+    parser_batch.add_argument("input", type=str,
+                              help="CSV file with a header row of job keys, or YAML/JSON list of jobs. "
+                                   "e.g. CSV header: type,composition_1,composition_2,open_element,miu_low,miu_high")
+    parser_batch.add_argument("output", type=str, help="JSONL output file. Rerun the same command to resume.")
+    parser_batch.add_argument("-t", "--type", type=str, default=None, choices=PSEUDO_BINARY_JOB_TYPES,
+                              help="Job type of the rows without a type column")
+    parser_batch.add_argument("-preload", action='store_true', default=False,
+                              help="Load entries from the local cache in PMG_PD_PRELOAD_PATH")
+    parser_batch.add_argument("-prune", type=float, default=None, metavar='CUTOFF',
+                              help="Remove entries above the hull by more than CUTOFF (eV/atom) before building "
+                                   "hulls. Stable entries are never removed")
+    parser_batch.add_argument("-artifact", nargs='?', const='', default=None, metavar='FOLDER',
+                              help="Load the hulls of the input compositions from memory-mapped hull artifacts in "
+                                   "FOLDER (default PMG_PD_PRELOAD_PATH), exported on first use")
+    parser_batch.add_argument("-verbose", action='store_true', default=False, help="Print the progress")
+    parser_batch.set_defaults(func=batch)
+
     args = parser.parse_args()
     if hasattr(args, "func"):
         args.func(args)
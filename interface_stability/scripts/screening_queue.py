@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import json
+import argparse
+from interface_stability.workqueue import submit_jobs, run_worker, get_queue_status, merge_results, \
+    requeue_stale_shards, requeue_failed_shards
+
+
+def read_jobs(path):
+    """
+    Lazily read jobs from a JSONL file, one job dict per line.
+    """
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def submit(args):
+    n = submit_jobs(args.queue_dir, read_jobs(args.jobs), shard_size=args.shard_size)
+    print("{} shards submitted to {}".format(n, args.queue_dir))
+    return 0
+
+
+def work(args):
+    n = run_worker(args.queue_dir, worker_id=args.worker_id, processes=args.processes,
+                   stale_timeout=args.stale_timeout, hull_folder=args.artifact, verbose=True)
+    print("No shard left. {} shards processed by this worker.".format(n))
+    return 0
+
+
+def status(args):
+    for folder, n in get_queue_status(args.queue_dir).items():
+        print("{:>8}: {}".format(folder, n))
+    return 0
+
+
+def requeue(args):
+    n = requeue_stale_shards(args.queue_dir, args.stale_timeout)
+    print("{} stale shards put back to pending".format(n))
+    return 0
+
+
+def retry(args):
+    n = requeue_failed_shards(args.queue_dir)
+    print("{} shards with failed jobs put back to pending".format(n))
+    return 0
+
+
+def merge(args):
+    n = merge_results(args.queue_dir, args.output, include_errors=args.errors)
+    print("{} records merged to {}".format(n, args.output))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter, description="""
+--BRIEF INTRO--
+    This script distributes phase_stability / pseudo_binary jobs to many nodes through a shared filesystem.
+    Jobs are given as a JSONL file, one job per line, using the same options as the other scripts, e.g.
+        {"type": "gppd_screen", "composition_1": "LiCoO2", "composition_2": "Li3PS4",
+         "open_element": "Li", "miu_low": -5, "miu_high": 0}
+    Supported types: stability, mu, evolution, window, pd, gppd, gppd_screen
+    Submit jobs once, start "work" on as many nodes as you like, then merge the results.
+    To see the options for the sub-commands, use "screening_queue sub-command -h".
+    """, epilog="""
+--REMINDER--
+    To use this script, you need to set following variable in ~/.pmgrc.yaml:
+    PMG_MAPI_KEY :[Mandatory] the API key for MP to fetch data from MP website.
+    PMG_PD_PRELOAD_PATH : [Optional] the local directory for saved cached data.
+    """)
+
+    parent_queue = argparse.ArgumentParser(add_help=False)
+    parent_queue.add_argument("queue_dir", type=str, help="The queue folder on the shared filesystem")
+
+    subparsers = parser.add_subparsers()
+
+    parser_submit = subparsers.add_parser("submit", parents=[parent_queue], help="Submit jobs to the queue")
+    parser_submit.add_argument("jobs", type=str, help="JSONL file of jobs")
+    parser_submit.add_argument("-n", "--shard_size", type=int, default=20, help="Number of jobs per shard")
+    parser_submit.set_defaults(func=submit)
+
+    parser_work = subparsers.add_parser("work", parents=[parent_queue],
+                                        help="Run shards from the queue until it is empty")
+    parser_work.add_argument("-p", "--processes", type=int, default=1, help="Number of local processes")
+    parser_work.add_argument("-w", "--worker_id", type=str, default=None,
+                             help="Unique name of this worker, default to hostname-pid")
+    parser_work.add_argument("-t", "--stale_timeout", type=float, default=None,
+                             help="Take over shards of workers silent for this many seconds")
+    parser_work.add_argument("-artifact", nargs='?', const='', default=None, metavar='FOLDER',
+                             help="Load the hulls from memory-mapped hull artifacts in FOLDER (default "
+                                  "PMG_PD_PRELOAD_PATH), exported on first use, and entries from the local cache")
+    parser_work.set_defaults(func=work)
+
+    parser_status = subparsers.add_parser("status", parents=[parent_queue], help="Show the number of shards")
+    parser_status.set_defaults(func=status)
+
+    parser_requeue = subparsers.add_parser("requeue", parents=[parent_queue],
+                                           help="Put shards of dead workers back to pending")
+    parser_requeue.add_argument("stale_timeout", type=float,
+                                help="Shards without progress for this many seconds are put back")
+    parser_requeue.set_defaults(func=requeue)
+
+    parser_retry = subparsers.add_parser("retry", parents=[parent_queue],
+                                         help="Put shards with failed jobs back to pending, to run the failed "
+                                              "jobs again")
+    parser_retry.set_defaults(func=retry)
+
+    parser_merge = subparsers.add_parser("merge", parents=[parent_queue], help="Merge the results of all shards")
+    parser_merge.add_argument("output", type=str, help="The merged JSONL file")
+    parser_merge.add_argument("-errors", action='store_true', default=False, help="Also keep failed job records")
+    parser_merge.set_defaults(func=merge)
+
+    args = parser.parse_args()
+    if hasattr(args, "func"):
+        args.func(args)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,24 @@
 
 
 import os
+import copy
 import json
 import re
 import warnings
 import pandas
+import numpy as np
 
 import matplotlib.pyplot as plt
 from matplotlib import rc
 from monty.json import MontyDecoder, MontyEncoder
-from pymatgen import Composition, SETTINGS, Element, MPRester
+from pymatgen import Composition, SETTINGS, MPRester
 from pymatgen.analysis.phase_diagram import PhaseDiagram, GrandPotentialPhaseDiagram
 from pymatgen.analysis.reaction_calculator import ComputedReaction
 from pymatgen.entries.computed_entries import ComputedEntry
+from interface_stability.pruning import prune_entries, get_printable_pruning_report
+from interface_stability.lazygraph import LazyGraph, get_entries_node_name, parse_entries_node_name, \
+    get_pd_node_name, get_gppd_node_name, get_open_element_node_name
+from interface_stability.rxncurve import ReactionEnergyCurve
 
 __author__ = "Yizhou Zhu"
 __copyright__ = ""
@@ -26,6 +32,9 @@ __status__ = "Production"
 __date__ = "Jun 10, 2018"
 
 PD_PRELOAD_PATH = SETTINGS.get("PMG_PD_PRELOAD_PATH")
+COMMON_WORKING_IONS = dict(Li=1, Na=1, K=1, Mg=2, Ca=2, Zn=2, Al=3)
+# Working ions of get_multi_ion_vc_data by default
+DEFAULT_WORKING_IONS = ['Li', 'Na', 'K', 'Mg', 'Ca', 'Al']
 # if PD_PRELOAD_PATH is None:
 #     trypreload = False
 
@@ -74,28 +83,101 @@ class VirtualEntry(ComputedEntry):
     def chemsys(self):
         return [_.symbol for _ in self.composition.elements]
 
-    def get_PD_entries(self, sup_el=None, exclusions=None, trypreload=False):
+    @property
+    def graph(self):
+        """
+        LazyGraph of the entries, hulls and profiles computed for this entry when entries are not supplied, so that
+        they are fetched/computed only once. Its "energy" input follows the energy of the entry: the hulls with the
+        entry (and what depends on them) are recomputed after an energy correction, the fetched entries are not.
+        """
+        if getattr(self, '_graph', None) is None:
+            self._graph = LazyGraph()
+        self._graph.set_input('energy', self.energy)
+        return self._graph
+
+    def __getstate__(self):
+        # Copies and pickles do not carry the cached hulls
+        state = dict(self.__dict__)
+        state.pop('_graph', None)
+        return state
+
+    def get_PD_entries(self, sup_el=None, exclusions=None, trypreload=False, e_above_hull_cutoff=None,
+                       verbose=False):
         """
         :param sup_el: a list for extra element dimension, using str format
         :param exclusions: a list of manually exclusion entries, can use entry name or mp_id
         :param trypreload: If try to reload from cached search results.
         Warning: if set to True, the return result may not be consistent with the updated MP database.
-        :return: all related entries to construct phase diagram.
+        :param e_above_hull_cutoff: If given, remove the entries above the hull by more than this (eV/atom)
+        before returning them, see interface_stability.pruning. The hull is not changed.
+        :param verbose: print the pruning report
+        :return: all related entries to construct phase diagram. They are fetched once per chemical system and
+        kept in graph.
         """
 
         chemsys = self.chemsys + sup_el if sup_el else self.chemsys
-        chemsys = list(set(chemsys))
-
-        if trypreload:
-            entries = self.get_PD_entries_from_preload_file(chemsys)
+        if exclusions and e_above_hull_cutoff is not None:
+            # Excluding a stable entry changes the hull, so the pruning is done after the exclusions. The entries
+            # before pruning are not kept in graph.
+            fetch, dependencies = self._get_entries_function(chemsys, trypreload)
+            entries = fetch(*[self.graph.get(dep) for dep in dependencies])
+            entries = [e for e in entries if e.name not in exclusions and e.entry_id not in exclusions]
+            entries, report = prune_entries(entries, e_above_hull_cutoff)
+            if verbose:
+                print(get_printable_pruning_report(report))
         else:
-            entries = self.get_PD_entries_from_MP(chemsys)
+            entries = list(self.graph.get(self._add_entries_node(chemsys, trypreload, e_above_hull_cutoff,
+                                                                 verbose)))
         entries.append(self)
         if exclusions:
             entries = [e for e in entries if e.name not in exclusions]
             entries = [e for e in entries if e.entry_id not in exclusions]
         return entries
 
+    def _add_entries_node(self, chemsys, trypreload=False, e_above_hull_cutoff=None, verbose=False):
+        """
+        Node of the fetched (and pruned) entries of a chemical system, without the entry itself.
+        With e_above_hull_cutoff, the entries are pruned in the same node, so only the pruned entries are kept.
+        """
+        name = get_entries_node_name(chemsys, trypreload, e_above_hull_cutoff)
+        if name not in self.graph:
+            fetch, dependencies = self._get_entries_function(chemsys, trypreload)
+            if e_above_hull_cutoff is None:
+                self.graph.add_node(name, fetch, dependencies)
+            else:
+                def fetch_and_prune(*args):
+                    kept, report = prune_entries(fetch(*args), e_above_hull_cutoff)
+                    if verbose:
+                        print(get_printable_pruning_report(report))
+                    return kept
+                self.graph.add_node(name, fetch_and_prune, dependencies)
+        return name
+
+    def _get_entries_function(self, chemsys, trypreload=False):
+        """
+        :return: (function, dependencies) giving the entries of a chemical system. They are taken from the
+        entries of a larger chemical system if those were already fetched.
+        """
+        chemsys, trypreload = get_entries_node_name(chemsys, trypreload)[1:3]
+        for other in self.graph.get_cached_names():
+            parsed = parse_entries_node_name(other)
+            if parsed and parsed[1] == trypreload and parsed[2] is None and set(chemsys) < set(parsed[0]):
+                return lambda entries: [e for e in entries if set(
+                    el.symbol for el in e.composition.elements) <= set(chemsys)], [other]
+        if trypreload:
+            return lambda: list(self.get_PD_entries_from_preload_file(list(chemsys))), []
+        return lambda: list(self.get_PD_entries_from_MP(list(chemsys))), []
+
+    def _add_pd_node(self, chemsys, trypreload=False):
+        """
+        Node of the PhaseDiagram of the fetched entries of a chemical system and the entry itself.
+        """
+        source = self._add_entries_node(chemsys, trypreload)
+        name = get_pd_node_name(chemsys, trypreload)
+        if name not in self.graph:
+            self.graph.add_node(name, lambda entries: PhaseDiagram(list(entries) + [self]), [source, 'energy'])
+        return name
+
     @staticmethod
     def get_PD_entries_from_MP(chemsys):
         with MPRester() as m:
@@ -103,6 +185,11 @@ class VirtualEntry(ComputedEntry):
 
         return entries
 
+    @staticmethod
+    def get_preload_file_path(chemsys):
+        el_list = sorted(set(str(x) for x in chemsys))
+        return os.path.join(PD_PRELOAD_PATH, "_".join(el_list) + "_Entries.json")
+
     @staticmethod
     def get_PD_entries_from_preload_file(chemsys):
         """
@@ -116,8 +203,7 @@ class VirtualEntry(ComputedEntry):
             warnings.warn("\nPMG_PD_PRELOAD_PATH is not a valid folder path."
                           "\nPlease reset PMG_PD_PRELOAD_PATH in ~/.pmgrc.yaml")
 
-        el_list = [x.symbol for x in sorted(set(chemsys))]
-        load_path = os.path.join(PD_PRELOAD_PATH, "_".join(el_list) + "_Entries.json")
+        load_path = VirtualEntry.get_preload_file_path(chemsys)
         try:
             with open(load_path) as f:
                 entries = json.load(f, cls=MontyDecoder)
@@ -127,18 +213,25 @@ class VirtualEntry(ComputedEntry):
                 json.dump(entries, f, cls=MontyEncoder)
         return entries
 
-    def get_decomp_entries_and_e_above_hull(self, entries=None, exclusions=None, trypreload=None):
-        if not entries:
-            entries = self.get_PD_entries(exclusions=exclusions, trypreload=trypreload)
-        pd = PhaseDiagram(entries)
+    def get_decomp_entries_and_e_above_hull(self, entries=None, exclusions=None, trypreload=None, pd=None):
+        """
+        :param pd: an already built PhaseDiagram of the chemical system. If given, entries are not used.
+        """
+        if pd is None:
+            if entries:
+                pd = PhaseDiagram(entries)
+            elif exclusions:
+                pd = PhaseDiagram(self.get_PD_entries(exclusions=exclusions, trypreload=trypreload))
+            else:
+                pd = self.graph.get(self._add_pd_node(self.chemsys, trypreload))
         decomp_entries, hull_energy = pd.get_decomp_and_e_above_hull(self)
         return decomp_entries, hull_energy
 
-    def stabilize(self, entries=None):
+    def stabilize(self, entries=None, pd=None):
         """
         Stabilize an entry by putting it on the convex hull
         """
-        decomp_entries, hull_energy = self.get_decomp_entries_and_e_above_hull(entries=entries)
+        decomp_entries, hull_energy = self.get_decomp_entries_and_e_above_hull(entries=entries, pd=pd)
         self.correction -= (hull_energy * self.composition.num_atoms + 1e-8)
         return None
 
@@ -172,19 +265,38 @@ class VirtualEntry(ComputedEntry):
     def get_gppd_entries(self, chempot, exclusions=None, trypreload=False):
         return self.get_PD_entries(sup_el=list(chempot.keys()), exclusions=exclusions, trypreload=trypreload)
 
-    def get_decomposition_in_gppd(self, chempot, entries=None, exclusions=None, trypreload=False):
-        gppd_entries = entries if entries \
-            else self.get_gppd_entries(chempot, exclusions=exclusions, trypreload=trypreload)
-        pd = PhaseDiagram(gppd_entries)
+    @staticmethod
+    def _get_gppd(pd, chempot):
+        """
+        :return: (GrandPotentialPhaseDiagram of the stable entries of pd, open element entries at chempot)
+        """
         gppd_entries = pd.stable_entries
-        open_el_entries = [_ for _ in gppd_entries if
+        # Copies, so that the entries given by the caller are not changed by the chempot correction below
+        open_el_entries = [copy.deepcopy(_) for _ in gppd_entries if
                            _.is_element and _.composition.elements[0].symbol in chempot.keys()]
         el_ref = {_.composition.elements[0].symbol: _.energy_per_atom for _ in open_el_entries}
         chempot_vaspref = {_: chempot[_] + el_ref[_] for _ in chempot}
         for open_entry in open_el_entries:
             open_entry.correction += chempot_vaspref[open_entry.composition.elements[0].symbol]
+        return GrandPotentialPhaseDiagram(gppd_entries, chempot_vaspref), open_el_entries
 
-        GPPD = GrandPotentialPhaseDiagram(gppd_entries, chempot_vaspref)
+    def get_decomposition_in_gppd(self, chempot, entries=None, exclusions=None, trypreload=False):
+        """
+        Without entries and exclusions, the grand potential hull at chempot is cached in graph.
+        """
+        if entries or exclusions:
+            gppd_entries = entries if entries \
+                else self.get_gppd_entries(chempot, exclusions=exclusions, trypreload=trypreload)
+            GPPD, open_el_entries = self._get_gppd(PhaseDiagram(gppd_entries), chempot)
+        else:
+            # The node is named after the chempot of now, so later changes of the caller's dict must not matter
+            chempot = dict(chempot)
+            chemsys = self.chemsys + list(chempot.keys())
+            source = self._add_pd_node(chemsys, trypreload)
+            name = get_gppd_node_name(chempot, chemsys, trypreload)
+            if name not in self.graph:
+                self.graph.add_node(name, lambda pd: self._get_gppd(pd, chempot), [source])
+            GPPD, open_el_entries = self.graph.get(name)
         GPComp = self.GPComp(chempot)
         decomp_GP_entries = GPPD.get_decomposition(GPComp)
         decomp_entries = [gpe.original_entry for gpe in decomp_GP_entries]
@@ -211,11 +323,38 @@ class VirtualEntry(ComputedEntry):
         return string
 
     def get_phase_evolution_profile(self, oe, allowpmu=False, entries=None,exclusions=None):
-        pd_entries = entries if entries else self.get_PD_entries(sup_el=[oe],exclusions=exclusions)
+        """
+        Without entries and exclusions, the profile is cached in graph until the energy of the entry changes.
+        Do not modify the returned profile.
+        """
+        if entries or exclusions:
+            pd_entries = entries if entries else self.get_PD_entries(sup_el=[oe], exclusions=exclusions)
+            return self._get_phase_evolution_profile(oe, pd_entries, allowpmu=allowpmu)
+        name = get_open_element_node_name('profile', oe, bool(allowpmu))
+        if name not in self.graph:
+            if allowpmu:
+                source = self._add_entries_node(self.chemsys + [str(oe)])
+                self.graph.add_node(name, lambda fetched: self._get_phase_evolution_profile(
+                    oe, list(fetched) + [self], allowpmu=True), [source, 'energy'])
+            else:
+                source = self._add_pd_node(self.chemsys + [str(oe)])
+                self.graph.add_node(name, lambda pd: self._get_phase_evolution_profile(oe, pd=pd), [source])
+        return self.graph.get(name)
+
+    def _get_phase_evolution_profile(self, oe, pd_entries=None, allowpmu=False, pd=None):
+        """
+        :param pd: the PhaseDiagram of pd_entries, if it is already built (only without allowpmu)
+        """
+        if pd is not None:
+            return pd.get_element_profile(oe, self.composition.reduced_composition)
         offset = 30 if allowpmu else 0
-        for e in pd_entries:
-            if e.composition.is_element and oe in e.composition.keys():
-                e.correction += offset * e.composition.num_atoms
+        if offset:
+            # Shift copies of the open element entries, so that the entries given by the caller are not changed
+            pd_entries = list(pd_entries)
+            for i, e in enumerate(pd_entries):
+                if e.composition.is_element and oe in e.composition:
+                    pd_entries[i] = copy.deepcopy(e)
+                    pd_entries[i].correction += offset * e.composition.num_atoms
         pd = PhaseDiagram(pd_entries)
         evolution_profile = pd.get_element_profile(oe, self.composition.reduced_composition)
         el_ref = evolution_profile[0]['element_reference']
@@ -224,7 +363,18 @@ class VirtualEntry(ComputedEntry):
         return evolution_profile
 
 
-    def get_stability_window(self,oe,allowpmu=False, entries=None):
+    def get_stability_window(self,oe,allowpmu=False, entries=None, chempot_index=None):
+        """
+        :param chempot_index: a TransitionChempotIndex of the chemical system with oe. If the entry is on or above
+        its hull, the window is taken from it: a phase above the hull is never stable, and a stable phase of the
+        index is stable between its transition chemical potentials.
+        :return: (mu_high, mu_low) referenced to the pure element. mu_low is None for -inf.
+        """
+        if chempot_index is not None and not allowpmu and chempot_index.open_el == str(oe) \
+                and set(chempot_index.chemsys) == set(self.chemsys) | {str(oe)}:
+            window = chempot_index.get_entry_stability_window(self)
+            if window is not None:
+                return window
         profile = self.get_phase_evolution_profile(oe=oe,allowpmu=allowpmu,entries=entries)
         chempots = [_['chempot'] for _ in profile]
         evolutions = [_['evolution'] for _ in profile]
@@ -248,7 +398,11 @@ class VirtualEntry(ComputedEntry):
 
 
 
-    def get_evolution_phases_table_string(self, open_el, pure_el_ref, PE_list, oe_amt_list, mu_trans_list, allowpmu):
+    def get_evolution_phases_table_string(self, open_el, pure_el_ref, PE_list, oe_amt_list, mu_trans_list, allowpmu,
+                                          curve=None):
+        """
+        :param curve: ReactionEnergyCurve of the same lists, whose reactions are used instead of building them again
+        """
         if not allowpmu:
             mu_h_list = [0] + mu_trans_list
         mu_l_list = mu_h_list[1:] + ['-inf']
@@ -258,9 +412,14 @@ class VirtualEntry(ComputedEntry):
         df['d(n_{})'.format(open_el)] = oe_amt_list
         PE_names = []
         rxns = []
-        for PE in PE_list:
-            rxn = ComputedReaction([self, pure_el_ref], PE)
-            rxn.normalize_to(self.composition.reduced_composition)
+        # The reactions of the curve go from low to high mu
+        curve_rxns = curve.reactions[::-1] if curve is not None and curve.reactions else None
+        for i, PE in enumerate(PE_list):
+            if curve_rxns:
+                rxn = curve_rxns[i]
+            else:
+                rxn = ComputedReaction([self, pure_el_ref], PE)
+                rxn.normalize_to(self.composition.reduced_composition)
             PE_names.append(', '.join(sorted([_.name for _ in PE])))
             rxns.append(str(rxn))
         df['Phase equilibria'] = PE_names
@@ -268,41 +427,63 @@ class VirtualEntry(ComputedEntry):
         print_df = df.to_string(index=False, float_format='{:,.2f}'.format, justify='center')
         return print_df
 
-    def get_rxn_e_table_string(self, pure_el_ref, open_el, PE_list, oe_amt_list, mu_trans_list, plot_rxn_e):
+    def get_rxn_e_data(self, pure_el_ref, PE_list, oe_amt_list, mu_trans_list, curve=None):
+        """
+        Reaction energy (eV/atom) at each transition chemical potential, extended a little beyond both ends.
+        :param curve: ReactionEnergyCurve of the same lists, built here if not given
+        :return: (chemical potential list, reaction energy list)
+        """
+        if curve is None:
+            curve = ReactionEnergyCurve.from_evolution_lists(self, pure_el_ref, PE_list, oe_amt_list, mu_trans_list)
         neg_flag = (max(mu_trans_list) > 1e-6)
-        rxn_trans_list = [mu for mu in mu_trans_list]
-        rxn_e_list = []
         ext = 0.2
-        rxn_trans_list = [rxn_trans_list[0] + ext] + rxn_trans_list if neg_flag else [0] + rxn_trans_list
-        for data in zip(oe_amt_list, PE_list, rxn_trans_list):
-            oe_amt, PE, ext_miu = data
-            rxn = ComputedReaction([self, pure_el_ref], PE)
-            rxn.normalize_to(self.composition.reduced_composition)
-            rxn_e_list.append(rxn.calculated_reaction_energy - oe_amt * ext_miu)
+        rxn_trans_list = [mu_trans_list[0] + ext] + mu_trans_list if neg_flag else [0] + mu_trans_list
         rxn_trans_list = rxn_trans_list + [rxn_trans_list[-1] - ext]
-        rxn_e_list = rxn_e_list + [rxn_e_list[-1] + ext * oe_amt_list[-1]]
-        rxn_e_list = [e / self.composition.num_atoms for e in rxn_e_list]
+        rxn_e_list = curve.get_rxn_e(rxn_trans_list).tolist()
+        return rxn_trans_list, rxn_e_list
+
+    def get_rxn_e_curve(self, open_el, entries=None, allowpmu=False):
+        """
+        :return: ReactionEnergyCurve of the decomposition energy (eV/atom) vs the chemical potential of open_el
+            (referenced to the pure element), to be evaluated on mu arrays
+        """
+        pure_el_ref, PE_list, oe_amt_list, miu_trans_list = self.get_evolution_lists(open_el, entries=entries,
+                                                                                     allowpmu=allowpmu)
+        return ReactionEnergyCurve.from_evolution_lists(self, pure_el_ref, PE_list, oe_amt_list, miu_trans_list)
+
+    def get_rxn_e_table_string(self, pure_el_ref, open_el, PE_list, oe_amt_list, mu_trans_list, plot_rxn_e,
+                               curve=None):
+        rxn_trans_list, rxn_e_list = self.get_rxn_e_data(pure_el_ref, PE_list, oe_amt_list, mu_trans_list,
+                                                         curve=curve)
         df = pandas.DataFrame()
         df["miu_{} (eV)".format(open_el)] = rxn_trans_list
         df["Rxn energy (eV/atom)"] = rxn_e_list
 
         if plot_rxn_e:
             plt.figure(figsize=(8, 6))
-            ax = plt.gca()
-            ax.invert_xaxis()
-            ax.axvline(0, linestyle='--', color='k', linewidth=0.5, zorder=1)
-            ax.plot(rxn_trans_list, rxn_e_list, '-', linewidth=1.5, color='cornflowerblue', zorder=3)
-            ax.scatter(rxn_trans_list[1:-1], rxn_e_list[1:-1], edgecolors='cornflowerblue', facecolors='w',
-                       linewidth=1.5, s=50, zorder=4)
-            ax.set_xlabel('Chemical potential ref. to {}'.format(open_el))
-            ax.set_ylabel('Reaction energy (eV/atom)')
-            ax.set_xlim([float(rxn_trans_list[0]), float(rxn_trans_list[-1])])
+            plot_rxn_e_profile(plt.gca(), open_el, rxn_trans_list, rxn_e_list)
             plt.show()
         print_df = df.to_string(index=False, float_format='{:,.2f}'.format, justify='center')
 
         return print_df
 
-    def get_printable_evolution_profile(self, open_el, entries=None, plot_rxn_e=True, allowpmu=False):
+    @staticmethod
+    def get_rxn_e_grid_table_string(open_el, curve, mu_high, mu_low, n_grid):
+        """
+        Reaction energy and phase equilibria of a ReactionEnergyCurve on n_grid evenly spaced chemical potentials
+        """
+        grid = np.linspace(mu_high, mu_low, n_grid)
+        df = pandas.DataFrame()
+        df["miu_{} (eV)".format(open_el)] = grid
+        df["Rxn energy (eV/atom)"] = curve.get_rxn_e(grid)
+        df["Phase equilibria"] = [', '.join(names) for names in curve.get_phase_equilibria(grid)]
+        return df.to_string(index=False, float_format='{:,.3f}'.format, justify='center')
+
+    def get_evolution_lists(self, open_el, entries=None, allowpmu=False):
+        """
+        :return: (pure element reference entry, phase equilibria list, open element amount list,
+                  transition chemical potential list referenced to the pure element)
+        """
         evolution_profile = self.get_phase_evolution_profile(open_el, entries=entries, allowpmu=allowpmu)
 
         PE_list = [list(stage['entries']) for stage in evolution_profile]
@@ -312,28 +493,50 @@ class VirtualEntry(ComputedEntry):
         miu_trans_list = [stage['chempot'] for stage in evolution_profile][1:]  # The first chempot is always useless
         miu_trans_list = sorted(miu_trans_list, reverse=True)
         miu_trans_list = [miu - pure_el_ref.energy_per_atom for miu in miu_trans_list]
+        return pure_el_ref, PE_list, oe_amt_list, miu_trans_list
+
+    def get_rxn_e_plot_data(self, open_el, entries=None, allowpmu=False):
+        """
+        :return: (chemical potential list, reaction energy list) for plotting reaction energy vs chemical potential
+        """
+        pure_el_ref, PE_list, oe_amt_list, miu_trans_list = self.get_evolution_lists(open_el, entries=entries,
+                                                                                     allowpmu=allowpmu)
+        return self.get_rxn_e_data(pure_el_ref, PE_list, oe_amt_list, miu_trans_list)
+
+    def get_printable_evolution_profile(self, open_el, entries=None, plot_rxn_e=True, allowpmu=False, n_grid=None):
+        """
+        :param n_grid: if given, also print the reaction energy on n_grid evenly spaced chemical potentials
+            over the range of the reaction energy table
+        """
+        pure_el_ref, PE_list, oe_amt_list, miu_trans_list = self.get_evolution_lists(open_el, entries=entries,
+                                                                                     allowpmu=allowpmu)
+        # The reactions are built once, for all tables
+        curve = ReactionEnergyCurve.from_evolution_lists(self, pure_el_ref, PE_list, oe_amt_list, miu_trans_list)
 
         table1 = self.get_evolution_phases_table_string(open_el, pure_el_ref, PE_list, oe_amt_list, miu_trans_list,
-                                                        allowpmu)
-        table2 = self.get_rxn_e_table_string(pure_el_ref, open_el, PE_list, oe_amt_list, miu_trans_list, plot_rxn_e)
+                                                        allowpmu, curve=curve)
+        table2 = self.get_rxn_e_table_string(pure_el_ref, open_el, PE_list, oe_amt_list, miu_trans_list, plot_rxn_e,
+                                             curve=curve)
 
         output = ['-' * 60, "Reduced formula of the given composition: " + self.composition.reduced_formula,
-                  '\n === Evolution Profile ===', str(table1), '\n === Reaction energy ===', str(table2),
-                  'Note:\nChemical potential referenced to element phase.',
-                  'Reaction energy is normalized to per atom of the given composition.']
+                  '\n === Evolution Profile ===', str(table1), '\n === Reaction energy ===', str(table2)]
+        if n_grid:
+            rxn_trans_list, _ = self.get_rxn_e_data(pure_el_ref, PE_list, oe_amt_list, miu_trans_list, curve=curve)
+            table3 = self.get_rxn_e_grid_table_string(open_el, curve, rxn_trans_list[0], rxn_trans_list[-1], n_grid)
+            output += ['\n === Reaction energy on mu grid ===', table3]
+        output += ['Note:\nChemical potential referenced to element phase.',
+                   'Reaction energy is normalized to per atom of the given composition.']
         string = '\n'.join(output)
         return string
 
     def get_vc_plot_data(self, open_el, valence=None, entries=None, allowpmu=True):
-        common_working_ion = {Element('Li'): 1, Element('Na'): 1, Element('K'): 1, Element('Mg'): 2, Element('Ca'): 2,
-                              Element('Zn'): 2, Element('Al'): 3}
         if valence:
             ioncharge = valence
         else:
-            if open_el not in common_working_ion.keys():
-                raise ValueError('Working ion {} not supported. You can provide charge manually'.format(open_el.symbol))
+            if str(open_el) not in COMMON_WORKING_IONS:
+                raise ValueError('Working ion {} not supported. You can provide charge manually'.format(open_el))
             else:
-                ioncharge = common_working_ion[open_el]
+                ioncharge = COMMON_WORKING_IONS[str(open_el)]
 
         evolution_profile = self.get_phase_evolution_profile(open_el, entries=entries, allowpmu=allowpmu)
         oe_list = []
@@ -350,6 +553,37 @@ class VirtualEntry(ComputedEntry):
 
         return oe_list, v_list
 
+    def get_multi_ion_vc_data(self, ions=None, valences=None, entries=None, trypreload=False, allowpmu=True):
+        """
+        Voltage profiles of several working ions at once. The entries of the union chemical system are fetched once,
+        and the hull of the host chemical system is built once: only its stable entries, plus the entries with the
+        working ion, go into the hull of each working ion.
+        :param ions: working ion symbols, default DEFAULT_WORKING_IONS
+        :param valences: {ion: valence} for the ions not in COMMON_WORKING_IONS, or to override them
+        :param entries: entries of the chemical system with all working ions
+        :return: {ion: (array of open element amounts, array of voltages)}, as in get_vc_plot_data
+        """
+        ions = [str(ion) for ion in ions] if ions else list(DEFAULT_WORKING_IONS)
+        valences = valences if valences else {}
+        for ion in ions:
+            if ion not in valences and ion not in COMMON_WORKING_IONS:
+                raise ValueError('Working ion {} not supported. You can provide charge manually'.format(ion))
+        if not entries:
+            entries = self.get_PD_entries(sup_el=ions, trypreload=trypreload)
+
+        host_els = set(self.chemsys)
+        entry_els = [set(el.symbol for el in e.composition.elements) for e in entries]
+        host_stable_entries = list(PhaseDiagram([e for e, els in zip(entries, entry_els)
+                                                 if els <= host_els]).stable_entries)
+        profiles = {}
+        for ion in ions:
+            ion_entries = [e for e, els in zip(entries, entry_els)
+                           if ion in els and els <= host_els | {ion} and not els <= host_els]
+            oe_list, v_list = self.get_vc_plot_data(ion, valence=valences.get(ion),
+                                                    entries=host_stable_entries + ion_entries, allowpmu=allowpmu)
+            profiles[ion] = (np.array(oe_list), np.array(v_list))
+        return profiles
+
     def get_printable_vc_plot_data(self, open_el, oe_list, v_list):
         df = pandas.DataFrame()
         oes, vs = [], []
@@ -364,21 +598,44 @@ class VirtualEntry(ComputedEntry):
         return print_df
 
     def get_voltage_profile_plot(self, open_el, oe_list, v_list, valence):
-        X, Y = [], []
-        for i in range(len(oe_list) - 1):
-            X += [oe_list[i], oe_list[i + 1]]
-            Y += [v_list[i], v_list[i]]
         fig, ax = plt.subplots(1, 1)
-        plt.plot(X, Y)
-        ylabel = 'Potential ref. to {} / '.format(open_el, open_el, valence)
-        sup = r'${}^{{{}+}}$'.format(open_el.symbol, valence) if valence > 1 else r'${}^{{+}}$'.format(open_el)
-        ax.set_ylabel(ylabel + sup)
-        s1 = re.sub("([0-9]+)", "_{\\1}", self.name)
-        formula = '$\mathregular{' + s1 + '}$'
-        ax.set_xlabel('$\Delta$n({}) per {}'.format(open_el, formula))
-        ax.legend([formula])
-        if min(ax.get_ylim()) < 0:
-            ax.axhline(0, linestyle='--', color='k', linewidth=0.5, zorder=1)
-        else:
-            ax.set_ylim(bottom=0)
+        plot_voltage_profile(ax, self.name, open_el, oe_list, v_list, valence)
         return plt
+
+
+def plot_voltage_profile(ax, name, open_el, oe_list, v_list, valence):
+    """
+    Draw a voltage profile on the given axes. Works with both pyplot and stand-alone (headless) figures.
+    """
+    X, Y = [], []
+    for i in range(len(oe_list) - 1):
+        X += [oe_list[i], oe_list[i + 1]]
+        Y += [v_list[i], v_list[i]]
+    ax.plot(X, Y)
+    ylabel = 'Potential ref. to {} / '.format(open_el)
+    sup = r'${}^{{{}+}}$'.format(open_el, valence) if valence > 1 else r'${}^{{+}}$'.format(open_el)
+    ax.set_ylabel(ylabel + sup)
+    s1 = re.sub("([0-9]+)", "_{\\1}", name)
+    formula = '$\mathregular{' + s1 + '}$'
+    ax.set_xlabel('$\Delta$n({}) per {}'.format(open_el, formula))
+    ax.legend([formula])
+    if min(ax.get_ylim()) < 0:
+        ax.axhline(0, linestyle='--', color='k', linewidth=0.5, zorder=1)
+    else:
+        ax.set_ylim(bottom=0)
+    return ax
+
+
+def plot_rxn_e_profile(ax, open_el, mu_list, rxn_e_list):
+    """
+    Draw reaction energy vs chemical potential on the given axes.
+    """
+    ax.invert_xaxis()
+    ax.axvline(0, linestyle='--', color='k', linewidth=0.5, zorder=1)
+    ax.plot(mu_list, rxn_e_list, '-', linewidth=1.5, color='cornflowerblue', zorder=3)
+    ax.scatter(mu_list[1:-1], rxn_e_list[1:-1], edgecolors='cornflowerblue', facecolors='w',
+               linewidth=1.5, s=50, zorder=4)
+    ax.set_xlabel('Chemical potential ref. to {}'.format(open_el))
+    ax.set_ylabel('Reaction energy (eV/atom)')
+    ax.set_xlim([float(mu_list[0]), float(mu_list[-1])])
+    return ax
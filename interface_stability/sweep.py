@@ -0,0 +1,178 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.pseudobinary import get_full_evolution_profile, clean_profile, get_profile_data
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+# Any positive energy above the hull, used to compute the profile shared by all end members above the hull
+_E_ABOVE_HULL_REF = 1.0
+
+
+class EnergyCorrectionSweep(object):
+    """
+    Sensitivity of the pseudo-binary (PD) mixing profile to the energy corrections (eV/atom) of both end members,
+    i.e. the -e1/-e2 options of pseudo_binary.
+
+    The energy of each end member above the hull without both end members (negative for a novel phase below it,
+    about 0 for a stabilized VirtualEntry) is computed first. When a correction puts an end member above the hull,
+    the hull is the same as without it: the phase equilibria along the mixing line do not change, and the reaction
+    energies are shifted linearly. Such profiles are computed once, and only the corrections keeping an end member
+    on the hull (correction <= -e above hull) need a new hull.
+    Lowering an end member can only remove vertices of the hull without it, so this new hull is built from the
+    stable entries of the hull without both end members, not from all entries.
+    The entries of the chemical system are fetched only once, and only the last max_profiles profiles are kept.
+    """
+
+    def __init__(self, entry1, entry2, entries=None, max_profiles=16):
+        """
+        :param entry1, entry2: end members before energy correction
+        :param entries: entries of the chemical system, without entry1 and entry2. Fetched from MP if None.
+        :param max_profiles: number of profiles kept, the least recently used ones are dropped first
+        """
+        self.entry1 = entry1
+        self.entry2 = entry2
+        if not entries:
+            entries = VirtualEntry.from_composition(entry1.composition + entry2.composition).get_PD_entries()
+        self.entries = list(entries)
+        self.max_profiles = max_profiles
+        self._base_pd = None
+        self._e_above_hull = None
+        self._profiles = OrderedDict()
+
+    @property
+    def base_pd(self):
+        """
+        The hull without both end members, shared by all positive corrections.
+        """
+        if self._base_pd is None:
+            self._base_pd = PhaseDiagram(self.entries)
+        return self._base_pd
+
+    @property
+    def e_above_hull(self):
+        """
+        (e1, e2), energies (eV/atom) of the end members above the hull without both end members, before correction.
+        Negative if an end member is below it.
+        """
+        if self._e_above_hull is None:
+            self._e_above_hull = tuple(entry.energy_per_atom - self.base_pd.get_hull_energy(entry.composition) /
+                                       entry.composition.num_atoms for entry in (self.entry1, self.entry2))
+        return self._e_above_hull
+
+    @staticmethod
+    def _corrected_entry(entry, e, normalize=False):
+        comp = entry.composition
+        norm = 1.0 / comp.num_atoms if normalize else 1.0
+        return VirtualEntry.from_composition(comp * norm, energy=(entry.energy + e * comp.num_atoms) * norm,
+                                             name=comp.reduced_formula)
+
+    def get_profile(self, e1, e2):
+        """
+        Cleaned PD mixing profile with corrections e1 and e2 (eV/atom), the same as PseudoBinary.pd_mixing.
+        """
+        # The corrections of the end members above the hull share one profile
+        key = tuple(e if e + e0 <= 0 else None for e, e0 in zip((e1, e2), self.e_above_hull))
+        if key not in self._profiles:
+            ref1, ref2 = [max(-e0, 0.0) + _E_ABOVE_HULL_REF if e is None else e
+                          for e, e0 in zip(key, self.e_above_hull)]
+            hull_entries = [self._corrected_entry(entry, e) for entry, e in
+                            [(self.entry1, key[0]), (self.entry2, key[1])] if e is not None]
+            pd = PhaseDiagram(list(self.base_pd.stable_entries) + hull_entries) if hull_entries else self.base_pd
+            mix1 = self._corrected_entry(self.entry1, ref1, normalize=True)
+            mix2 = self._corrected_entry(self.entry2, ref2, normalize=True)
+            profile = clean_profile(get_full_evolution_profile(pd, mix1, mix2, 0.0, 1.0))
+            self._profiles[key] = (profile, ref1, ref2)
+            if len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        self._profiles.move_to_end(key)
+        profile, ref1, ref2 = self._profiles[key]
+        # Energy above hull of the mixture is linear in the corrections of the end members above the hull
+        return [(x, (decomp, h + x * (e1 - ref1) + (1 - x) * (e2 - ref2))) for x, (decomp, h) in profile]
+
+    def get_summary(self, e1, e2):
+        """
+        :return: dict of the corrections, phase equilibria along the mixing line, and the mutual reaction
+                 energy minimum (x, phase equilibria, energy in eV/atom)
+        """
+        data = get_profile_data(self.get_profile(e1, e2))
+        min_step = min(data, key=lambda step: step['mutual_rxn_e'])
+        return {'e1': e1, 'e2': e2,
+                'phase_equilibria': [step['phase_equilibria'] for step in data],
+                'min_x': min_step['x'],
+                'min_phase_equilibria': min_step['phase_equilibria'],
+                'min_mutual_rxn_e': min_step['mutual_rxn_e']}
+
+    @staticmethod
+    def _signature(summary):
+        return (tuple(tuple(pe) for pe in summary['phase_equilibria']), tuple(summary['min_phase_equilibria']))
+
+    def scan(self, e1_values, e2_values):
+        """
+        Summaries on a grid of corrections.
+        :return: list of summaries, for all combinations of e1 in e1_values and e2 in e2_values
+        """
+        return [self.get_summary(e1, e2) for e1 in e1_values for e2 in e2_values]
+
+    def find_transitions(self, e_lo, e_hi, endpoint=1, other=0.0, n=21, tol=1e-3):
+        """
+        Find the corrections of one end member where the phase equilibria along the mixing line or the phase
+        equilibria at the mutual reaction energy minimum change. A grid is scanned first, and each change is
+        then located by bisection.
+
+        :param e_lo, e_hi: range of the correction (eV/atom)
+        :param endpoint: 1 or 2, which end member is corrected
+        :param other: the fixed correction of the other end member
+        :param n: number of grid points
+        :param tol: precision of the transition corrections (eV/atom)
+        :return: list of (correction, summary below, summary above)
+        """
+        if endpoint not in (1, 2):
+            raise ValueError("endpoint must be 1 or 2")
+
+        def summary(e):
+            return self.get_summary(e, other) if endpoint == 1 else self.get_summary(other, e)
+
+        grid = [summary(e) for e in np.linspace(min(e_lo, e_hi), max(e_lo, e_hi), n)]
+        key = 'e1' if endpoint == 1 else 'e2'
+        transitions = []
+        for lo, hi in zip(grid[:-1], grid[1:]):
+            if self._signature(lo) == self._signature(hi):
+                continue
+            # Several transitions within one grid step are reported as one
+            while hi[key] - lo[key] > tol:
+                mid = summary((lo[key] + hi[key]) / 2.0)
+                if self._signature(mid) == self._signature(lo):
+                    lo = mid
+                else:
+                    hi = mid
+            transitions.append(((lo[key] + hi[key]) / 2.0, lo, hi))
+        return transitions
+
+
+def get_printable_transitions(transitions, endpoint_name):
+    """
+    Generate a printable table for the results of EnergyCorrectionSweep.find_transitions
+    """
+    if not transitions:
+        return "No transition of {} found in the given range".format(endpoint_name)
+    df = pandas.DataFrame()
+    df["E. corr. of {} (eV/atom)".format(endpoint_name)] = [t[0] for t in transitions]
+    df["Min. PE below"] = [", ".join(t[1]['min_phase_equilibria']) for t in transitions]
+    df["Min. PE above"] = [", ".join(t[2]['min_phase_equilibria']) for t in transitions]
+    df["Mutual Rxn. E. Min. below (meV/atom)"] = [t[1]['min_mutual_rxn_e'] * 1000 for t in transitions]
+    df["Mutual Rxn. E. Min. above (meV/atom)"] = [t[2]['min_mutual_rxn_e'] * 1000 for t in transitions]
+    return df.to_string(index=False, float_format='{:,.3f}'.format, justify='center')
@@ -0,0 +1,57 @@
+import shutil
+import tempfile
+import unittest
+
+from pymatgen import Element
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+from pymatgen.entries.computed_entries import ComputedEntry
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.chempotindex import TransitionChempotIndex, load_chempot_index
+
+
+class TransitionChempotIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.entries = [ComputedEntry('Li', -1.9), ComputedEntry('O2', -9.8), ComputedEntry('P', -5.4),
+                        ComputedEntry('Li2O', -14.3), ComputedEntry('Li2O2', -19.0), ComputedEntry('Li3P', -9.0),
+                        ComputedEntry('Li3PO4', -48.3), ComputedEntry('LiPO3', -34.0), ComputedEntry('P2O5', -52.1)]
+        self.pd = PhaseDiagram(self.entries)
+        self.index = TransitionChempotIndex.from_pd(self.pd, 'Li')
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_transition_chempots(self):
+        el_ref = self.pd.el_refs[Element('Li')].energy_per_atom
+        reference = [mu - el_ref for mu in self.pd.get_transition_chempots(Element('Li'))]
+        self.assertEqual(len(self.index.transition_chempots), len(reference))
+        for mu, ref_mu in zip(self.index.transition_chempots, reference):
+            self.assertAlmostEqual(mu, ref_mu, 8)
+        self.assertIn('Li3PO4', self.index.get_stable_phases(-2.0) + self.index.get_stable_phases(-3.0))
+
+    def test_stability_window(self):
+        for formula in ['Li3PO4', 'LiPO3', 'P2O5', 'Li2O']:
+            entry = VirtualEntry.from_composition(formula)
+            entries = self.entries + [entry]
+            entry.stabilize(entries=entries)
+            reference = entry.get_stability_window('Li', entries=entries)
+            window = entry.get_stability_window('Li', entries=entries, chempot_index=self.index)
+            for mu, ref_mu in zip(window, reference):
+                if ref_mu is None:
+                    self.assertIsNone(mu)
+                else:
+                    self.assertAlmostEqual(mu, ref_mu, 6)
+        unstable = VirtualEntry.from_composition('Li4P2O7', energy=0.0)
+        self.assertEqual(self.index.get_entry_stability_window(unstable), (None, None))
+
+    def test_persistence(self):
+        index = load_chempot_index(['P', 'O'], 'Li', entries=self.entries, folder=self.folder)
+        loaded = load_chempot_index(['P', 'O'], 'Li', folder=self.folder)
+        self.assertEqual(loaded.transition_chempots, index.transition_chempots)
+        self.assertEqual(loaded.intervals, index.intervals)
+        self.assertAlmostEqual(loaded.get_hull_energy_per_atom('Li4P2O7'),
+                               self.pd.get_hull_energy(VirtualEntry.from_composition('Li4P2O7').composition) / 13, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+from pymatgen import Composition
+from pymatgen.analysis.phase_diagram import PhaseDiagram, PDEntry
+from pymatgen.entries.computed_entries import ComputedEntry
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.pseudobinary import PseudoBinary, get_profile_data
+from interface_stability.ensemble import EnergyEnsemble, get_confidence_interval
+
+
+class EnergyEnsembleTest(unittest.TestCase):
+    def setUp(self):
+        self.entries = [ComputedEntry('Li', -1.9), ComputedEntry('O2', -9.8), ComputedEntry('P', -5.4),
+                        ComputedEntry('Li2O', -14.3), ComputedEntry('Li2O2', -19.0),
+                        ComputedEntry('Li3PO4', -48.3), ComputedEntry('LiPO3', -34.0), ComputedEntry('P2O5', -52.1)]
+
+    def test_hull_energy(self):
+        ensemble = EnergyEnsemble(self.entries, sigma=0.03, n_samples=100, seed=0)
+        result = ensemble.get_hull_energy_samples('Li4P2O7')
+        self.assertLess(result['n_hulls'], 20)
+        comp = Composition('Li4P2O7')
+        for sample in range(0, 100, 9):
+            pd = PhaseDiagram([PDEntry(e.composition, ensemble.energies[i, sample] * e.composition.num_atoms)
+                               for i, e in enumerate(self.entries)])
+            self.assertAlmostEqual(result['hull_energy'][sample], pd.get_hull_energy(comp) / comp.num_atoms, 8)
+        parallel = ensemble.get_hull_energy_samples('Li4P2O7', processes=2)
+        self.assertTrue(np.allclose(parallel['hull_energy'], result['hull_energy']))
+
+    def test_outside_hull(self):
+        ensemble = EnergyEnsemble(self.entries, sigma=0.03, n_samples=10, seed=0)
+        with self.assertRaisesRegex(ValueError, 'Li2S'):
+            ensemble.get_hull_energy_samples('Li2S')
+        # A negative atomic fraction is in no facet
+        facets = ensemble.get_facets(ensemble.get_pd(0))
+        with self.assertRaisesRegex(ValueError, 'Li2 O-1 is not in any facet'):
+            ensemble.find_facet(facets, 2 * ensemble.get_coords('Li') - ensemble.get_coords('O2'))
+
+    def test_no_perturbation(self):
+        ensemble = EnergyEnsemble(self.entries, sigma=0.0, n_samples=10)
+        entry1 = VirtualEntry.from_composition('Li4P2O7')
+        entry2 = VirtualEntry.from_composition('P2O5')
+        ensemble = ensemble.stabilize(entry1).stabilize(entry2)
+        entry1.stabilize(entries=self.entries + [entry1])
+        entry2.stabilize(entries=self.entries + [entry2])
+
+        window = ensemble.get_stability_window_samples(entry1, 'Li')
+        self.assertEqual(window['n_hulls'], 1)
+        mu_high, mu_low = entry1.get_stability_window('Li', entries=self.entries + [entry1])
+        self.assertAlmostEqual(get_confidence_interval(window['mu_high'])['low'], mu_high, 6)
+        self.assertAlmostEqual(get_confidence_interval(window['mu_low'])['high'], mu_low, 6)
+
+        mixing = ensemble.get_mixing_samples(entry1, entry2)
+        data = get_profile_data(PseudoBinary(entry1, entry2, entries=list(self.entries)).pd_mixing())
+        min_step = min(data, key=lambda step: step['mutual_rxn_e'])
+        self.assertAlmostEqual(mixing['min_mutual_rxn_e'][0], min_step['mutual_rxn_e'], 6)
+        self.assertAlmostEqual(mixing['min_x'][0], min_step['x'], 6)
+        self.assertEqual(mixing['min_phase_equilibria'][0], ", ".join(min_step['phase_equilibria']))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from pymatgen import Composition
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+from pymatgen.entries.computed_entries import ComputedEntry
+from interface_stability.hullartifact import export_hull_artifact, HullArtifact
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.screening import EntrySet, run_job
+
+
+class HullArtifactTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        entries = [ComputedEntry('Li', -1.9), ComputedEntry('O2', -9.8), ComputedEntry('P', -5.4),
+                   ComputedEntry('Li2O', -14.3), ComputedEntry('Li2O2', -19.7), ComputedEntry('Li3PO4', -48.3),
+                   ComputedEntry('P2O5', -52.1), ComputedEntry('Li3P', -11.6), ComputedEntry('LiP', -7.9),
+                   ComputedEntry('Li2O', -13.0)]
+        self.entries = entries
+        self.pd = PhaseDiagram(entries)
+        self.path = export_hull_artifact(self.pd, os.path.join(self.tmpdir, 'Li_O_P_Hull'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_decomposition(self):
+        artifact = HullArtifact(self.path)
+        for formula in ['Li3PO4', 'LiPO3', 'Li5P2O3', 'Li', 'LiO']:
+            comp = Composition(formula)
+            decomp_pd = {e.name: amt for e, amt in self.pd.get_decomposition(comp).items()}
+            decomp_artifact = artifact.get_decomposition_names(comp)
+            self.assertEqual(sorted(decomp_pd), sorted(decomp_artifact))
+            for name in decomp_pd:
+                self.assertAlmostEqual(decomp_pd[name], decomp_artifact[name])
+            self.assertAlmostEqual(self.pd.get_hull_energy(comp), artifact.get_hull_energy(comp))
+
+    def test_e_above_hull(self):
+        artifact = HullArtifact(self.path, mmap=False)
+        entry = ComputedEntry('Li2O', -13.0)
+        self.assertAlmostEqual(self.pd.get_e_above_hull(entry), artifact.get_e_above_hull(entry))
+
+    def test_export_existing(self):
+        artifact = HullArtifact(self.path)
+        binary_pd = PhaseDiagram([e for e in self.entries if 'P' not in e.composition])
+        # An artifact in use is kept, the new one is discarded
+        self.assertEqual(export_hull_artifact(binary_pd, self.path), self.path)
+        self.assertEqual(HullArtifact(self.path).elements, artifact.elements)
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['Li_O_P_Hull'])
+        export_hull_artifact(binary_pd, self.path, overwrite=True)
+        self.assertEqual(len(HullArtifact(self.path).elements), 2)
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['Li_O_P_Hull'])
+        self.assertAlmostEqual(artifact.get_hull_energy('Li3PO4'), self.pd.get_hull_energy(Composition('Li3PO4')))
+
+    def test_entry_set(self):
+        job = {'type': 'stability', 'composition': 'Li4P2O7'}
+        folder = os.path.join(self.tmpdir, 'hulls')
+        os.mkdir(folder)
+        with mock.patch.object(VirtualEntry, 'get_PD_entries_from_MP', return_value=self.entries) as fetch:
+            entry_set = EntrySet(['Li', 'O', 'P'], hull_folder=folder)
+            self.assertIsInstance(entry_set.get_hull(), HullArtifact)
+            result = run_job(job, entry_set=entry_set)
+            self.assertEqual(fetch.call_count, 1)
+            # The artifact exported by the first entry set is loaded without fetching any entry
+            self.assertEqual(run_job(job, entry_set=EntrySet(['Li', 'O', 'P'], hull_folder=folder)), result)
+            self.assertEqual(fetch.call_count, 1)
+            self.assertEqual(run_job(job, entry_set=EntrySet(['Li', 'O', 'P'])), result)
+
+
+if __name__ == "__main__":
+    unittest.main()
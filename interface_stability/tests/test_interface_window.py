@@ -0,0 +1,48 @@
+import unittest
+
+from pymatgen.entries.computed_entries import ComputedEntry
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.pseudobinary import PseudoBinary, get_window_intersection
+
+
+class InterfaceWindowTest(unittest.TestCase):
+    def setUp(self):
+        self.entries = [ComputedEntry('Li', -1.9), ComputedEntry('O2', -9.8), ComputedEntry('P', -5.4),
+                        ComputedEntry('Li2O', -14.3), ComputedEntry('Li2O2', -19.0), ComputedEntry('Li3P', -9.0),
+                        ComputedEntry('Li3PO4', -48.3), ComputedEntry('LiPO3', -34.0), ComputedEntry('P2O5', -52.1)]
+        entry1 = VirtualEntry.from_composition('Li2O')
+        entry2 = VirtualEntry.from_composition('P2O5')
+        entry1.stabilize(entries=self.entries + [entry1])
+        entry2.stabilize(entries=self.entries + [entry2])
+        self.pb = PseudoBinary(entry1, entry2, entries=list(self.entries))
+
+    def get_reference_window(self, name):
+        entry = [e for e in self.pb.PD.stable_entries if e.name == name][0]
+        virtual_entry = VirtualEntry.from_composition(entry.composition, energy=entry.energy)
+        return virtual_entry.get_stability_window('Li', entries=self.pb.PDEntries + [virtual_entry])
+
+    def test_window_data(self):
+        data = self.pb.get_interface_window_data('Li')
+        self.assertEqual(len(data), len(self.pb.pd_mixing()))
+        self.assertEqual(data[0]['phase_equilibria'], ['P2O5'])
+        for step in data:
+            reference = get_window_intersection([self.get_reference_window(name)
+                                                 for name in step['phase_equilibria']])
+            for mu, ref_mu in zip([step['mu_high'], step['mu_low']], reference):
+                if ref_mu is None:
+                    self.assertIsNone(mu)
+                else:
+                    self.assertAlmostEqual(mu, ref_mu, 6)
+        # One hull with the open element for all mixing ratios, which is the PD here
+        self.assertEqual(self.pb.graph.n_computed['pd'], 1)
+        self.assertIn('P2O5', self.pb.get_printable_interface_window_data('Li'))
+
+    def test_window_intersection(self):
+        self.assertEqual(get_window_intersection([(-1.0, -3.0), (-2.0, None)]), (-2.0, -3.0))
+        self.assertEqual(get_window_intersection([(-1.0, None), (-2.0, None)]), (-2.0, None))
+        self.assertEqual(get_window_intersection([(-1.0, -1.5), (-2.0, None)]), (None, None))
+        self.assertEqual(get_window_intersection([(-1.0, -1.5), (None, None)]), (None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
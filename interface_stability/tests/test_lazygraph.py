@@ -0,0 +1,130 @@
+import unittest
+from unittest import mock
+
+from pymatgen.entries.computed_entries import ComputedEntry
+from interface_stability.lazygraph import LazyGraph, get_entries_node_name, parse_entries_node_name, \
+    get_pd_node_name, get_gppd_node_name
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.pseudobinary import PseudoBinary, get_profile_data
+
+
+class LazyGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = LazyGraph()
+        self.graph.set_input('a', 1)
+        self.graph.set_input('b', 2)
+        self.graph.add_node('c', lambda a: a * 10, ['a'])
+        self.graph.add_node('d', lambda b, c: b + c, ['b', 'c'])
+
+    def test_lazy(self):
+        self.assertFalse(self.graph.is_cached('d'))
+        self.assertEqual(self.graph.get('d'), 12)
+        self.assertEqual(self.graph.get('d'), 12)
+        self.assertEqual(self.graph.n_computed, {'c': 1, 'd': 1})
+        self.assertEqual(self.graph.get_or_add('e', lambda d: -d, ['d']), -12)
+        with self.assertRaises(KeyError):
+            self.graph.get('f')
+        with self.assertRaises(ValueError):
+            self.graph.set_input('c', 3)
+
+    def test_invalidation(self):
+        self.graph.get('d')
+        self.graph.set_input('b', 2)
+        self.assertTrue(self.graph.is_cached('d'))
+        self.graph.set_input('b', 3)
+        self.assertTrue(self.graph.is_cached('c'))
+        self.assertFalse(self.graph.is_cached('d'))
+        self.assertEqual(self.graph.get('d'), 13)
+        self.assertEqual(self.graph.n_computed, {'c': 1, 'd': 2})
+        self.graph.set_input('a', 2)
+        self.assertFalse(self.graph.is_cached('c'))
+        self.assertEqual(self.graph.get('d'), 23)
+        self.graph.add_node('c', lambda a: a * 100, ['a'])
+        self.assertEqual(self.graph.get('d'), 203)
+
+    def test_node_names(self):
+        name = get_entries_node_name(['P', 'Li', 'O', 'Li'], trypreload=1)
+        self.assertEqual(name, get_entries_node_name(('Li', 'O', 'P'), trypreload=True))
+        self.assertEqual(parse_entries_node_name(name), (('Li', 'O', 'P'), True, None))
+        self.assertIsNone(parse_entries_node_name(get_pd_node_name(['Li', 'O', 'P'])))
+        self.assertEqual(get_gppd_node_name({'Li': -1.0}, ['O', 'Li']), get_gppd_node_name({'Li': -1.0}, ['Li', 'O']))
+
+
+class LazyAnalysisTest(unittest.TestCase):
+    def setUp(self):
+        self.entries = [ComputedEntry('Li', -1.9), ComputedEntry('O2', -9.8), ComputedEntry('P', -5.4),
+                        ComputedEntry('Li2O', -14.3), ComputedEntry('Li3PO4', -48.3), ComputedEntry('LiPO3', -34.0),
+                        ComputedEntry('P2O5', -52.1)]
+
+    def get_entries(self, chemsys):
+        return [e for e in self.entries if set(el.symbol for el in e.composition.elements) <= set(chemsys)]
+
+    def test_virtual_entry(self):
+        with mock.patch.object(VirtualEntry, 'get_PD_entries_from_MP', side_effect=self.get_entries) as fetch:
+            entry = VirtualEntry.from_composition('Li4P2O7')
+            entry.get_PD_entries(sup_el=['Li'])
+            entry.stabilize()
+            window = entry.get_stability_window('Li')
+            entry.get_vc_plot_data('Li')
+            self.assertEqual(fetch.call_count, 1)
+            self.assertEqual(entry.graph.n_computed[('profile', 'Li', False)], 1)
+            entry.energy_correction(0.1)
+            self.assertEqual(entry.get_stability_window('Li'), (None, None))
+            entry.energy_correction(-0.1)
+            self.assert_same_window(entry.get_stability_window('Li'), window)
+            self.assertEqual(fetch.call_count, 1)
+            self.assertEqual(entry.graph.n_computed[('profile', 'Li', False)], 3)
+        reference = VirtualEntry.from_composition('Li4P2O7', energy=entry.energy)
+        self.assert_same_window(window, reference.get_stability_window('Li', entries=self.entries + [reference]))
+
+    def test_gppd_chempot(self):
+        with mock.patch.object(VirtualEntry, 'get_PD_entries_from_MP', side_effect=self.get_entries):
+            entry = VirtualEntry.from_composition('Li4P2O7')
+            entry.stabilize()
+            chempot = {'Li': -3.0}
+            entry.get_decomposition_in_gppd(chempot)
+            # Changing the dict of the caller does not change the cached hull, also when it is computed again
+            chempot['Li'] = 0.0
+            entry.energy_correction(0.01)
+            decomp, rxn = entry.get_decomposition_in_gppd({'Li': -3.0})
+        reference, ref_rxn = entry.get_decomposition_in_gppd({'Li': -3.0}, entries=self.entries + [entry])
+        self.assertEqual(sorted(e.name for e in decomp), sorted(e.name for e in reference))
+        self.assertAlmostEqual(rxn.calculated_reaction_energy, ref_rxn.calculated_reaction_energy, 6)
+
+    def assert_same_window(self, window, reference):
+        for mu, ref_mu in zip(window, reference):
+            if ref_mu is None:
+                self.assertIsNone(mu)
+            else:
+                self.assertAlmostEqual(mu, ref_mu, 6)
+
+    def assert_same_profile(self, data, reference):
+        self.assertEqual([step['phase_equilibria'] for step in data],
+                         [step['phase_equilibria'] for step in reference])
+        for step, ref_step in zip(data, reference):
+            self.assertAlmostEqual(step['x'], ref_step['x'], 6)
+            self.assertAlmostEqual(step['rxn_e'], ref_step['rxn_e'], 6)
+
+    def test_pseudo_binary(self):
+        entry1 = VirtualEntry.from_composition('Li4P2O7')
+        entry2 = VirtualEntry.from_composition('P2O5')
+        entry1.stabilize(entries=self.entries + [entry1])
+        entry2.stabilize(entries=self.entries + [entry2])
+        pb = PseudoBinary(entry1, entry2, entries=list(self.entries))
+        self.assertFalse(pb.graph.is_cached('pd'))
+        data = get_profile_data(pb.pd_mixing())
+        pb.pd_mixing()
+        self.assertEqual(pb.graph.n_computed['pd'], 1)
+
+        pb.energy_correction(0.05, -0.1)
+        corrected = get_profile_data(pb.pd_mixing())
+        self.assertEqual(pb.graph.n_computed['pd'], 2)
+        entry1.energy_correction(0.05)
+        entry2.energy_correction(-0.1)
+        reference = get_profile_data(PseudoBinary(entry1, entry2, entries=list(self.entries)).pd_mixing())
+        self.assert_same_profile(corrected, reference)
+        self.assertNotAlmostEqual(corrected[-1]['rxn_e'], data[-1]['rxn_e'], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
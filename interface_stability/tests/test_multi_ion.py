@@ -0,0 +1,42 @@
+import unittest
+
+from pymatgen.entries.computed_entries import ComputedEntry
+from interface_stability.singlephase import VirtualEntry
+
+
+class MultiIonVoltageTest(unittest.TestCase):
+    def setUp(self):
+        self.entries = [ComputedEntry('Fe', -8.3), ComputedEntry('F2', -3.6), ComputedEntry('FeF2', -20.0),
+                        ComputedEntry('Li', -1.9), ComputedEntry('LiF', -10.5), ComputedEntry('Li3FeF6', -63.0),
+                        ComputedEntry('Na', -1.3), ComputedEntry('NaF', -9.5), ComputedEntry('Mg', -1.5),
+                        ComputedEntry('MgF2', -17.0), ComputedEntry('LiNaF2', -20.5), ComputedEntry('FeF3', -20.0)]
+        self.entry = VirtualEntry.from_composition('FeF3')
+        self.entry.stabilize(entries=[e for e in self.entries if 'Li' not in e.name and 'Na' not in e.name
+                                      and 'Mg' not in e.name] + [self.entry])
+        self.entries.append(self.entry)
+
+    def test_same_as_single_ion(self):
+        ions = ['Li', 'Na', 'Mg']
+        profiles = self.entry.get_multi_ion_vc_data(ions=ions, entries=self.entries)
+        self.assertEqual(sorted(profiles), ions)
+        for ion in ions:
+            others = set(ions) - {ion}
+            entries = [e for e in self.entries if not any(el.symbol in others for el in e.composition.elements)]
+            oe_list, v_list = self.entry.get_vc_plot_data(ion, entries=entries)
+            self.assertEqual(len(profiles[ion][0]), len(oe_list))
+            for x, ref_x in zip(profiles[ion][0], oe_list):
+                self.assertAlmostEqual(x, ref_x, 6)
+            for v, ref_v in zip(profiles[ion][1], v_list):
+                self.assertAlmostEqual(v, ref_v, 6)
+
+    def test_valence(self):
+        with self.assertRaises(ValueError):
+            self.entry.get_multi_ion_vc_data(ions=['Li', 'Fe'], entries=self.entries)
+        profiles = self.entry.get_multi_ion_vc_data(ions=['Li'], valences={'Li': 2}, entries=self.entries)
+        reference = self.entry.get_multi_ion_vc_data(ions=['Li'], entries=self.entries)
+        for v, ref_v in zip(profiles['Li'][1], reference['Li'][1]):
+            self.assertAlmostEqual(v, ref_v / 2, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from unittest import mock
+
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+from pymatgen.entries.computed_entries import ComputedEntry
+from interface_stability.pruning import prune_entries
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.lazygraph import get_entries_node_name
+
+
+class PruneEntriesTest(unittest.TestCase):
+    def setUp(self):
+        self.entries = [ComputedEntry('Li', -1.9), ComputedEntry('Li', -1.7), ComputedEntry('O2', -9.8),
+                        ComputedEntry('P', -5.4), ComputedEntry('Li2O', -14.3), ComputedEntry('Li2O', -14.05),
+                        ComputedEntry('Li2O2', -19.0), ComputedEntry('Li3PO4', -48.3),
+                        ComputedEntry('Li3PO4', -48.25), ComputedEntry('LiPO3', -34.0),
+                        ComputedEntry('Li4P2O7', -75.0), ComputedEntry('P2O5', -52.1), ComputedEntry('LiP', -5.0)]
+
+    def test_hull_unchanged(self):
+        pd = PhaseDiagram(self.entries)
+        for cutoff in [0.0, 0.01, 0.1]:
+            kept, report = prune_entries(self.entries, cutoff, benchmark=True)
+            self.assertEqual(report['n_entries'] - report['n_kept'],
+                             report['n_polymorphs'] + report['n_high_energy'])
+            self.assertIn('speedup', report)
+            # The sub-system hulls are exact for a ternary system
+            for e in self.entries:
+                self.assertEqual(e in kept, pd.get_e_above_hull(e) <= cutoff)
+            # The ternary entries are only bounded by the binary hulls
+            kept, report = prune_entries(self.entries, cutoff, max_sub_dim=2)
+            for e in self.entries:
+                if pd.get_e_above_hull(e) <= cutoff:
+                    self.assertIn(e, kept)
+            pruned_pd = PhaseDiagram(kept)
+            self.assertEqual(set(e.name for e in pruned_pd.stable_entries), set(e.name for e in pd.stable_entries))
+
+    def test_negative_cutoff(self):
+        self.assertRaises(ValueError, prune_entries, self.entries, -0.1)
+
+    def test_exclusions(self):
+        entries = [ComputedEntry('Li', -1.9), ComputedEntry('O2', -9.8), ComputedEntry('Li2O', -14.3, entry_id='mp-1'),
+                   ComputedEntry('Li2O', -14.05, entry_id='mp-2')]
+        with mock.patch.object(VirtualEntry, 'get_PD_entries_from_MP', return_value=entries):
+            entry = VirtualEntry.from_composition('Li2O2', energy=-19.0)
+            self.assertNotIn('mp-2', [e.entry_id for e in entry.get_PD_entries(e_above_hull_cutoff=0.05)])
+            # Without the ground state, the other polymorph is on the hull and must not be pruned
+            kept = entry.get_PD_entries(exclusions=['mp-1'], e_above_hull_cutoff=0.05)
+            self.assertEqual(set(e.entry_id for e in kept if e.name == 'Li2O'), {'mp-2'})
+        # Only the pruned entries are kept in the graph
+        self.assertFalse(entry.graph.is_cached(get_entries_node_name(entry.chemsys)))
+        self.assertEqual(len(entry.graph.get(get_entries_node_name(entry.chemsys, e_above_hull_cutoff=0.05))), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from pymatgen.entries.computed_entries import ComputedEntry
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.rendering import PlotRenderer, _render_task
+
+
+class PlotRendererTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_render(self):
+        renderer = PlotRenderer()
+        oe_list = [-3.0, -2.88, 0.0, 5.0, 8.0]
+        v_list = [3.74, 2.36, 1.72, 0.87, 0.87]
+        for fmt in ['png', 'svg', 'pdf']:
+            path = os.path.join(self.tmpdir, 'Li3PS4_Li_vc.' + fmt)
+            renderer.render_voltage_profile(path, 'Li3PS4', 'Li', oe_list, v_list, 1)
+            self.assertTrue(os.path.getsize(path) > 0)
+            path = os.path.join(self.tmpdir, 'Li3PS4_Li_rxn_e.' + fmt)
+            renderer.render_rxn_e_profile(path, 'Li', [0.2, 0.0, -1.72, -2.36, -3.94], [-1.5, -1.42, 0, 0, -0.57])
+            self.assertTrue(os.path.getsize(path) > 0)
+        # The same figure and axes are reused, and cleared after each plot
+        self.assertEqual(len(renderer.fig.axes), 1)
+        self.assertEqual(len(renderer.ax.lines), 0)
+
+    def test_render_task(self):
+        entries = [ComputedEntry('Li', -1.9), ComputedEntry('O2', -9.8), ComputedEntry('P', -5.4),
+                   ComputedEntry('Li2O', -14.3), ComputedEntry('Li3PO4', -48.3), ComputedEntry('P2O5', -52.1)]
+        with mock.patch.object(VirtualEntry, 'get_PD_entries_from_MP', return_value=entries) as fetch:
+            composition, paths, error = _render_task(('LiPO3', 'Li', ('vc', 'rxn_e'), self.tmpdir, 'png', None, True))
+        self.assertIsNone(error)
+        self.assertEqual(len(paths), 2)
+        # One fetch for stabilizing and for both plots
+        self.assertEqual(fetch.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
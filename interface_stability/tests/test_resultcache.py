@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from interface_stability import resultcache
+from interface_stability.resultcache import ResultCache, get_query_key, get_cached_result
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_query_key(self):
+        key = get_query_key('mu', ['Li2O'], 'mp:1', open_element='Li', mu=-1.0)
+        self.assertEqual(key, get_query_key('mu', ['Li4O2'], 'mp:1', mu=-1.0, open_element='Li'))
+        self.assertNotEqual(key, get_query_key('mu', ['Li2O'], 'mp:2', open_element='Li', mu=-1.0))
+        self.assertNotEqual(key, get_query_key('mu', ['Li2O'], 'mp:1', open_element='Li', mu=-2.0))
+
+    def test_persistence_and_invalidation(self):
+        cache = ResultCache(self.path)
+        cache.put('a', {'x': [1, 2]}, scope='Li-O', fingerprint='mp:1')
+        cache.put('b', 'table', scope='Li-P', fingerprint='mp:1')
+        cache.close()
+        cache = ResultCache(self.path)
+        self.assertEqual(cache.get('a'), {'x': [1, 2]})
+        # A new result of Li-O with another fingerprint removes the old results of Li-O only
+        cache.put('c', 'new', scope='Li-O', fingerprint='mp:2')
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.get('b'), 'table')
+        self.assertEqual(len(cache), 2)
+        cache.close()
+
+    def test_lru_eviction(self):
+        cache = ResultCache(self.path, max_size=100)
+        for key in ['a', 'b', 'c']:
+            cache.put(key, 'x' * 28)
+        cache.get('a')
+        cache.put('d', 'x' * 28)
+        self.assertLessEqual(cache.get_size(), 100)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('d', cache)
+        cache.close()
+
+    def test_fingerprint_ttl(self):
+        with mock.patch.object(resultcache, 'get_entries_fingerprint', return_value='entries:1') as fingerprint:
+            for _ in range(3):
+                self.assertEqual(get_cached_result('stability', ['Li2O'], ['Li', 'O'], lambda: 'table',
+                                                   cache_path=self.path), 'table')
+            # The fingerprint is computed once, cache hits do not fetch anything
+            self.assertEqual(fingerprint.call_count, 1)
+            get_cached_result('stability', ['Li2O'], ['Li', 'O'], lambda: 'table', cache_path=self.path,
+                              fingerprint_ttl=0)
+            self.assertEqual(fingerprint.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+from pymatgen.entries.computed_entries import ComputedEntry
+from pymatgen.analysis.reaction_calculator import ComputedReaction
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.pseudobinary import PseudoBinary
+from interface_stability.rxncurve import MixingReactionEnergyCurve
+
+
+class ReactionEnergyCurveTest(unittest.TestCase):
+    def setUp(self):
+        self.entries = [ComputedEntry('Li', -1.9), ComputedEntry('O2', -9.8), ComputedEntry('P', -5.4),
+                        ComputedEntry('Li2O', -14.3), ComputedEntry('Li2O2', -19.0), ComputedEntry('Li3P', -9.0),
+                        ComputedEntry('Li3PO4', -48.3), ComputedEntry('LiPO3', -34.0), ComputedEntry('P2O5', -52.1)]
+
+    def get_brute_force_rxn_e(self, entry, mu):
+        # The stable phase equilibria minimize the grand potential, i.e. the reaction energy over all stages
+        pure_el_ref, PE_list, oe_amt_list, _ = entry.get_evolution_lists('Li', entries=self.entries)
+        energies = []
+        for PE, oe_amt in zip(PE_list, oe_amt_list):
+            rxn = ComputedReaction([entry, pure_el_ref], PE)
+            rxn.normalize_to(entry.composition.reduced_composition)
+            energies.append((rxn.calculated_reaction_energy - oe_amt * mu) / entry.composition.num_atoms)
+        return min(energies)
+
+    def test_single_phase_curve(self):
+        entry = VirtualEntry.from_composition('LiPO3')
+        entry.stabilize(entries=self.entries + [entry])
+        curve = entry.get_rxn_e_curve('Li', entries=self.entries)
+        grid = np.linspace(0.5, -5, 56)
+        rxn_e = curve.get_rxn_e(grid)
+        self.assertEqual(rxn_e.shape, grid.shape)
+        for mu, e in zip(grid, rxn_e):
+            self.assertAlmostEqual(e, self.get_brute_force_rxn_e(entry, mu), 6)
+        self.assertAlmostEqual(curve.get_rxn_e(-1.0), self.get_brute_force_rxn_e(entry, -1.0), 6)
+
+        # The reaction energy table is the curve at the transition chemical potentials
+        rxn_trans_list, rxn_e_list = entry.get_rxn_e_data(*entry.get_evolution_lists('Li', entries=self.entries))
+        for mu, e in zip(rxn_trans_list, rxn_e_list):
+            self.assertAlmostEqual(e, self.get_brute_force_rxn_e(entry, mu), 6)
+
+    def test_printable_evolution_profile(self):
+        entry = VirtualEntry.from_composition('LiPO3')
+        entry.stabilize(entries=self.entries + [entry])
+        n_stages = len(entry.get_evolution_lists('Li', entries=self.entries)[1])
+        with mock.patch('interface_stability.rxncurve.ComputedReaction', wraps=ComputedReaction) as curve_rxn, \
+                mock.patch('interface_stability.singlephase.ComputedReaction', wraps=ComputedReaction) as entry_rxn:
+            string = entry.get_printable_evolution_profile('Li', entries=self.entries, plot_rxn_e=False, n_grid=11)
+        # The reaction of each stage is built once for all tables
+        self.assertEqual(curve_rxn.call_count + entry_rxn.call_count, n_stages)
+        self.assertIn('Reaction energy on mu grid', string)
+
+    def test_pseudo_binary_curve(self):
+        entry1 = VirtualEntry.from_composition('Li2O')
+        entry2 = VirtualEntry.from_composition('P2O5')
+        entry1.stabilize(entries=self.entries + [entry1])
+        entry2.stabilize(entries=self.entries + [entry2])
+        pb = PseudoBinary(entry1, entry2, entries=list(self.entries))
+        curve = pb.get_gppd_rxn_e_curve('Li', 0, -4)
+        grid = np.linspace(-4, 0, 17)
+        data = curve.get_rxn_e(grid)
+        for mu, e_mutual, e_total in zip(grid, data['E_mutual'], data['E_total']):
+            profile = pb.gppd_mixing({'Li': mu})
+            mutual = [-step[1][1] - step[0] * -profile[-1][1][1] - (1 - step[0]) * -profile[0][1][1]
+                      for step in profile]
+            self.assertAlmostEqual(e_mutual, min(mutual), 6)
+            self.assertAlmostEqual(e_total, -profile[mutual.index(min(mutual))][1][1], 6)
+        self.assertTrue(np.isnan(curve.get_rxn_e(1.0)['E_mutual']))
+
+
+class MixingReactionEnergyCurveTest(unittest.TestCase):
+    def setUp(self):
+        # Two intervals: [-2, -1] with a reaction at x = 0.5 and [-1, 0] with reactions at x = 0.25 and 0.5
+        self.x = [[0, 0.5, 1], [0, 0.25, 0.5, 1]]
+        self.intercepts = [[0, -1.0, 0], [0, -1.2, -1.0, 0]]
+        self.slopes = [[0, 0.5, 0], [0, 0.5, 1.0, 0]]
+        names = [[['A'], ['C'], ['B']], [['A'], ['D'], ['C'], ['B']]]
+        self.curve = MixingReactionEnergyCurve([-2, -1, 0], self.x, names, self.intercepts, self.slopes)
+
+    def test_rxn_e(self):
+        grid = np.linspace(-2, 0, 41)
+        data = self.curve.get_rxn_e(grid)
+        for mu, e_mutual, e_total, x in zip(grid, data['E_mutual'], data['E_total'], data['x']):
+            i = 0 if mu <= -1 else 1
+            energies = [a + b * mu for a, b in zip(self.intercepts[i], self.slopes[i])]
+            mutual = [e - r * energies[-1] - (1 - r) * energies[0] for e, r in zip(energies, self.x[i])]
+            self.assertAlmostEqual(e_mutual, min(mutual), 10)
+            self.assertAlmostEqual(e_total, energies[int(np.argmin(mutual))], 10)
+            self.assertAlmostEqual(x, self.x[i][int(np.argmin(mutual))], 10)
+        # The minimum moves from x = 0.5 to 0.25 inside the upper interval
+        self.assertEqual(self.curve.get_phase_equilibria([-1.5, -0.5, -0.1, 0.5]), [['C'], ['C'], ['D'], None])
+
+    def test_out_of_range(self):
+        data = self.curve.get_rxn_e([[-3.0, -1.5], [0.0, 0.1]])
+        self.assertEqual(data['E_mutual'].shape, (2, 2))
+        self.assertTrue(np.isnan(data['E_mutual'][0, 0]))
+        self.assertTrue(np.isnan(data['x'][1, 1]))
+        self.assertAlmostEqual(data['E_mutual'][0, 1], -1.75, 10)
+
+    def test_from_profiles(self):
+        a, b, c = ComputedEntry('Li2O', 0), ComputedEntry('P2O5', 0), ComputedEntry('Li3PO4', 0)
+
+        def get_profile(ratio, e):
+            return [(0, ([b], 0)), (ratio, ([c], -e)), (1, ([a], 0))]
+        # Mixing ratios solved at two mu only agree up to the last bits
+        curve = MixingReactionEnergyCurve.from_profiles([-2, 0], [((-1.5, get_profile(0.75, -1.0)),
+                                                                  (-0.5, get_profile(0.75 + 1e-14, -0.5)))])
+        self.assertAlmostEqual(curve.get_rxn_e(-1.0)['E_mutual'], -0.75, 10)
+        self.assertEqual(curve.get_phase_equilibria(-1.0), [['Li3PO4']])
+        with self.assertRaises(ValueError):
+            MixingReactionEnergyCurve.from_profiles([-2, 0], [((-1.5, get_profile(0.75, -1.0)),
+                                                               (-0.5, get_profile(0.8, -0.5)))])
+
+
+if __name__ == '__main__':
+    unittest.main()
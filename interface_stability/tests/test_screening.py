@@ -0,0 +1,82 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.screening import run_window_job, run_screening, read_screening_results, get_job_key, \
+    get_pair_matrix_jobs, read_batch_jobs, group_jobs_by_chemsys, SINGLE_PHASE_JOB_TYPES
+
+
+class ScreeningTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.output = os.path.join(self.tmpdir, 'results.jsonl')
+        self.jobs = list(get_pair_matrix_jobs(['Li3PS4', 'LiCoO2', 'Li2S']))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_job_key(self):
+        self.assertEqual(get_job_key({'a': 1, 'b': 2}), get_job_key({'b': 2, 'a': 1}))
+        self.assertEqual(len(self.jobs), 3)
+
+    def test_resume(self):
+        calls = []
+
+        def runner(job):
+            calls.append(job)
+            if len(calls) == 2:
+                raise RuntimeError("preempted")
+            return job['composition_1'] + '-' + job['composition_2']
+
+        self.assertEqual(run_screening(self.jobs, self.output, runner=runner), (2, 0, 1))
+        self.assertEqual(run_screening(self.jobs, self.output, runner=runner), (1, 2, 0))
+        self.assertEqual(len(calls), 4)
+        records = list(read_screening_results(self.output))
+        self.assertEqual(len(records), 3)
+        self.assertEqual(sorted(r['result'] for r in records), ['Li3PS4-Li2S', 'Li3PS4-LiCoO2', 'LiCoO2-Li2S'])
+
+    def test_partial_line(self):
+        run_screening(self.jobs[:1], self.output, runner=lambda job: 1)
+        with open(self.output, 'a') as f:
+            f.write('{"key": "trunc')
+        run_screening(self.jobs, self.output, runner=lambda job: 1)
+        with open(self.output) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 3)
+
+    def test_read_batch_jobs(self):
+        path = os.path.join(self.tmpdir, 'jobs.csv')
+        with open(path, 'w') as f:
+            f.write('type,composition,open_element,chemical_potential,posmu\n'
+                    'mu,Li3PS4,Li,-1,\n'
+                    ',Li3PS4,Li,,true\n')
+        jobs = read_batch_jobs(path, default_type='window', allowed_types=SINGLE_PHASE_JOB_TYPES)
+        self.assertEqual(jobs, [{'type': 'mu', 'composition': 'Li3PS4', 'open_element': 'Li',
+                                 'chemical_potential': -1.0},
+                                {'type': 'window', 'composition': 'Li3PS4', 'open_element': 'Li', 'posmu': True}])
+        self.assertRaises(ValueError, read_batch_jobs, path, default_type='pd', allowed_types=SINGLE_PHASE_JOB_TYPES)
+
+    def test_group_jobs_by_chemsys(self):
+        jobs = [{'type': 'stability', 'composition': 'Li2S'},
+                {'type': 'window', 'composition': 'P2S5', 'open_element': 'Li'},
+                {'type': 'stability', 'composition': 'LiCoO2'}] + self.jobs
+        groups = group_jobs_by_chemsys(jobs)
+        self.assertEqual(list(groups), [('Co', 'Li', 'O', 'P', 'S')])
+        groups = group_jobs_by_chemsys(jobs[:3])
+        self.assertEqual(list(groups), [('Co', 'Li', 'O'), ('Li', 'P', 'S')])
+        self.assertEqual(len(groups[('Li', 'P', 'S')]), 2)
+
+    def test_window_job(self):
+        # get_stability_window returns (mu_high, mu_low)
+        with mock.patch.object(VirtualEntry, 'stabilize'), \
+                mock.patch.object(VirtualEntry, 'get_stability_window', return_value=(-0.5, -4.2)):
+            result = run_window_job({'type': 'window', 'composition': 'Li3PS4', 'open_element': 'Li'})
+        self.assertEqual(result, {'mu_low': -4.2, 'mu_high': -0.5})
+
+
+if __name__ == "__main__":
+    unittest.main()
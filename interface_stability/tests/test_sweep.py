@@ -0,0 +1,64 @@
+import unittest
+
+from pymatgen.entries.computed_entries import ComputedEntry
+from interface_stability.singlephase import VirtualEntry
+from interface_stability.pseudobinary import PseudoBinary, get_profile_data
+from interface_stability.sweep import EnergyCorrectionSweep
+
+
+class EnergyCorrectionSweepTest(unittest.TestCase):
+    def setUp(self):
+        self.entries = [ComputedEntry('Li', -1.9), ComputedEntry('O2', -9.8), ComputedEntry('P', -5.4),
+                        ComputedEntry('Li2O', -14.3), ComputedEntry('Li3PO4', -48.3), ComputedEntry('LiPO3', -34.0),
+                        ComputedEntry('P2O5', -52.1)]
+        self.entry1 = VirtualEntry.from_composition('Li4P2O7')
+        self.entry2 = VirtualEntry.from_composition('P2O5')
+        self.entry1.stabilize(entries=self.entries + [self.entry1])
+        self.entry2.stabilize(entries=self.entries + [self.entry2])
+        self.sweep = EnergyCorrectionSweep(self.entry1, self.entry2, entries=self.entries)
+
+    def get_reference(self, e1, e2):
+        entry1 = VirtualEntry.from_composition(self.entry1.composition, energy=self.entry1.energy)
+        entry2 = VirtualEntry.from_composition(self.entry2.composition, energy=self.entry2.energy)
+        entry1.energy_correction(e1)
+        entry2.energy_correction(e2)
+        return get_profile_data(PseudoBinary(entry1, entry2, entries=list(self.entries)).pd_mixing())
+
+    def test_same_as_pd_mixing(self):
+        for e1, e2 in [(0.0, 0.0), (0.2, 0.05), (-0.1, 0.3), (0.1, -0.2)]:
+            data = get_profile_data(self.sweep.get_profile(e1, e2))
+            reference = self.get_reference(e1, e2)
+            self.assertEqual([step['phase_equilibria'] for step in data],
+                             [step['phase_equilibria'] for step in reference])
+            for step, ref_step in zip(data, reference):
+                self.assertAlmostEqual(step['x'], ref_step['x'], 6)
+                self.assertAlmostEqual(step['rxn_e'], ref_step['rxn_e'], 6)
+
+    def test_positive_corrections_share_hull(self):
+        for e in [0.1, 0.2, 0.3]:
+            self.sweep.get_profile(e, e)
+        self.assertEqual(len(self.sweep._profiles), 1)
+        # An end member above the hull decomposes, which changes the phase equilibria at that end
+        transitions = self.sweep.find_transitions(-0.1, 0.1, endpoint=1, n=5, tol=1e-4)
+        self.assertTrue(any(abs(t[0]) < 1e-3 for t in transitions))
+        self.assertLessEqual(len(self.sweep._profiles), self.sweep.max_profiles)
+
+    def test_below_hull(self):
+        # A novel phase below the hull stays on it for small positive corrections
+        entry1 = VirtualEntry.from_composition('Li4P2O7', energy=self.entry1.energy)
+        entry1.energy_correction(-0.1)
+        self.entry1 = entry1
+        sweep = EnergyCorrectionSweep(entry1, self.entry2, entries=self.entries)
+        self.assertAlmostEqual(sweep.e_above_hull[0], -0.1, 6)
+        for e1, e2 in [(0.05, 0.0), (0.05, 0.2), (0.2, 0.2)]:
+            data = get_profile_data(sweep.get_profile(e1, e2))
+            reference = self.get_reference(e1, e2)
+            self.assertEqual([step['phase_equilibria'] for step in data],
+                             [step['phase_equilibria'] for step in reference])
+            for step, ref_step in zip(data, reference):
+                self.assertAlmostEqual(step['rxn_e'], ref_step['rxn_e'], 6)
+        self.assertIn('Li4P2O7', sweep.get_summary(0.05, 0.0)['phase_equilibria'][-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
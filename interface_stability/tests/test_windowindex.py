@@ -0,0 +1,97 @@
+import os
+import json
+import random
+import shutil
+import tempfile
+import unittest
+
+from interface_stability.windowindex import IntervalTree, StabilityWindowIndex, get_printable_window_query
+
+
+class IntervalTreeTest(unittest.TestCase):
+    def test_queries(self):
+        rand = random.Random(1)
+        tree = IntervalTree()
+        intervals = {}
+        for i in range(300):
+            key = 'c{}'.format(rand.randint(0, 80))
+            if key in intervals:
+                tree.delete(intervals.pop(key)[0], key)
+            if rand.random() < 0.8:
+                low = rand.uniform(-5, 0)
+                high = low + rand.uniform(0, 3)
+                intervals[key] = (low, high)
+                tree.insert(low, high, key)
+        self.assertEqual(len(tree), len(intervals))
+        for _ in range(50):
+            low, high = sorted([rand.uniform(-6, 1), rand.uniform(-6, 1)])
+            overlapping = set(k for k, (lo, hi) in intervals.items() if lo <= high and hi >= low)
+            covering = set(k for k, (lo, hi) in intervals.items() if lo <= low and hi >= high)
+            self.assertEqual(set(k for _, _, k in tree.get_overlapping(low, high)), overlapping)
+            self.assertEqual(set(k for _, _, k in tree.get_covering(low, high)), covering)
+
+
+class StabilityWindowIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'windows.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_queries(self):
+        index = StabilityWindowIndex(self.path)
+        index.add('Li3PS4', 'Li', -1.7, -2.3)
+        index.add('Li2S', 'Li', 0.0, None)
+        index.add('P2S5', 'Li', -2.2, None)
+        index.add('Li3P', 'Li', 0.0, -0.8)
+        index.add('LiPO3', 'Li', None, None)
+        results = index.get_stable_between('Li', -2.0, -0.5)
+        self.assertEqual([r[0] for r in results], ['Li2S', 'Li3PS4', 'Li3P'])
+        self.assertEqual([r[0] for r in index.get_covering('Li', -4.2, -0.5)], ['Li2S'])
+        self.assertEqual([r[0] for r in index.get_stable_between('Li', -3, -2.5, contains=['P'])], ['P2S5'])
+        self.assertEqual(index.get_stable_between('Na', -3, 0), [])
+        self.assertIsNone(index.get_window('LiPO3', 'Li'))
+        self.assertIn('-inf', get_printable_window_query(results, 'Li'))
+
+    def test_update_and_reload(self):
+        index = StabilityWindowIndex(self.path)
+        index.add('Li3PS4', 'Li', -1.7, -2.3)
+        index.add('Li2S', 'Li', 0.0, None)
+        index.add('Li3PS4', 'Li', -1.0, -1.5)
+        index.add('Li2S', 'Li', None, None)
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.get_window('Li3PS4', 'Li'), (-1.0, -1.5))
+        # A partly written last line is dropped, and later windows are appended after it
+        with open(self.path, 'a') as f:
+            f.write('{"composition": "Li2')
+        reloaded = StabilityWindowIndex(self.path)
+        self.assertEqual(reloaded.windows, index.windows)
+        reloaded.add('P2S5', 'Li', -2.2, None)
+        self.assertEqual(StabilityWindowIndex(self.path).windows, reloaded.windows)
+        reloaded.add('P2S5', 'Li', None, None)
+        self.assertEqual(reloaded.get_stable_between('Li', -2.0, -1.8), [])
+        reloaded.compact()
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 1)
+        self.assertEqual(StabilityWindowIndex(self.path).windows, index.windows)
+
+    def test_add_screening_results(self):
+        results_path = os.path.join(self.folder, 'results.jsonl')
+        records = [{'key': '1', 'job': {'type': 'window', 'composition': 'Li3PS4', 'open_element': 'Li'},
+                    'result': {'mu_high': -1.7, 'mu_low': -2.3}},
+                   {'key': '2', 'job': {'type': 'window', 'composition': 'Li2S', 'open_element': 'Li', 'posmu': True},
+                    'result': {'mu_high': 1.0, 'mu_low': 0.5}},
+                   {'key': '3', 'job': {'type': 'stability', 'composition': 'Li2S'}, 'result': {}},
+                   {'key': '4', 'job': {'type': 'window', 'composition': 'P2S5', 'open_element': 'Li'},
+                    'error': 'failed'}]
+        with open(results_path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+        index = StabilityWindowIndex(self.path)
+        self.assertEqual(index.add_screening_results(results_path), 1)
+        self.assertEqual(StabilityWindowIndex(self.path).get_window('Li3PS4', 'Li'), (-1.7, -2.3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+
+from interface_stability.screening import read_screening_results
+from interface_stability.workqueue import submit_jobs, run_worker, get_queue_status, merge_results, \
+    requeue_stale_shards, requeue_failed_shards, claim_shard
+
+
+def square_runner(job):
+    return job['n'] ** 2
+
+
+def start_worker(queue_dir, worker_id):
+    run_worker(queue_dir, worker_id=worker_id, processes=2, runner=square_runner)
+
+
+class WorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.queue_dir = tempfile.mkdtemp()
+        self.jobs = [{'type': 'test', 'n': n} for n in range(50)]
+
+    def tearDown(self):
+        shutil.rmtree(self.queue_dir)
+
+    def test_local_workers(self):
+        self.assertEqual(submit_jobs(self.queue_dir, self.jobs, shard_size=7), 8)
+        workers = [multiprocessing.Process(target=start_worker, args=(self.queue_dir, 'worker{}'.format(i)))
+                   for i in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(get_queue_status(self.queue_dir), {'pending': 0, 'claimed': 0, 'done': 8, 'failed': 0})
+
+        output = os.path.join(self.queue_dir, 'merged.jsonl')
+        self.assertEqual(merge_results(self.queue_dir, output), 50)
+        results = {r['job']['n']: r['result'] for r in read_screening_results(output)}
+        self.assertEqual(results, {n: n ** 2 for n in range(50)})
+
+    def test_requeue(self):
+        submit_jobs(self.queue_dir, self.jobs, shard_size=50)
+        claimed_path = claim_shard(self.queue_dir, 'dead_worker')
+        self.assertIsNone(claim_shard(self.queue_dir, 'another_worker'))
+        self.assertEqual(requeue_stale_shards(self.queue_dir, 60), 0)
+        old = time.time() - 120
+        os.utime(claimed_path, (old, old))
+        self.assertEqual(requeue_stale_shards(self.queue_dir, 60), 1)
+        self.assertEqual(run_worker(self.queue_dir, runner=square_runner), 1)
+
+    def test_failed_shards(self):
+        submit_jobs(self.queue_dir, self.jobs, shard_size=25)
+        jobs_run = []
+
+        def runner(job):
+            jobs_run.append(job['n'])
+            if job['n'] == 30 and jobs_run.count(30) == 1:
+                raise ValueError('failed once')
+            return job['n'] ** 2
+        self.assertEqual(run_worker(self.queue_dir, runner=runner, heartbeat_interval=0.01), 2)
+        self.assertEqual(get_queue_status(self.queue_dir), {'pending': 0, 'claimed': 0, 'done': 1, 'failed': 1})
+        self.assertEqual(requeue_failed_shards(self.queue_dir), 1)
+        self.assertEqual(run_worker(self.queue_dir, runner=runner), 1)
+        # Only the failed job is run again
+        self.assertEqual(len(jobs_run), 51)
+        self.assertEqual(get_queue_status(self.queue_dir)['done'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,271 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+import os
+import json
+import random
+
+from pymatgen import Composition
+from interface_stability.screening import read_screening_results, _drop_partial_line
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+"""
+Index of the stability windows of many compounds, for range queries like
+"which phases are stable somewhere between mu_low and mu_high" or "which phases cover the whole window".
+
+The windows of each open element are kept in an interval tree (a treap with the largest end of each subtree).
+Both queries ask for the windows starting at most at one value and ending at least at another. They take
+O(log n) expected time to find the windows starting early enough, plus O(log n) per result, so O((k + 1) log n)
+for k results. (O(log n + k) would need a priority search tree.)
+The index is persisted as a JSONL log of window updates: adding compounds only appends to it, and loading replays it.
+Chemical potentials are referenced to the pure open element, as given by VirtualEntry.get_stability_window,
+e.g. 0.5-4.2 V vs Li is mu_Li between -4.2 and -0.5 eV.
+"""
+
+NEG_INF = float('-inf')
+
+
+class _Node(object):
+    __slots__ = ('low', 'high', 'key', 'priority', 'left', 'right', 'max_high')
+
+    def __init__(self, low, high, key, priority):
+        self.low = low
+        self.high = high
+        self.key = key
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.max_high = high
+
+
+def _update(node):
+    node.max_high = node.high
+    for child in (node.left, node.right):
+        if child is not None and child.max_high > node.max_high:
+            node.max_high = child.max_high
+    return node
+
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+def _split(node, order):
+    """
+    :return: (nodes before order, nodes at or after order), order being (low, key)
+    """
+    if node is None:
+        return None, None
+    if (node.low, node.key) < order:
+        node.right, right = _split(node.right, order)
+        return _update(node), right
+    left, node.left = _split(node.left, order)
+    return left, _update(node)
+
+
+class IntervalTree(object):
+    """
+    Treap of closed intervals [low, high] ordered by (low, key). Each node keeps the largest high of its subtree,
+    so that subtrees without any matching interval are skipped.
+    """
+
+    def __init__(self, seed=0):
+        self.root = None
+        self.size = 0
+        self._random = random.Random(seed)
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, low, high, key):
+        left, right = _split(self.root, (low, key))
+        node = _Node(low, high, key, self._random.random())
+        self.root = _merge(_merge(left, node), right)
+        self.size += 1
+
+    def delete(self, low, key):
+        left, right = _split(self.root, (low, key))
+        # key + '\0' is the next possible key, so middle is only the deleted node
+        middle, right = _split(right, (low, key + '\0'))
+        if middle is not None:
+            self.size -= 1
+        self.root = _merge(left, right)
+
+    def _search(self, max_low, min_high):
+        """
+        :return: list of (low, high, key) of the intervals with low <= max_low and high >= min_high, ordered by low.
+            The subtrees starting after max_low or all ending before min_high are skipped, on both sides of each
+            node. A visited subtree that starts before max_low thus has a result, which bounds the visited nodes
+            by the search path of max_low plus a path to each result.
+        """
+        found = []
+
+        def search(node):
+            if node is None or node.max_high < min_high:
+                return
+            search(node.left)
+            if node.low <= max_low:
+                if node.high >= min_high:
+                    found.append((node.low, node.high, node.key))
+                search(node.right)
+
+        search(self.root)
+        return found
+
+    def get_overlapping(self, low, high):
+        """
+        :return: list of (low, high, key) of the intervals intersecting [low, high], ordered by low
+        """
+        return self._search(high, low)
+
+    def get_covering(self, low, high):
+        """
+        :return: list of (low, high, key) of the intervals containing [low, high], ordered by low
+        """
+        return self._search(low, high)
+
+
+class StabilityWindowIndex(object):
+    """
+    Stability windows (mu_high, mu_low) of compounds for each open element. mu_low None means -inf.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: JSONL file of the index. Existing windows are loaded from it and new windows are appended.
+        """
+        self.path = path
+        self.windows = {}
+        self.trees = {}
+        if path and os.path.isfile(path):
+            # A partly written last line is dropped, otherwise the next window would be appended to it
+            _drop_partial_line(path)
+            with open(path) as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._set(record['composition'], record['open_element'], record['mu_high'], record['mu_low'])
+
+    def __len__(self):
+        return len(self.windows)
+
+    def _set(self, formula, open_el, mu_high, mu_low):
+        key = (formula, open_el)
+        tree = self.trees.setdefault(open_el, IntervalTree())
+        if key in self.windows:
+            tree.delete(self._get_low(self.windows[key][1]), formula)
+            del self.windows[key]
+        if mu_high is not None:
+            tree.insert(self._get_low(mu_low), mu_high, formula)
+            self.windows[key] = (mu_high, mu_low)
+
+    @staticmethod
+    def _get_low(mu_low):
+        return NEG_INF if mu_low is None else mu_low
+
+    def add(self, composition, open_el, mu_high, mu_low):
+        """
+        Add or update the window of a compound. A window of (None, None) (never stable) removes the compound.
+        """
+        self.add_windows([(composition, open_el, mu_high, mu_low)])
+
+    def add_windows(self, windows):
+        """
+        Add or update many windows, see add.
+        :param windows: iterable of (composition, open element, mu_high, mu_low)
+        :return: number of windows added
+        """
+        records = []
+        for composition, open_el, mu_high, mu_low in windows:
+            formula = Composition(composition).reduced_formula
+            self._set(formula, str(open_el), mu_high, mu_low)
+            records.append({'composition': formula, 'open_element': str(open_el), 'mu_high': mu_high,
+                            'mu_low': mu_low})
+        if self.path and records:
+            with open(self.path, 'a') as f:
+                for record in records:
+                    f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        return len(records)
+
+    def add_screening_results(self, output_path):
+        """
+        Add the results of the window jobs of a screening/batch JSONL output.
+        :return: number of windows added
+        """
+        return self.add_windows((record['job']['composition'], record['job']['open_element'],
+                                 record['result']['mu_high'], record['result']['mu_low'])
+                                for record in read_screening_results(output_path)
+                                if record['job'].get('type') == 'window' and not record['job'].get('posmu'))
+
+    def compact(self):
+        """
+        Rewrite the JSONL file with only the current windows.
+        """
+        tmp_path = self.path + '.tmp{}'.format(os.getpid())
+        with open(tmp_path, 'w') as f:
+            for (formula, open_el), (mu_high, mu_low) in sorted(self.windows.items()):
+                record = {'composition': formula, 'open_element': open_el, 'mu_high': mu_high, 'mu_low': mu_low}
+                f.write(json.dumps(record) + '\n')
+        os.rename(tmp_path, self.path)
+
+    def get_window(self, composition, open_el):
+        """
+        :return: (mu_high, mu_low), or None if the compound is not in the index
+        """
+        return self.windows.get((Composition(composition).reduced_formula, str(open_el)))
+
+    def _get_results(self, intervals, contains):
+        results = []
+        for low, high, formula in intervals:
+            if contains and not all(el in Composition(formula) for el in contains):
+                continue
+            results.append((formula, high, None if low == NEG_INF else low))
+        return results
+
+    def get_stable_between(self, open_el, mu_low, mu_high, contains=None):
+        """
+        Compounds stable somewhere between mu_low and mu_high.
+        :param contains: only the compounds containing all these elements
+        :return: list of (formula, mu_high, mu_low), ordered by mu_low
+        """
+        mu_low, mu_high = sorted([mu_low, mu_high])
+        tree = self.trees.get(str(open_el), IntervalTree())
+        return self._get_results(tree.get_overlapping(mu_low, mu_high), contains)
+
+    def get_covering(self, open_el, mu_low, mu_high, contains=None):
+        """
+        Compounds stable over the whole window from mu_low to mu_high.
+        :param contains: only the compounds containing all these elements
+        :return: list of (formula, mu_high, mu_low), ordered by mu_low
+        """
+        mu_low, mu_high = sorted([mu_low, mu_high])
+        tree = self.trees.get(str(open_el), IntervalTree())
+        return self._get_results(tree.get_covering(mu_low, mu_high), contains)
+
+
+def get_printable_window_query(results, open_el):
+    if not results:
+        return "No compound found"
+    lines = ["{:<20}{:>14}{:>14}".format("Compound", "mu_high (eV)", "mu_low (eV)")]
+    for formula, mu_high, mu_low in results:
+        lines.append("{:<20}{:>14.3f}{:>14}".format(formula, mu_high,
+                                                   "-inf" if mu_low is None else "{:.3f}".format(mu_low)))
+    lines.append("Chemical potential of {} referenced to element phase.".format(open_el))
+    return '\n'.join(lines)
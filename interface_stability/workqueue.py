@@ -0,0 +1,237 @@
+# coding: utf-8
+# Copyright (c) Mogroup  @ University of Maryland, College Park
+# Distributed under the terms of the MIT License.
+
+import os
+import json
+import time
+import uuid
+import socket
+import itertools
+import threading
+import functools
+
+from interface_stability.screening import run_job, run_screening, read_screening_results
+
+__author__ = "Yizhou Zhu"
+__copyright__ = ""
+__version__ = "2.2"
+__maintainer__ = "Yizhou Zhu"
+__email__ = "yizhou.zhu@gmail.com"
+__status__ = "Production"
+__date__ = "Jun 10, 2018"
+
+"""
+A work queue for screening jobs, which only needs a filesystem shared by all nodes.
+
+The queue folder looks like:
+    pending/shard-*.json           shards waiting to be claimed, each is a list of jobs
+    claimed/shard-*.json@worker    shards being processed. The file mtime is the heartbeat of the worker.
+    done/shard-*.json              finished shards
+    failed/shard-*.json            shards with failed jobs, put back to pending by requeue_failed_shards
+    results/shard-*.jsonl          streamed results of each shard, with the checkpoint manifest next to it
+A shard is claimed by renaming it from pending/ to claimed/, which is atomic, so that each shard is claimed
+by exactly one worker. A worker runs its shard with run_screening, so a shard given back to the queue after
+the worker died only reruns the jobs that were not finished.
+"""
+
+_FOLDERS = ('pending', 'claimed', 'done', 'failed', 'results')
+
+
+def _init_queue(queue_dir):
+    for folder in _FOLDERS:
+        path = os.path.join(queue_dir, folder)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+
+def _shard_name(claimed_name):
+    return claimed_name.rsplit('@', 1)[0]
+
+
+def submit_jobs(queue_dir, jobs, shard_size=20):
+    """
+    Split jobs into shards and put them in the queue.
+
+    :param queue_dir: the queue folder on the shared filesystem
+    :param jobs: an iterable of job dicts
+    :param shard_size: number of jobs per shard
+    :return: number of submitted shards
+    """
+    _init_queue(queue_dir)
+    submission = uuid.uuid4().hex[:8]
+    jobs = iter(jobs)
+    for n in itertools.count(1):
+        shard = list(itertools.islice(jobs, shard_size))
+        if not shard:
+            return n - 1
+        name = 'shard-{}-{:06d}.json'.format(submission, n)
+        tmp_path = os.path.join(queue_dir, 'pending', '.' + name)
+        with open(tmp_path, 'w') as f:
+            json.dump(shard, f)
+        os.rename(tmp_path, os.path.join(queue_dir, 'pending', name))
+
+
+def claim_shard(queue_dir, worker_id):
+    """
+    Claim one pending shard.
+    :return: path of the claimed shard, or None if there is nothing left to claim
+    """
+    pending = os.path.join(queue_dir, 'pending')
+    for name in sorted(os.listdir(pending)):
+        if name.startswith('.'):
+            continue
+        claimed_path = os.path.join(queue_dir, 'claimed', '{}@{}'.format(name, worker_id))
+        try:
+            os.rename(os.path.join(pending, name), claimed_path)
+        except OSError:
+            # Claimed by another worker in the meantime
+            continue
+        return claimed_path
+    return None
+
+
+def requeue_stale_shards(queue_dir, timeout):
+    """
+    Put claimed shards back to pending if their worker has not shown any progress for timeout seconds.
+    The timeout should be longer than the longest single job.
+    :return: number of shards put back
+    """
+    claimed = os.path.join(queue_dir, 'claimed')
+    n = 0
+    for name in os.listdir(claimed):
+        path = os.path.join(claimed, name)
+        try:
+            if time.time() - os.path.getmtime(path) < timeout:
+                continue
+            os.rename(path, os.path.join(queue_dir, 'pending', _shard_name(name)))
+            n += 1
+        except OSError:
+            continue
+    return n
+
+
+def requeue_failed_shards(queue_dir):
+    """
+    Put the shards with failed jobs back to pending. Only the failed jobs are run again.
+    :return: number of shards put back
+    """
+    failed = os.path.join(queue_dir, 'failed')
+    n = 0
+    for name in os.listdir(failed):
+        try:
+            os.rename(os.path.join(failed, name), os.path.join(queue_dir, 'pending', name))
+            n += 1
+        except OSError:
+            continue
+    return n
+
+
+class _Heartbeat(object):
+    """
+    Touch the claimed shard every interval seconds from a thread while it runs. The jobs are fed to the pool in
+    batches, so touching it per job taken would leave a healthy worker silent for several job durations.
+    """
+
+    def __init__(self, claimed_path, interval):
+        self.claimed_path = claimed_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def touch(self):
+        try:
+            os.utime(self.claimed_path, None)
+        except OSError:
+            # The shard has been taken over by another worker, results are still checkpointed
+            pass
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.touch()
+
+    def __enter__(self):
+        self.touch()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(queue_dir, worker_id=None, processes=1, runner=run_job, stale_timeout=None, hull_folder=None,
+               heartbeat_interval=30, verbose=False):
+    """
+    Keep claiming and running shards until the queue is empty.
+
+    :param queue_dir: the queue folder on the shared filesystem
+    :param worker_id: a unique name of this worker, default to hostname-pid
+    :param processes: number of local processes used for each shard
+    :param runner: function to run a job dict, default to screening.run_job
+    :param stale_timeout: if given, shards claimed by workers silent for this many seconds are taken over
+    :param hull_folder: if given, passed to the runner, so that the hulls are loaded from hull artifacts in this
+        folder and shared by all processes of the node (see screening.run_job)
+    :param heartbeat_interval: seconds between two touches of the claimed shard, must be well below the stale
+        timeout of all workers
+    :param verbose: whether to print the progress
+    :return: number of shards processed by this worker
+    """
+    _init_queue(queue_dir)
+    if hull_folder is not None:
+        runner = functools.partial(runner, hull_folder=hull_folder)
+    worker_id = worker_id if worker_id else '{}-{}'.format(socket.gethostname(), os.getpid())
+    n_shards = 0
+    while True:
+        if stale_timeout:
+            requeue_stale_shards(queue_dir, stale_timeout)
+        claimed_path = claim_shard(queue_dir, worker_id)
+        if claimed_path is None:
+            return n_shards
+        name = _shard_name(os.path.basename(claimed_path))
+        with open(claimed_path) as f:
+            jobs = json.load(f)
+        output_path = os.path.join(queue_dir, 'results', name[:-len('.json')] + '.jsonl')
+        with _Heartbeat(claimed_path, heartbeat_interval):
+            n_done, n_skipped, n_failed = run_screening(jobs, output_path, runner=runner, processes=processes)
+        try:
+            os.rename(claimed_path, os.path.join(queue_dir, 'failed' if n_failed else 'done', name))
+        except OSError:
+            pass
+        n_shards += 1
+        if verbose:
+            print("Worker {} finished {}: {} done, {} skipped, {} failed".format(worker_id, name, n_done, n_skipped,
+                                                                                n_failed))
+
+
+def get_queue_status(queue_dir):
+    """
+    :return: {folder: number of shards} for pending, claimed, done and failed shards
+    """
+    return {folder: len([_ for _ in os.listdir(os.path.join(queue_dir, folder)) if not _.startswith('.')])
+            for folder in _FOLDERS[:4]}
+
+
+def merge_results(queue_dir, output_path, include_errors=False):
+    """
+    Merge the results of all shards into one JSONL file. Each job appears once.
+    :return: number of merged records
+    """
+    results = os.path.join(queue_dir, 'results')
+    seen = set()
+    n = 0
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        for name in sorted(os.listdir(results)):
+            if not name.endswith('.jsonl'):
+                continue
+            for record in read_screening_results(os.path.join(results, name), include_errors=include_errors):
+                if 'result' in record:
+                    if record['key'] in seen:
+                        continue
+                    seen.add(record['key'])
+                f.write(json.dumps(record) + '\n')
+                n += 1
+    os.rename(tmp_path, output_path)
+    return n
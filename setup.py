@@ -32,7 +32,8 @@ setup(
     entry_points={
         'console_scripts': [
             'phase_stability=interface_stability.scripts.phase_stability:main',
-            'pseudo_binary=interface_stability.scripts.pseudo_binary:main'
+            'pseudo_binary=interface_stability.scripts.pseudo_binary:main',
+            'screening_queue=interface_stability.scripts.screening_queue:main'
         ],
     },
     project_urls={